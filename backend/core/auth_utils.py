@@ -1,11 +1,10 @@
 from fastapi import Depends, HTTPException, status
 # 1. CHANGE: Import OAuth2PasswordBearer instead of OAuth2
 from fastapi.security import OAuth2PasswordBearer 
-from sqlalchemy.orm import Session
 from typing import Optional
 
-from ..db.database import get_db
 from ..db import crud
+from ..db.database import current_user_id
 from ..models import schemas
 
 # --- Placeholder Authentication Logic ---
@@ -27,9 +26,7 @@ def get_user_id_from_token(token: str) -> Optional[int]:
 # --- Dependency Function for Secured Endpoints ---
 
 # The token parameter is now automatically handled by OAuth2PasswordBearer
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> int:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> int:
     """Dependency to get the currently authenticated user's ID."""
     user_id = get_user_id_from_token(token)
     
@@ -40,5 +37,8 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Lets the database layer route this request's reads after its own writes
+    current_user_id.set(user_id)
+    
     # Returning the ID only:
     return user_id
\ No newline at end of file
@@ -0,0 +1,119 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# --- Circuit Breaker ---
+# Guards calls to an external service. After failure_threshold consecutive
+# failures the circuit opens and calls fail immediately instead of waiting on
+# the service. After recovery_seconds a limited number of probe calls are let
+# through (half-open): a successful probe closes the circuit, a failed one
+# opens it again. A call slower than latency_budget_seconds counts as a failure
+# even if it returned a result.
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the service while the circuit is open."""
+    pass
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        latency_budget_seconds: Optional[float] = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.latency_budget_seconds = latency_budget_seconds
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "failures": 0,
+            "slow_calls": 0,
+            "rejected": 0,
+            "opened": 0
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        # Caller holds the lock
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def _acquire(self) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._probes >= self.half_open_max_calls):
+                self._counters["rejected"] += 1
+                raise CircuitOpenError(f"Circuit '{self.name}' is open")
+            if state == HALF_OPEN:
+                self._probes += 1
+            self._counters["calls"] += 1
+
+    def _record(self, success: bool) -> None:
+        with self._lock:
+            if success:
+                self._state = CLOSED
+                self._failures = 0
+                return
+
+            self._counters["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._counters["opened"] += 1
+                    print(f"Circuit '{self.name}' opened after {self._failures} failure(s)")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Calls func through the breaker, raising CircuitOpenError while the circuit is open."""
+        self._acquire()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._record(False)
+            raise
+
+        elapsed = time.monotonic() - started
+        slow = self.latency_budget_seconds is not None and elapsed > self.latency_budget_seconds
+        if slow:
+            with self._lock:
+                self._counters["slow_calls"] += 1
+        self._record(not slow)
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_seconds": self.recovery_seconds,
+                "latency_budget_seconds": self.latency_budget_seconds
+            }
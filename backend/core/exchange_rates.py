@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import requests
+
+from .config import settings
+from .circuit_breaker import CircuitBreaker
+
+# --- Exchange Rate Provider ---
+# A fetcher takes a base currency code and returns every rate for that base,
+# e.g. {"EUR": 0.92, "GBP": 0.79}. It is pluggable so tests can use a stub.
+
+RateFetcher = Callable[[str], Dict[str, float]]
+
+def fetch_rates_from_api(base_currency: str) -> Dict[str, float]:
+    """Fetches all rates for a base currency from the configured exchange-rate API."""
+    url = settings.EXCHANGE_RATE_API_URL.format(BASE_CURRENCY=base_currency)
+    timeout = min(settings.EXCHANGE_RATE_API_TIMEOUT_SECONDS, settings.FX_LATENCY_BUDGET_SECONDS)
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.json().get('rates', {})
+
+# --- Process-wide Rate Cache ---
+
+class _CachedRates:
+    def __init__(self, rates: Dict[str, float], fetched_at: float):
+        self.rates = rates
+        self.fetched_at = fetched_at
+
+class _Flight:
+    """An in-progress fetch that concurrent callers for the same base wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.rates: Optional[Dict[str, float]] = None
+        self.error: Optional[Exception] = None
+
+class ExchangeRateCache:
+    """
+    Caches full rate tables keyed by base currency.
+
+    One response from the provider contains every quote for its base, so a
+    single fetch serves all target currencies. Entries expire after
+    ttl_seconds; at most max_bases tables are kept (least recently used are
+    evicted). Concurrent misses for the same base share a single fetch.
+    Fetches go through a circuit breaker, so a slow or failing provider is
+    not called again until it recovers. When a refresh fails or the circuit
+    is open, an expired table is served rather than nothing.
+    """
+
+    def __init__(
+        self,
+        fetcher: Optional[RateFetcher] = None,
+        ttl_seconds: Optional[float] = None,
+        max_bases: Optional[int] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.fetcher = fetcher or fetch_rates_from_api
+        self.breaker = breaker or CircuitBreaker(
+            "exchange-rate-api",
+            failure_threshold=settings.FX_BREAKER_FAILURE_THRESHOLD,
+            recovery_seconds=settings.FX_BREAKER_RECOVERY_SECONDS,
+            half_open_max_calls=settings.FX_BREAKER_HALF_OPEN_MAX_CALLS,
+            latency_budget_seconds=settings.FX_LATENCY_BUDGET_SECONDS
+        )
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.FX_CACHE_TTL_SECONDS
+        self.max_bases = max_bases if max_bases is not None else settings.FX_CACHE_MAX_BASES
+        self._tables: "OrderedDict[str, _CachedRates]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "stale_served": 0,
+            "fetches": 0,
+            "fetch_errors": 0,
+            "coalesced": 0
+        }
+
+    def set_fetcher(self, fetcher: RateFetcher) -> None:
+        """Replaces the rate provider (e.g. with a local stub), drops cached tables and closes the circuit."""
+        self.fetcher = fetcher
+        self.breaker.reset()
+        self.clear()
+
+    def peek(self, base_currency: str) -> Optional[Dict[str, float]]:
+        """
+        Returns the cached rates for a base currency if still fresh, without ever
+        fetching. Counted and kept in LRU order like a lookup through get_rates().
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._tables.get(base_currency)
+            if cached and now - cached.fetched_at < self.ttl_seconds:
+                self._counters["hits"] += 1
+                self._tables.move_to_end(base_currency)
+                return cached.rates
+            self._counters["misses"] += 1
+            return None
+
+    def get_rates(self, base_currency: str, force: bool = False) -> Dict[str, float]:
+        """
+        Returns all rates for a base currency, fetching them at most once per TTL.
+        With force=True the provider is asked even if the cached table is fresh.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._tables.get(base_currency)
+            if not force and cached and now - cached.fetched_at < self.ttl_seconds:
+                self._counters["hits"] += 1
+                self._tables.move_to_end(base_currency)
+                return cached.rates
+
+            self._counters["misses"] += 1
+            flight = self._flights.get(base_currency)
+            leader = flight is None
+            if leader:
+                flight = self._flights[base_currency] = _Flight()
+            else:
+                self._counters["coalesced"] += 1
+
+        if leader:
+            self._fetch(base_currency, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is None:
+            return flight.rates
+
+        # The provider failed: fall back to the expired table if there is one,
+        # unless the caller explicitly asked for fresh rates
+        with self._lock:
+            cached = self._tables.get(base_currency)
+            if cached and not force:
+                self._counters["stale_served"] += 1
+                return cached.rates
+        raise flight.error
+
+    def get_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        """Returns the rate from one currency to another, or None if the provider has no such quote."""
+        if from_currency == to_currency:
+            return 1.0
+        return self.get_rates(from_currency).get(to_currency)
+
+    def _fetch(self, base_currency: str, flight: _Flight) -> None:
+        try:
+            rates = self.breaker.call(self.fetcher, base_currency)
+            with self._lock:
+                self._counters["fetches"] += 1
+                self._tables[base_currency] = _CachedRates(rates, time.monotonic())
+                self._tables.move_to_end(base_currency)
+                while len(self._tables) > self.max_bases:
+                    self._tables.popitem(last=False)
+            flight.rates = rates
+        except Exception as e:
+            with self._lock:
+                self._counters["fetch_errors"] += 1
+            flight.error = e
+        finally:
+            with self._lock:
+                self._flights.pop(base_currency, None)
+            flight.done.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                **self._counters,
+                "bases": len(self._tables),
+                "stale_bases": sum(1 for cached in self._tables.values() if now - cached.fetched_at >= self.ttl_seconds),
+                "max_bases": self.max_bases,
+                "ttl_seconds": self.ttl_seconds,
+                "breaker": self.breaker.stats()
+            }
+
+# Single process-wide cache
+exchange_rate_cache = ExchangeRateCache()
@@ -0,0 +1,51 @@
+from typing import Any, Dict, List, Optional, Tuple, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# --- Fast JSON Listings ---
+# With FAST_JSON_LISTINGS on, the expense listings skip Pydantic: each row is
+# copied into a plain dict along the fields of its response schema and the
+# list is encoded with orjson. The default path validates every expense, line
+# and approval twice (into the schema, then against the response_model)
+# before encoding it. `manage benchmark-listings` compares the two paths.
+
+# schema -> [(field name, default, bool / nested schema / None)]
+_plans: Dict[type, List[Tuple[str, Any, Optional[type]]]] = {}
+
+def _plan(schema: type) -> List[Tuple[str, Any, Optional[type]]]:
+    plan = _plans.get(schema)
+    if plan is None:
+        plan = []
+        for name, field in schema.model_fields.items():
+            args = [arg for arg in get_args(field.annotation) if arg is not type(None)]
+            if get_origin(field.annotation) is list and args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+                plan.append((name, field.default, args[0]))
+            elif field.annotation is bool or args == [bool]:
+                # SQL literals such as the archived flag come back as 0/1
+                plan.append((name, field.default, bool))
+            else:
+                plan.append((name, field.default, None))
+        _plans[schema] = plan
+    return plan
+
+def to_dict(row: Any, schema: type) -> Dict[str, Any]:
+    """Copies the fields of schema from an ORM object or a result row, with nested lists, into a dict."""
+    item = {}
+    for name, default, convert in _plan(schema):
+        value = getattr(row, name, default)
+        if convert is bool:
+            value = bool(value) if value is not None else None
+        elif convert is not None:
+            value = [to_dict(child, convert) for child in value]
+        item[name] = value
+    return item
+
+def page_to_dicts(page: Any, schema: type) -> Any:
+    """Replaces the items of a page with dicts; the fields read must be loaded (the listings eager-load them)."""
+    page.items = [to_dict(item, schema) for item in page.items]
+    return page
+
+def json_response(content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=orjson.dumps(content), media_type="application/json", headers=headers)
@@ -0,0 +1,27 @@
+from fastapi import Request, Response, status
+
+# --- Conditional GET ---
+# Reference endpoints send a weak ETag (see db/company_version.py) with
+# "Cache-Control: private, no-cache": the browser keeps the response but
+# revalidates it on every use, and an unchanged version costs a 304 without
+# a body instead of loading and serializing the data again.
+
+CACHE_CONTROL = "private, no-cache"
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match matches etag (weak comparison)."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or _opaque(etag) in {_opaque(candidate) for candidate in candidates}
+
+def set_cache_validators(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,81 @@
+import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models import models
+
+# --- Hot/Cold Archival ---
+# Finalized expenses stop changing, but they would keep growing the tables and
+# indexes that every live query uses. archive_finalized_expenses() moves
+# Approved and Rejected expenses submitted before the archive window, with
+# their lines and approval log, into the *_archive tables in batches.
+#
+# Every expense submitted inside the window stays hot, so listings only read
+# the archive when asked for history older than archive_cutoff().
+
+FINAL_STATUSES = ('Approved', 'Rejected')
+
+# (hot model, archive model, the hot model's expense key)
+_ARCHIVED_TABLES = [
+    (models.Expense, models.ArchivedExpense, models.Expense.expense_id),
+    (models.ExpenseLine, models.ArchivedExpenseLine, models.ExpenseLine.expense_id),
+    (models.ExpenseApproval, models.ArchivedExpenseApproval, models.ExpenseApproval.expense_id),
+]
+
+def archive_cutoff(older_than_days: Optional[int] = None) -> datetime.datetime:
+    """Expenses submitted before this moment are outside the hot window."""
+    days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    return datetime.datetime.utcnow() - datetime.timedelta(days=days)
+
+def archive_expenses(db: Session, expense_ids: List[int]) -> None:
+    """Copies expenses with their lines and approvals to the archive and deletes them from the hot tables (no commit)."""
+    archived_at = datetime.datetime.utcnow()
+    for hot, cold, expense_key in _ARCHIVED_TABLES:
+        columns = [column.name for column in hot.__table__.columns]
+        selected = [hot.__table__.c[name] for name in columns]
+        if cold is models.ArchivedExpense:
+            columns.append('archived_at')
+            selected.append(literal(archived_at, type_=models.ArchivedExpense.archived_at.type))
+        db.execute(insert(cold.__table__).from_select(columns, select(*selected).where(expense_key.in_(expense_ids))))
+
+    # Finalized expenses have no inbox entries; this only guards against stale ones
+    db.query(models.ApprovalInbox).filter(models.ApprovalInbox.expense_id.in_(expense_ids)).delete(synchronize_session=False)
+    for hot, _, expense_key in reversed(_ARCHIVED_TABLES):
+        db.query(hot).filter(expense_key.in_(expense_ids)).delete(synchronize_session=False)
+
+def archive_finalized_expenses(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    company_id: Optional[int] = None,
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    Moves Approved and Rejected expenses submitted more than older_than_days
+    ago (default: ARCHIVE_AFTER_DAYS) to the archive, committing each batch.
+    Returns the number of expenses archived.
+    """
+    cutoff = archive_cutoff(older_than_days)
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    archived = 0
+
+    while True:
+        query = db.query(models.Expense.expense_id).filter(
+            models.Expense.status.in_(FINAL_STATUSES),
+            models.Expense.submission_date < cutoff
+        )
+        if company_id is not None:
+            query = query.filter(models.Expense.company_id == company_id)
+        expense_ids = [expense_id for (expense_id,) in query.order_by(models.Expense.expense_id).limit(batch_size).all()]
+        if not expense_ids:
+            break
+
+        archive_expenses(db, expense_ids)
+        db.commit()
+        archived += len(expense_ids)
+        print(f"Archived {archived} expense(s) so far")
+
+    print(f"Expense archival: {archived} finalized expense(s) submitted before {cutoff:%Y-%m-%d} archived")
+    return archived
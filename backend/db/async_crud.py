@@ -0,0 +1,211 @@
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import models, schemas
+from .crud import (
+    APPROVAL_COUNTERS, NOT_AUTHORIZED, _advance_expense, _already_approved_query, _auto_approved, _batch_query,
+    _count_approval, _decision_error, _decision_result, _inbox_changes, _inbox_queries, _initial_state,
+    _listing_rows, _new_approval, _new_approval_rule, _new_expense, _pending_approvals_query, _rule_allows,
+    _user_expense_queries, conversion_columns, conversion_deferred
+)
+from .pagination import Page, make_page
+from .rate_store import currency_converter, exchange_rate_refresher, find_rate_async, is_provisional, rate_date_for_lines
+from .rule_cache import rule_cache
+from .unit_of_work import async_unit_of_work
+
+# --- Async CRUD ---
+# The request paths that run on every submission, listing and approval, on an
+# AsyncSession: each query is awaited on the async connection instead of
+# running the sync functions of crud.py through run_sync. Both share the
+# statement builders and the workflow logic in crud.py, so they cannot drift
+# apart; crud.py stays the API of scripts, workers and manage.py.
+
+# --- EXPENSES ---
+
+async def get_exchange_rate(
+    db: AsyncSession,
+    from_currency: str,
+    to_currency: str,
+    on_date: Optional[str] = None
+) -> Tuple[Optional[float], bool]:
+    """crud.get_exchange_rate() on an async session."""
+    if from_currency == to_currency:
+        return 1.0, False
+
+    found = await find_rate_async(db, from_currency, to_currency, on_date)
+    if found is None:
+        exchange_rate_refresher.request(from_currency, to_currency)
+        return None, False
+
+    return found.rate, is_provisional(found, on_date)
+
+async def initial_expense_state(db: AsyncSession, employee: Optional[models.User]) -> Dict:
+    """Status and workflow columns of a new expense submitted by employee."""
+    needs_rule = employee and employee.approval_rule_id and not _auto_approved(employee)
+    return _initial_state(employee, await rule_cache.get_async(db, employee.approval_rule_id) if needs_rule else None)
+
+async def create_expense(
+    db: AsyncSession,
+    expense: schemas.ExpenseCreate,
+    employee_id: int,
+    company_id: int,
+    total_amount_local: float
+) -> models.Expense:
+    """Creates a new expense claim and its lines, converted into the company currency."""
+    employee = await db.get(models.User, employee_id)
+    company = await db.get(models.Company, company_id)
+
+    if not company:
+        raise ValueError("Company not found")
+
+    if conversion_deferred(expense.local_currency_code, company.default_currency_code):
+        # Converted after commit by the currency converter
+        rate = (None, False)
+    else:
+        rate = await get_exchange_rate(
+            db, expense.local_currency_code, company.default_currency_code, rate_date_for_lines(expense.expense_lines)
+        )
+    conversion = conversion_columns(total_amount_local, *rate)
+
+    db_expense = _new_expense(
+        expense, employee_id, company_id, total_amount_local, conversion, await initial_expense_state(db, employee)
+    )
+
+    async with async_unit_of_work(db):
+        db.add(db_expense)
+        await db.flush()
+        if db_expense.status == 'Pending':
+            await sync_approval_inbox(db, [db_expense.expense_id])
+
+    if conversion["exchange_rate"] is None:
+        currency_converter.notify()
+
+    return db_expense
+
+async def get_user_expenses(db: AsyncSession, user_id: int, params: Optional[schemas.ExpenseListParams] = None) -> Page:
+    """crud.get_user_expenses() on an async session."""
+    params = params or schemas.ExpenseListParams()
+    sort = params.sort or 'desc'
+
+    expenses = []
+    for query in _user_expense_queries(user_id, params, sort):
+        expenses += _listing_rows(await db.execute(query), params)
+    return make_page(expenses, params, sort)
+
+# --- APPROVAL RULES ---
+
+async def create_approval_rule(
+    db: AsyncSession,
+    rule_data: schemas.ApprovalRuleCreate,
+    company_id: int
+) -> models.ApprovalRule:
+    """Creates a new approval rule with required and normal approvers."""
+    db_rule = _new_approval_rule(rule_data, company_id)
+
+    async with async_unit_of_work(db):
+        db.add(db_rule)
+        await db.flush()
+
+    return db_rule
+
+# --- APPROVALS ---
+
+async def sync_approval_inbox(db: AsyncSession, expense_ids: List[int]) -> None:
+    """crud.sync_approval_inbox() on an async session."""
+    await db.flush()
+
+    progress_query, inbox_query = _inbox_queries(expense_ids)
+    stale, added = _inbox_changes((await db.execute(progress_query)).all(), (await db.execute(inbox_query)).scalars().all())
+    for entry in stale:
+        await db.delete(entry)
+    db.add_all(added)
+
+async def get_pending_approvals_for_user(db: AsyncSession, user_id: int, params: Optional[schemas.ExpenseListParams] = None) -> Page:
+    """crud.get_pending_approvals_for_user() on an async session."""
+    params = params or schemas.ExpenseListParams()
+    sort = params.sort or 'asc'
+    return make_page(_listing_rows(await db.execute(_pending_approvals_query(user_id, params, sort)), params), params, sort)
+
+async def can_user_act_on_expense(db: AsyncSession, expense: models.Expense, user_id: int) -> bool:
+    """crud.can_user_act_on_expense() on an async session."""
+    if expense.status != 'Pending':
+        return False
+
+    employee = await db.get(models.User, expense.employee_id)
+    rule = await rule_cache.get_async(db, employee.approval_rule_id) if employee else None
+    if not rule or (await db.execute(_already_approved_query(expense.expense_id, user_id))).scalar():
+        return False
+    return _rule_allows(expense, rule, user_id)
+
+async def _apply_expense_approval(
+    db: AsyncSession,
+    expense: models.Expense,
+    approver_id: int,
+    status: str,
+    comments: Optional[str] = None
+) -> models.ExpenseApproval:
+    """crud._apply_expense_approval() on an async session."""
+    db_approval = _new_approval(expense, approver_id, status, comments)
+    db.add(db_approval)
+
+    if status == 'Approved':
+        employee = await db.get(models.User, expense.employee_id)
+        rule = await rule_cache.get_async(db, employee.approval_rule_id) if employee else None
+
+        if not rule:
+            # No approval rule, mark as approved
+            expense.status = 'Approved'
+        else:
+            await db.execute(_count_approval(expense, rule, approver_id))
+            await db.refresh(expense, APPROVAL_COUNTERS)
+            _advance_expense(expense, rule)
+
+    await db.flush()
+    return db_approval
+
+async def create_expense_approval(
+    db: AsyncSession,
+    expense_id: int,
+    approver_id: int,
+    status: str,
+    comments: Optional[str] = None
+) -> models.ExpenseApproval:
+    """Create an approval record and advance the expense, in one transaction (see crud.create_expense_approval)."""
+    expense = await db.get(models.Expense, expense_id)
+
+    async with async_unit_of_work(db):
+        db_approval = await _apply_expense_approval(db, expense, approver_id, status, comments)
+        await sync_approval_inbox(db, [expense_id])
+    return db_approval
+
+async def apply_approval_batch(
+    db: AsyncSession,
+    approver_id: int,
+    decisions: List[schemas.ApprovalDecision]
+) -> List[schemas.ApprovalDecisionResult]:
+    """crud.apply_approval_batch() on an async session."""
+    # The employees are prefetched with the expenses (see _batch_query())
+    expenses = {expense.expense_id: expense for expense in (await db.execute(_batch_query(decisions))).scalars().all()}
+
+    results = []
+    touched = []
+    async with async_unit_of_work(db):
+        for decision in decisions:
+            expense = expenses.get(decision.expense_id)
+            comments = decision.comments.strip() if decision.comments else None
+
+            detail = _decision_error(expense, decision, comments)
+            if detail is None and not await can_user_act_on_expense(db, expense, approver_id):
+                detail = NOT_AUTHORIZED
+            if detail is None:
+                approval = await _apply_expense_approval(db, expense, approver_id, decision.decision, comments)
+                touched.append(expense.expense_id)
+                results.append(_decision_result(expense, approval))
+            else:
+                results.append(schemas.ApprovalDecisionResult(expense_id=decision.expense_id, success=False, detail=detail))
+
+        if touched:
+            await sync_approval_inbox(db, touched)
+
+    return results
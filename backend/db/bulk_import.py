@@ -0,0 +1,269 @@
+import asyncio
+import csv
+import datetime
+import json
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import settings
+from ..models import models, schemas
+from . import async_crud, crud, tenancy
+from .rate_store import currency_converter
+from .unit_of_work import async_unit_of_work
+
+# --- Bulk Expense Import ---
+# Loads a file of expense lines (e.g. a corporate card feed) into one company.
+# Rows are validated in chunks and grouped into claims: lines with the same
+# employee, claim_ref and currency become one expense, and a line without a
+# claim_ref is a claim of its own. A claim with an invalid line is rejected as
+# a whole, so no expense is created with part of its lines. Claims are
+# converted like submitted expenses: queued for the currency converter with
+# FX_DEFERRED_CONVERSION or while no rate is known, else at a rate looked up
+# once per currency and date.
+# The file is read and validated in a worker thread; the claims are then
+# written on the async session IMPORT_BATCH_SIZE at a time with multi-row
+# INSERTs, one transaction per batch. Rows that cannot be imported are reported with
+# their row number; the rest of the file is kept.
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+@dataclass
+class _Claim:
+    employee: models.User
+    claim_ref: Optional[str]
+    currency: str
+    description: Optional[str]
+    rows: List[int] = field(default_factory=list)
+    lines: List[schemas.ExpenseImportRow] = field(default_factory=list)
+
+def read_rows(stream: IO[str], format: str) -> Iterator[Tuple[int, object]]:
+    """Yields (row number, fields) from a CSV or NDJSON text stream; blank CSV cells become None."""
+    if format == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            yield number, {key: value if value != '' else None for key, value in row.items() if key}
+        return
+
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+@dataclass
+class _Report:
+    """The rejected rows of an import, of which the first IMPORT_MAX_REPORTED_ERRORS are detailed."""
+    errors: List[schemas.ExpenseImportError] = field(default_factory=list)
+    error_count: int = 0
+
+    def reject(self, rows: List[int], detail: str, claim_ref: Optional[str] = None) -> None:
+        for number in rows:
+            self.error_count += 1
+            if len(self.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+                self.errors.append(schemas.ExpenseImportError(row=number, claim_ref=claim_ref, detail=detail))
+
+def read_claims(
+    stream: IO[str],
+    format: str,
+    users: List[models.User],
+    category_ids: Set[int],
+    report: _Report
+) -> Tuple[List[_Claim], int]:
+    """
+    Reads, validates and groups the rows of a stream into claims of the
+    company's users. Invalid rows, and every line of a claim with an invalid
+    line, are rejected in report. Returns the claims and the number of rows read.
+    Needs no database, so it can run in a worker thread.
+    """
+    users_by_id = {user.user_id: user for user in users}
+    users_by_email = {user.email.lower(): user for user in users}
+
+    def find_employee(employee_id, employee_email) -> Optional[models.User]:
+        if employee_id is not None:
+            try:
+                return users_by_id.get(int(employee_id))
+            except (TypeError, ValueError):
+                return None
+        return users_by_email.get(str(employee_email or '').lower())
+
+    claims: Dict[Tuple[int, str, str], _Claim] = {}
+    # (employee id, claim_ref) of claims with an invalid line; employee None when it is unknown too
+    invalid_claims: Dict[Tuple[Optional[int], str], int] = {}
+
+    def reject_line(number: int, fields: dict, detail: str) -> None:
+        claim_ref = fields.get('claim_ref')
+        if claim_ref is None or claim_ref == '':
+            report.reject([number], detail)
+            return
+        claim_ref = str(claim_ref)
+        employee = find_employee(fields.get('employee_id'), fields.get('employee_email'))
+        invalid_claims.setdefault((employee.user_id if employee else None, claim_ref), number)
+        report.reject([number], detail, claim_ref)
+
+    def validate_chunk(chunk: List[Tuple[int, object]]) -> None:
+        for number, fields in chunk:
+            if not isinstance(fields, dict):
+                report.reject([number], "Not a JSON object")
+                continue
+            try:
+                row = schemas.ExpenseImportRow.model_validate(fields)
+            except ValidationError as e:
+                reject_line(number, fields, _validation_detail(e))
+                continue
+
+            employee = find_employee(row.employee_id, row.employee_email)
+            if employee is None:
+                reject_line(number, fields, "Unknown employee in this company (employee_id or employee_email)")
+                continue
+            currency = row.currency.strip().upper()
+            if len(currency) != 3 or not currency.isalpha():
+                reject_line(number, fields, f"Invalid currency code '{row.currency}'")
+                continue
+            if row.category_id is not None and row.category_id not in category_ids:
+                reject_line(number, fields, f"Unknown category {row.category_id}")
+                continue
+
+            key = (employee.user_id, row.claim_ref if row.claim_ref is not None else f"#{number}", currency)
+            claim = claims.get(key)
+            if claim is None:
+                claim = claims[key] = _Claim(
+                    employee=employee, claim_ref=row.claim_ref, currency=currency, description=row.claim_description
+                )
+            claim.rows.append(number)
+            claim.lines.append(row)
+
+    rows_read = 0
+    chunk = []
+    for item in read_rows(stream, format):
+        rows_read += 1
+        chunk.append(item)
+        if len(chunk) >= settings.IMPORT_BATCH_SIZE:
+            validate_chunk(chunk)
+            chunk = []
+    validate_chunk(chunk)
+
+    # A claim is imported with all of its lines or not at all
+    for key, claim in list(claims.items()):
+        if claim.claim_ref is None:
+            continue
+        invalid_row = invalid_claims.get((claim.employee.user_id, claim.claim_ref), invalid_claims.get((None, claim.claim_ref)))
+        if invalid_row is not None:
+            report.reject(claim.rows, f"Not imported: claim '{claim.claim_ref}' has an invalid line (row {invalid_row})", claim.claim_ref)
+            del claims[key]
+
+    return list(claims.values()), rows_read
+
+async def import_expenses(db: AsyncSession, company_id: int, stream: IO[str], format: str) -> schemas.ExpenseImportResult:
+    """Imports the expense lines of a CSV or NDJSON stream into a company; returns the import report."""
+    company = await db.get(models.Company, company_id)
+    if not company:
+        raise ValueError("Company not found")
+    company_currency = company.default_currency_code
+
+    users = (await db.execute(select(models.User).where(models.User.company_id == company_id))).scalars().all()
+    category_ids = set((await db.execute(
+        select(models.ExpenseCategory.category_id).where(models.ExpenseCategory.company_id == company_id)
+    )).scalars().all())
+
+    # --- Validation and grouping: CPU work, kept off the event loop ---
+    report = _Report()
+    claims, rows_read = await asyncio.to_thread(read_claims, stream, format, users, category_ids, report)
+
+    # --- Workflow state per employee, read before a failed batch can roll back and expire the users ---
+    states: Dict[int, dict] = {}
+    for claim in claims:
+        if claim.employee.user_id not in states:
+            states[claim.employee.user_id] = {"next_normal_sequence": None, **await async_crud.initial_expense_state(db, claim.employee)}
+    employee_ids = [claim.employee.user_id for claim in claims]
+
+    # --- Currency conversion: rates looked up once per currency and date ---
+    rates: Dict[Tuple[str, Optional[str]], Tuple[Optional[float], bool]] = {}
+
+    async def conversion_for(claim: _Claim, total: float) -> dict:
+        if crud.conversion_deferred(claim.currency, company_currency):
+            # Converted after commit by the currency converter, as in create_expense
+            return crud.conversion_columns(total, None, False)
+        dates = [line.date for line in claim.lines if line.date is not None]
+        on_date = max(dates).isoformat() if dates else None
+        if (claim.currency, on_date) not in rates:
+            rates[(claim.currency, on_date)] = await async_crud.get_exchange_rate(db, claim.currency, company_currency, on_date)
+        # Without a known rate the claim is queued for the currency converter too
+        return crud.conversion_columns(total, *rates[(claim.currency, on_date)])
+
+    # --- Batched inserts ---
+    claims_created = rows_imported = deferred = 0
+
+    for start in range(0, len(claims), settings.IMPORT_BATCH_SIZE):
+        batch = claims[start:start + settings.IMPORT_BATCH_SIZE]
+        submitted = datetime.datetime.utcnow()
+        expense_rows = []
+        for employee_id, claim in zip(employee_ids[start:], batch):
+            total = sum(line.amount for line in claim.lines)
+            expense_rows.append({
+                "employee_id": employee_id,
+                "company_id": company_id,
+                "submission_date": submitted,
+                "description": claim.description,
+                "total_amount_local": total,
+                "local_currency_code": claim.currency,
+                **await conversion_for(claim, total),
+                "required_approvals_done": 0,
+                "normal_approvals_done": 0,
+                **states[employee_id]
+            })
+
+        try:
+            async with async_unit_of_work(db):
+                # Core inserts with ids from the directory (see tenancy.py): the ORM's bulk
+                # layer would cost more than the SQL here
+                expense_ids = await tenancy.allocate_ids_async(db, models.Expense.__tablename__, len(batch))
+                await db.execute(insert(models.Expense.__table__), [
+                    {"expense_id": expense_id, **row} for expense_id, row in zip(expense_ids, expense_rows)
+                ])
+                lines = [(expense_id, line) for expense_id, claim in zip(expense_ids, batch) for line in claim.lines]
+                line_ids = await tenancy.allocate_ids_async(db, models.ExpenseLine.__tablename__, len(lines))
+                await db.execute(insert(models.ExpenseLine.__table__), [
+                    {
+                        "line_id": line_id,
+                        "expense_id": expense_id,
+                        "category_id": line.category_id,
+                        "vendor_name": line.vendor_name,
+                        "date": line.date.isoformat() if line.date else None,
+                        "amount_local": line.amount,
+                        "description": line.description,
+                        "receipt_url": line.receipt_url,
+                        "expense_type": line.expense_type
+                    }
+                    for line_id, (expense_id, line) in zip(line_ids, lines)
+                ])
+                pending = [expense_id for expense_id, row in zip(expense_ids, expense_rows) if row["status"] == 'Pending']
+                if pending:
+                    await async_crud.sync_approval_inbox(db, pending)
+        except SQLAlchemyError as e:
+            report.reject([number for claim in batch for number in claim.rows], f"Not imported: {e.__class__.__name__}")
+            continue
+
+        claims_created += len(batch)
+        rows_imported += sum(len(claim.lines) for claim in batch)
+        deferred += sum(1 for row in expense_rows if row["exchange_rate"] is None)
+
+    if deferred:
+        currency_converter.notify()
+    return schemas.ExpenseImportResult(
+        rows_read=rows_read,
+        rows_imported=rows_imported,
+        claims_created=claims_created,
+        error_count=report.error_count,
+        errors=sorted(report.errors, key=lambda error: error.row)
+    )
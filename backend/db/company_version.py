@@ -0,0 +1,76 @@
+from typing import Optional, Tuple
+
+from sqlalchemy import event, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import models
+
+# --- Company Data Version ---
+# The company record, its users and its approval rules are reference data:
+# read on almost every page load, changed rarely. companies.data_version is
+# bumped in the same transaction as any ORM write to them, so every process
+# sees a new version as soon as the change commits. The rule cache
+# (rule_cache.py) validates compiled rules against it, and it is the
+# validator of the ETags on the reference endpoints: a client that still
+# holds the current version gets a 304 after a single primary-key lookup.
+# database.py registers the listeners for every session with register_listeners().
+
+def _record_company_write(mapper, connection, target) -> None:
+    session = Session.object_session(target)
+    if session is None:
+        return
+    changed = session.info.setdefault("changed_company_data", (set(), set()))
+    if isinstance(target, (models.RuleRequiredApprover, models.RuleNormalApprover)):
+        changed[1].add(target.rule_id)
+    else:
+        changed[0].add(target.company_id)
+
+def _bump_company_versions(session: Session, flush_context) -> None:
+    company_ids, rule_ids = session.info.pop("changed_company_data", (set(), set()))
+    if not company_ids and not rule_ids:
+        return
+    rules_company = select(models.ApprovalRule.company_id).where(models.ApprovalRule.rule_id.in_(rule_ids))
+    session.connection().execute(
+        update(models.Company)
+        .where(or_(models.Company.company_id.in_(company_ids), models.Company.company_id.in_(rules_company)))
+        .values(data_version=models.Company.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop("changed_company_data", None)
+
+# (target, event, listener) registered by register_listeners()
+LISTENERS = [
+    (model, event_name, _record_company_write)
+    for model in (models.Company, models.User, models.ApprovalRule, models.RuleRequiredApprover, models.RuleNormalApprover)
+    for event_name in ("after_insert", "after_update", "after_delete")
+] + [
+    (Session, "after_flush", _bump_company_versions),
+    (Session, "after_rollback", _forget_after_rollback),
+]
+
+def register_listeners() -> None:
+    """Bumps the data version on every ORM write to a company's reference data. Safe to call again."""
+    for target, event_name, listener in LISTENERS:
+        if not event.contains(target, event_name, listener):
+            event.listen(target, event_name, listener)
+
+def _user_company_version_query(user_id: int):
+    return select(models.User, models.Company.data_version).join(
+        models.Company, models.Company.company_id == models.User.company_id
+    ).where(models.User.user_id == user_id)
+
+def get_user_company_version(db: Session, user_id: int) -> Optional[Tuple[models.User, int]]:
+    """Returns the user with the current data version of the user's company, in one query."""
+    row = db.execute(_user_company_version_query(user_id)).first()
+    return (row[0], row[1]) if row else None
+
+async def get_user_company_version_async(db: AsyncSession, user_id: int) -> Optional[Tuple[models.User, int]]:
+    """get_user_company_version() on an async session."""
+    row = (await db.execute(_user_company_version_query(user_id))).first()
+    return (row[0], row[1]) if row else None
+
+def company_etag(company_id: int, data_version: int) -> str:
+    return f'W/"company-{company_id}-v{data_version}"'
@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .rate_store import find_rate
+
+# --- Batch Currency Conversion ---
+# Reports convert many amounts into one reporting currency. Instead of
+# looking up a rate per row, the distinct source currencies are resolved once
+# and all amounts are converted in a single vectorized pass.
+
+@dataclass
+class ConversionResult:
+    to_currency: str
+    converted: np.ndarray # One converted amount per input row (NaN where no rate is known)
+    total: float # Sum of the convertible rows
+    subtotals: Dict[str, float] # Converted sum per source currency
+    rates: Dict[str, float] # Rate used per source currency
+    missing: List[str] = field(default_factory=list) # Source currencies without a known rate
+
+def convert_amounts(
+    db: Session,
+    amounts: Union[np.ndarray, Sequence[float]],
+    currencies: Union[np.ndarray, Sequence[str]],
+    to_currency: str,
+    on_date: Optional[str] = None
+) -> ConversionResult:
+    """
+    Converts a column of amounts, each in the currency at the same position
+    of currencies, into to_currency. Rates come from the local rate store
+    (see rate_store.find_rate) and are looked up once per distinct currency.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    currencies = np.asarray(currencies, dtype=object)
+    if amounts.shape != currencies.shape:
+        raise ValueError("amounts and currencies must have the same length")
+
+    if amounts.size == 0:
+        return ConversionResult(to_currency, amounts, 0.0, {}, {})
+
+    codes, positions = np.unique(currencies.astype(str), return_inverse=True)
+
+    rates = np.full(len(codes), np.nan)
+    missing = []
+    for i, code in enumerate(codes):
+        found = find_rate(db, code, to_currency, on_date)
+        if found is None:
+            missing.append(code)
+        else:
+            rates[i] = found.rate
+
+    converted = amounts * rates[positions]
+    subtotals = np.bincount(positions, weights=np.nan_to_num(converted), minlength=len(codes))
+
+    return ConversionResult(
+        to_currency=to_currency,
+        converted=converted,
+        total=float(np.nansum(converted)),
+        subtotals={code: float(subtotals[i]) for i, code in enumerate(codes) if code not in missing},
+        rates={code: float(rates[i]) for i, code in enumerate(codes) if code not in missing},
+        missing=missing
+    )
+
+def convert_expenses(
+    db: Session,
+    expenses: Iterable[models.Expense],
+    to_currency: str,
+    on_date: Optional[str] = None
+) -> ConversionResult:
+    """Converts the local totals of expense rows (or rows with the same two columns) into to_currency."""
+    amounts = []
+    currencies = []
+    for expense in expenses:
+        amounts.append(expense.total_amount_local)
+        currencies.append(expense.local_currency_code)
+    return convert_amounts(db, amounts, currencies, to_currency, on_date)
@@ -1,8 +1,7 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from typing import Optional, List
+from sqlalchemy import select, union, exists, func, literal, update
+from sqlalchemy.orm import Session, aliased, selectinload
+from typing import Optional, List, Tuple
 import datetime
-import requests
 from typing import Dict
 
 # Import ORM Models from the Canvas
@@ -11,6 +10,17 @@ from ..models import models
 from ..models import schemas
 # Import security utilities for hashing
 from ..core.security import get_password_hash
+# Compiled approval rules
+from .rule_cache import rule_cache, normal_approvals_needed
+# One commit per write operation
+from .unit_of_work import unit_of_work
+# Archived finalized expenses
+from .archive import archive_cutoff
+# Keyset pagination of expense listings
+from .pagination import Page, filter_expenses, make_page, page_query
+# Locally stored exchange rates
+from .rate_store import find_rate, is_provisional, rate_date_for_lines, exchange_rate_refresher, currency_converter
+from ..core.config import settings
 
 # --- COMPANY CRUD ---
 
@@ -20,9 +30,9 @@ def create_company(db: Session, company: schemas.CompanyBase) -> models.Company:
         name=company.name,
         default_currency_code=company.default_currency_code
     )
-    db.add(db_company)
-    db.commit()
-    db.refresh(db_company)
+    with unit_of_work(db):
+        db.add(db_company)
+        db.flush()
     return db_company
 
 # --- USER CRUD ---
@@ -57,23 +67,10 @@ def create_user(
         hashed_password=hashed_password
     )
     
-    # Debug logging
-    print(f"CRUD: Creating user with manager_id={manager_id}, is_manager_approver={is_manager_approver}")
-    
-    try:
+    with unit_of_work(db):
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        print(f"CRUD: User created successfully - ID: {db_user.user_id}, Manager: {db_user.manager_id}")
-        return db_user
-    except IntegrityError as e:
-        db.rollback()
-        print(f"CRUD: Database integrity error: {e}")
-        raise
-    except Exception as e:
-        db.rollback()
-        print(f"CRUD: Unexpected error during user creation: {e}")
-        raise
+        db.flush()
+    return db_user
 
 def create_initial_admin_and_company(
     db: Session, 
@@ -83,125 +80,121 @@ def create_initial_admin_and_company(
     company_name: str, 
     currency_code: str
 ) -> tuple[models.Company, models.User]:
-    """Handles the first sign-up case: auto-creates a Company and an Admin User."""
-    
-    # 1. Create Company
-    company_schema = schemas.CompanyBase(name=company_name, default_currency_code=currency_code)
-    db_company = create_company(db, company_schema)
+    """Handles the first sign-up case: auto-creates a Company and an Admin User in one transaction."""
     
-    # 2. Create Admin User
     hashed_password = get_password_hash(password)
-    admin_schema = schemas.UserCreate(
-        email=admin_email, 
-        name=admin_name, 
-        role='Admin', 
-        manager_id=None, 
-        is_manager_approver=False
-    )
-    db_admin = create_user(
-        db, 
-        user=admin_schema, 
-        company_id=db_company.company_id, 
-        hashed_password=hashed_password
-    )
+    with unit_of_work(db):
+        # 1. Create Company
+        company_schema = schemas.CompanyBase(name=company_name, default_currency_code=currency_code)
+        db_company = create_company(db, company_schema)
+        
+        # 2. Create Admin User
+        admin_schema = schemas.UserCreate(
+            email=admin_email, 
+            name=admin_name, 
+            role='Admin', 
+            manager_id=None, 
+            is_manager_approver=False
+        )
+        db_admin = create_user(
+            db, 
+            user=admin_schema, 
+            company_id=db_company.company_id, 
+            hashed_password=hashed_password
+        )
     
     return db_company, db_admin
 
 # --- EXPENSE CRUD (Example) ---
 
-def get_exchange_rate(from_currency: str, to_currency: str) -> float:
-    """Fetch exchange rate from external API."""
+def get_exchange_rate(
+    db: Session,
+    from_currency: str,
+    to_currency: str,
+    on_date: Optional[str] = None
+) -> Tuple[Optional[float], bool]:
+    """
+    Get the exchange rate from locally stored rates (memory or database).
+    Never calls the provider: a missing rate is requested from the background
+    refresher and None is returned, so the expense is left unconverted for
+    the currency converter.
+
+    Returns (rate, provisional). A rate is provisional when it is older than
+    on_date (or today), e.g. the last known rate while the provider's circuit
+    is open; such expenses are re-priced later.
+    """
     if from_currency == to_currency:
-        return 1.0
+        return 1.0, False
     
-    try:
-        # Using the specified API format
-        url = f"https://api.exchangerate-api.com/v4/latest/{from_currency}"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            rates = data.get('rates', {})
-            
-            if to_currency in rates:
-                rate = rates[to_currency]
-                print(f"Exchange rate fetched: 1 {from_currency} = {rate} {to_currency}")
-                return rate
-            else:
-                print(f"Warning: {to_currency} not found in rates, using 1.0")
-                return 1.0
-        else:
-            print(f"Warning: API returned status {response.status_code}, using 1.0")
-            return 1.0
-        
-    except requests.exceptions.Timeout:
-        print(f"Error: Exchange rate API timeout, using 1.0")
-        return 1.0
-    except Exception as e:
-        print(f"Error fetching exchange rate: {e}, using 1.0")
-        return 1.0
+    found = find_rate(db, from_currency, to_currency, on_date)
+    if found is None:
+        exchange_rate_refresher.request(from_currency, to_currency)
+        return None, False
+    
+    return found.rate, is_provisional(found, on_date)
 
-def create_expense(
-    db: Session, 
-    expense: schemas.ExpenseCreate, 
-    employee_id: int, 
+def conversion_deferred(local_currency_code: str, company_currency_code: str) -> bool:
+    """True when a new expense is left unconverted for the currency converter (FX_DEFERRED_CONVERSION)."""
+    return local_currency_code != company_currency_code and settings.FX_DEFERRED_CONVERSION
+
+def conversion_columns(total_amount_local: float, exchange_rate: Optional[float], rate_provisional: bool) -> Dict:
+    """Conversion columns of a new expense; without a rate it is left for the currency converter."""
+    return {
+        "exchange_rate": exchange_rate,
+        "total_amount_company_currency": total_amount_local * exchange_rate if exchange_rate is not None else None,
+        "rate_provisional": rate_provisional
+    }
+
+def _auto_approved(employee: Optional[models.User]) -> bool:
+    return bool(employee and employee.role == 'Admin')
+
+def _initial_state(employee: Optional[models.User], rule) -> Dict:
+    # Check if employee is Admin - auto-approve
+    if _auto_approved(employee):
+        return {
+            "status": 'Approved',
+            "current_approval_step": 0,
+            "current_flow_rule_id": None
+        }
+    # With an approval rule the expense goes straight to Pending
+    return {
+        "status": 'Pending' if employee and employee.approval_rule_id else 'Submitted',
+        "current_approval_step": 1,
+        "current_flow_rule_id": employee.approval_rule_id if employee else None,
+        "next_normal_sequence": rule.next_normal_sequence(0) if rule else None
+    }
+
+def initial_expense_state(db: Session, employee: Optional[models.User]) -> Dict:
+    """Status and workflow columns of a new expense submitted by employee."""
+    needs_rule = employee and employee.approval_rule_id and not _auto_approved(employee)
+    return _initial_state(employee, rule_cache.get(db, employee.approval_rule_id) if needs_rule else None)
+
+def _new_expense(
+    expense: schemas.ExpenseCreate,
+    employee_id: int,
     company_id: int,
     total_amount_local: float,
-    exchange_rate: float = 1.0,
-    total_amount_company_currency: Optional[float] = None
+    conversion: Dict,
+    state: Dict
 ) -> models.Expense:
-    """Creates a new expense claim and its lines."""
-    
-    # Get employee's details and company's currency
-    employee = db.query(models.User).filter(models.User.user_id == employee_id).first()
-    company = db.query(models.Company).filter(models.Company.company_id == company_id).first()
-    
-    if not company:
-        raise ValueError("Company not found")
-    
-    # Fetch exchange rate if currencies are different
-    if expense.local_currency_code != company.default_currency_code:
-        exchange_rate = get_exchange_rate(expense.local_currency_code, company.default_currency_code)
-        total_amount_company_currency = total_amount_local * exchange_rate
-        print(f"Currency conversion: {total_amount_local} {expense.local_currency_code} = {total_amount_company_currency:.2f} {company.default_currency_code} (rate: {exchange_rate})")
-    else:
-        exchange_rate = 1.0
-        total_amount_company_currency = total_amount_local
-        print(f"Same currency: {total_amount_local} {expense.local_currency_code}")
-    
-    # Check if employee is Admin - auto-approve
-    if employee and employee.role == 'Admin':
-        db_expense = models.Expense(
-            employee_id=employee_id,
-            company_id=company_id,
-            submission_date=datetime.datetime.utcnow(),
-            description=expense.description,
-            status='Approved',
-            total_amount_local=total_amount_local,
-            local_currency_code=expense.local_currency_code,
-            exchange_rate=exchange_rate,
-            total_amount_company_currency=total_amount_company_currency,
-            current_approval_step=0,
-            current_flow_rule_id=None
-        )
-    else:
-        db_expense = models.Expense(
-            employee_id=employee_id,
-            company_id=company_id,
-            submission_date=datetime.datetime.utcnow(),
-            description=expense.description,
-            status='Submitted',
-            total_amount_local=total_amount_local,
-            local_currency_code=expense.local_currency_code,
-            exchange_rate=exchange_rate,
-            total_amount_company_currency=total_amount_company_currency,
-            current_approval_step=1,
-            current_flow_rule_id=employee.approval_rule_id if employee else None
-        )
+    """A new, unsaved expense with its lines."""
+    db_expense = models.Expense(
+        employee_id=employee_id,
+        company_id=company_id,
+        submission_date=datetime.datetime.utcnow(),
+        description=expense.description,
+        total_amount_local=total_amount_local,
+        local_currency_code=expense.local_currency_code,
+        **conversion,
+        **state
+    )
     
+    # A new expense has no approvals; an initialized collection needs no load when serialized
+    db_expense.expense_approvals = []
+
     # Add expense lines
     for line_data in expense.expense_lines:
-        db_line = models.ExpenseLine(
+        models.ExpenseLine(
             category_id=line_data.category_id,
             vendor_name=line_data.vendor_name,
             date=line_data.date,
@@ -211,388 +204,659 @@ def create_expense(
             expense_type=line_data.expense_type,
             expense=db_expense
         )
-        db.add(db_line)
+    return db_expense
 
-    db.add(db_expense)
-    db.commit()
-    db.refresh(db_expense)
+def create_expense(
+    db: Session, 
+    expense: schemas.ExpenseCreate, 
+    employee_id: int, 
+    company_id: int,
+    total_amount_local: float
+) -> models.Expense:
+    """Creates a new expense claim and its lines, converted into the company currency."""
     
-    # If expense has approval rule and not Admin, set status to Pending
-    if employee and employee.role != 'Admin' and employee.approval_rule_id:
-        db_expense.status = 'Pending'
-        db.commit()
-        db.refresh(db_expense)
+    # Get employee's details and company's currency
+    employee = db.get(models.User, employee_id)
+    company = db.get(models.Company, company_id)
     
-    print(f"Expense created: ID={db_expense.expense_id}, Status={db_expense.status}, Rule ID={db_expense.current_flow_rule_id}")
-    print(f"  Local: {db_expense.total_amount_local} {db_expense.local_currency_code}")
-    print(f"  Company: {db_expense.total_amount_company_currency:.2f} {company.default_currency_code} (rate: {db_expense.exchange_rate})")
+    if not company:
+        raise ValueError("Company not found")
     
-    return db_expense
+    if conversion_deferred(expense.local_currency_code, company.default_currency_code):
+        # Converted after commit by the currency converter
+        rate = (None, False)
+    else:
+        rate = get_exchange_rate(
+            db, expense.local_currency_code, company.default_currency_code, rate_date_for_lines(expense.expense_lines)
+        )
+    conversion = conversion_columns(total_amount_local, *rate)
+    
+    db_expense = _new_expense(
+        expense, employee_id, company_id, total_amount_local, conversion, initial_expense_state(db, employee)
+    )
 
-def get_user_expenses(db: Session, user_id: int) -> List[models.Expense]:
-    """Retrieves all expenses submitted by a specific user."""
-    return db.query(models.Expense).filter(models.Expense.employee_id == user_id).all()
-def create_approval_rule(
-    db: Session, 
-    rule_data: schemas.ApprovalRuleCreate, 
-    company_id: int
-) -> models.ApprovalRule:
-    """Creates a new approval rule with required and normal approvers."""
+    with unit_of_work(db):
+        db.add(db_expense)
+        db.flush()
+        if db_expense.status == 'Pending':
+            sync_approval_inbox(db, [db_expense.expense_id])
+    
+    if conversion["exchange_rate"] is None:
+        currency_converter.notify()
     
-    # Create the approval rule first
-    db_rule = models.ApprovalRule(
+    return db_expense
+
+def get_company_expense_amounts(db: Session, company_id: int, status: Optional[str] = None):
+    """Local totals and currencies of a company's expenses, without loading full rows (for reports)."""
+    query = db.query(
+        models.Expense.total_amount_local,
+        models.Expense.local_currency_code
+    ).filter(models.Expense.company_id == company_id)
+    if status:
+        query = query.filter(models.Expense.status == status)
+    return query.all()
+
+def _query_expense_listing(model, params: schemas.ExpenseListParams):
+    """
+    Starts a listing query over Expense or ArchivedExpense. view=summary
+    selects only the columns of schemas.ExpenseListItem, so rows are returned
+    as plain tuples without loading ORM objects.
+    """
+    if params.view == 'summary':
+        columns = [model.__table__.c[name] for name in schemas.ExpenseListItem.model_fields if name != 'archived']
+        return select(*columns, literal(model is models.ArchivedExpense).label('archived'))
+    return select(model)
+
+def _with_expense_details(query, model, params: schemas.ExpenseListParams):
+    """
+    Eager-loads the lines and approvals that schemas.Expense serializes, with
+    one query per relationship for the whole page instead of one per expense.
+    Summary listings do not include them.
+    """
+    if params.view == 'summary':
+        return query
+    return query.options(selectinload(model.expense_lines), selectinload(model.expense_approvals))
+
+def _listing_rows(result, params: schemas.ExpenseListParams) -> List:
+    """The rows of an executed listing query: ORM objects, or tuples with view=summary."""
+    return result.all() if params.view == 'summary' else result.scalars().all()
+
+def _user_expense_queries(user_id: int, params: schemas.ExpenseListParams, sort: str) -> List:
+    """The page queries of get_user_expenses(): the live table, and the archive when params.since reaches it."""
+    queries = []
+    models_read = [models.Expense]
+    if params.since is not None and datetime.datetime.combine(params.since, datetime.time.min) < archive_cutoff():
+        models_read.append(models.ArchivedExpense)
+    for model in models_read:
+        query = _query_expense_listing(model, params).where(model.employee_id == user_id)
+        queries.append(_with_expense_details(page_query(filter_expenses(query, model, params), model, params, sort), model, params))
+    return queries
+
+def get_user_expenses(db: Session, user_id: int, params: Optional[schemas.ExpenseListParams] = None) -> Page:
+    """
+    Retrieves one page of the expenses submitted by a specific user, newest
+    first unless params.sort says otherwise (see pagination.py). Finalized
+    expenses older than the archive window are read from the archive, and
+    only when params.since reaches back that far.
+    """
+    params = params or schemas.ExpenseListParams()
+    sort = params.sort or 'desc'
+
+    expenses = []
+    for query in _user_expense_queries(user_id, params, sort):
+        expenses += _listing_rows(db.execute(query), params)
+    return make_page(expenses, params, sort)
+
+def _new_approval_rule(rule_data: schemas.ApprovalRuleCreate, company_id: int) -> models.ApprovalRule:
+    """
+    A new, unsaved rule with its required and normal approvers. The approvers
+    are attached to the rule, so one flush writes the rule and all approver
+    rows and the collections need no reload afterwards.
+    """
+    return models.ApprovalRule(
         company_id=company_id,
         name=rule_data.name,
         description=rule_data.description,
         is_active=rule_data.is_active,
         threshold_amount=rule_data.threshold_amount,
-        approval_percentage=rule_data.approval_percentage
+        approval_percentage=rule_data.approval_percentage,
+        required_approvers=[
+            models.RuleRequiredApprover(user_id=approver_data.user_id, sequence=0)
+            for approver_data in rule_data.required_approvers
+        ],
+        # Normal approvers act in sequence
+        normal_approvers=[
+            models.RuleNormalApprover(user_id=approver_data.user_id, sequence=approver_data.sequence)
+            for approver_data in rule_data.normal_approvers
+        ]
     )
+
+def create_approval_rule(
+    db: Session, 
+    rule_data: schemas.ApprovalRuleCreate, 
+    company_id: int
+) -> models.ApprovalRule:
+    """Creates a new approval rule with required and normal approvers."""
+    db_rule = _new_approval_rule(rule_data, company_id)
     
-    db.add(db_rule)
-    db.commit()
-    db.refresh(db_rule)
-    
-    print(f"Created approval rule: ID={db_rule.rule_id}, Name={db_rule.name}")
+    with unit_of_work(db):
+        db.add(db_rule)
+        db.flush()
     
-    # Now add required approvers with the committed rule_id
-    for approver_data in rule_data.required_approvers:
-        db_required = models.RuleRequiredApprover(
-            rule_id=db_rule.rule_id,
-            user_id=approver_data.user_id,
-            sequence=0
+    return db_rule
+
+def _logged_approvals(member, rule_id):
+    """Correlated count of an expense's approvals by the required or normal approvers (member) of a rule."""
+    return select(func.count(models.ExpenseApproval.approval_id)).where(
+        models.ExpenseApproval.expense_id == models.Expense.expense_id,
+        models.ExpenseApproval.status == 'Approved',
+        models.ExpenseApproval.approver_id.in_(
+            # Nested subqueries must correlate to the outermost query explicitly
+            select(member.user_id).where(member.rule_id == rule_id).correlate_except(member)
         )
-        db.add(db_required)
-        print(f"  Added required approver: user_id={approver_data.user_id}")
-    
-    # Add normal approvers (in sequence) with the committed rule_id
-    for approver_data in rule_data.normal_approvers:
-        db_normal = models.RuleNormalApprover(
-            rule_id=db_rule.rule_id,
-            user_id=approver_data.user_id,
-            sequence=approver_data.sequence
+    ).scalar_subquery()
+
+def _approval_progress_query(
+    company_id: Optional[int] = None,
+    approver_id: Optional[int] = None,
+    expense_ids: Optional[List[int]] = None
+):
+    """
+    Builds a single query yielding one row per (pending expense, candidate approver).
+
+    Candidate approvers are the required and normal approvers of the rule assigned
+    to the expense's employee who have not approved the expense yet. Each row carries
+    the counts needed to decide whether that approver can act on the expense now,
+    so callers only evaluate the rows with _is_actionable(). The number of SQL
+    statements does not depend on the number of pending expenses.
+    """
+    Expense = models.Expense
+    Employee = aliased(models.User)
+    RequiredApprover = models.RuleRequiredApprover
+    NormalApprover = models.RuleNormalApprover
+    PreviousApprover = aliased(models.RuleNormalApprover)
+    Approval = models.ExpenseApproval
+    rule_id = Employee.approval_rule_id
+
+    candidates = union(
+        select(RequiredApprover.rule_id, RequiredApprover.user_id),
+        select(NormalApprover.rule_id, NormalApprover.user_id)
+    ).subquery("candidates")
+    candidate_id = candidates.c.user_id
+
+    def approvals_by(approver_ids):
+        return select(func.count(Approval.approval_id)).where(
+            Approval.expense_id == Expense.expense_id,
+            Approval.status == 'Approved',
+            Approval.approver_id.in_(approver_ids)
+        ).scalar_subquery()
+
+    # Nested subqueries must correlate to the outermost query explicitly
+    normal_sequence = select(func.min(NormalApprover.sequence)).where(
+        NormalApprover.rule_id == rule_id,
+        NormalApprover.user_id == candidate_id
+    ).correlate_except(NormalApprover).scalar_subquery()
+    previous_ids = select(PreviousApprover.user_id).where(
+        PreviousApprover.rule_id == rule_id,
+        PreviousApprover.sequence < normal_sequence
+    ).correlate_except(PreviousApprover)
+
+    query = select(
+        Expense,
+        candidate_id.label("approver_id"),
+        models.ApprovalRule.approval_percentage.label("approval_percentage"),
+        exists().where(
+            RequiredApprover.rule_id == rule_id,
+            RequiredApprover.user_id == candidate_id
+        ).label("is_required"),
+        normal_sequence.label("normal_sequence"),
+        select(func.count(RequiredApprover.id)).where(
+            RequiredApprover.rule_id == rule_id
+        ).scalar_subquery().label("required_total"),
+        _logged_approvals(RequiredApprover, rule_id).label("required_done"),
+        select(func.count(NormalApprover.id)).where(
+            NormalApprover.rule_id == rule_id
+        ).scalar_subquery().label("normal_total"),
+        _logged_approvals(NormalApprover, rule_id).label("normal_done"),
+        select(func.count(PreviousApprover.id)).where(
+            PreviousApprover.rule_id == rule_id,
+            PreviousApprover.sequence < normal_sequence
+        ).scalar_subquery().label("previous_total"),
+        approvals_by(previous_ids).label("previous_done")
+    ).join(
+        Employee, Employee.user_id == Expense.employee_id
+    ).join(
+        models.ApprovalRule, models.ApprovalRule.rule_id == rule_id
+    ).join(
+        candidates, candidates.c.rule_id == rule_id
+    ).where(
+        Expense.status == 'Pending',
+        ~exists().where(
+            Approval.expense_id == Expense.expense_id,
+            Approval.approver_id == candidate_id,
+            Approval.status == 'Approved'
         )
-        db.add(db_normal)
-        print(f"  Added normal approver: user_id={approver_data.user_id}, sequence={approver_data.sequence}")
-    
-    db.commit()
-    db.refresh(db_rule)
-    
-    # Verify approvers were added
-    required_count = db.query(models.RuleRequiredApprover).filter(
-        models.RuleRequiredApprover.rule_id == db_rule.rule_id
-    ).count()
-    
-    normal_count = db.query(models.RuleNormalApprover).filter(
-        models.RuleNormalApprover.rule_id == db_rule.rule_id
-    ).count()
-    
-    print(f"Rule {db_rule.rule_id} created with {required_count} required and {normal_count} normal approvers")
-    
-    return db_rule
+    )
 
-def get_pending_approvals_for_user(db: Session, user_id: int) -> List[models.Expense]:
-    """Get all expenses pending approval by this user."""
-    
-    pending_expenses = []
-    
-    # Get all pending expenses
-    expenses = db.query(models.Expense).filter(
-        models.Expense.status == 'Pending'
-    ).all()
-    
-    print(f"\n{'='*60}")
-    print(f"Checking pending approvals for user {user_id}")
-    print(f"Total pending expenses: {len(expenses)}")
-    print(f"{'='*60}")
-    
-    for expense in expenses:
-        # Check if user has already approved
-        existing_approval = db.query(models.ExpenseApproval).filter(
-            models.ExpenseApproval.expense_id == expense.expense_id,
-            models.ExpenseApproval.approver_id == user_id,
-            models.ExpenseApproval.status == 'Approved'
-        ).first()
-        
-        if existing_approval:
-            print(f"Expense {expense.expense_id}: User already approved")
-            continue
-        
-        # Get the employee who submitted the expense
-        employee = db.query(models.User).filter(
-            models.User.user_id == expense.employee_id
-        ).first()
-        
-        if not employee:
-            print(f"Expense {expense.expense_id}: Employee not found")
-            continue
-            
-        if not employee.approval_rule_id:
-            print(f"Expense {expense.expense_id}: No approval rule assigned to employee {employee.name}")
-            continue
-        
-        rule = db.query(models.ApprovalRule).filter(
-            models.ApprovalRule.rule_id == employee.approval_rule_id
-        ).first()
-        
-        if not rule:
-            print(f"Expense {expense.expense_id}: Approval rule not found")
-            continue
-        
-        print(f"\nExpense {expense.expense_id} submitted by {employee.name}:")
-        print(f"  Rule: {rule.name} (Percentage: {rule.approval_percentage}%)")
-        
-        # Check if user is a required approver
-        is_required = db.query(models.RuleRequiredApprover).filter(
-            models.RuleRequiredApprover.rule_id == rule.rule_id,
-            models.RuleRequiredApprover.user_id == user_id
-        ).first()
-        
-        if is_required:
-            print(f"  User {user_id} is a REQUIRED approver")
-            # Check if ALL required approvers have approved
-            all_required = db.query(models.RuleRequiredApprover).filter(
-                models.RuleRequiredApprover.rule_id == rule.rule_id
-            ).all()
-            
-            required_approved_count = 0
-            for req_approver in all_required:
-                approval = db.query(models.ExpenseApproval).filter(
-                    models.ExpenseApproval.expense_id == expense.expense_id,
-                    models.ExpenseApproval.approver_id == req_approver.user_id,
-                    models.ExpenseApproval.status == 'Approved'
-                ).first()
-                if approval:
-                    required_approved_count += 1
-            
-            print(f"  Required approvals: {required_approved_count}/{len(all_required)}")
-            
-            # If this user hasn't approved yet, show it as pending
-            if required_approved_count < len(all_required):
-                print(f"  ✅ Adding to pending list for user {user_id}")
-                pending_expenses.append(expense)
-                continue
-        
-        # Check if user is a normal approver
-        is_normal = db.query(models.RuleNormalApprover).filter(
-            models.RuleNormalApprover.rule_id == rule.rule_id,
-            models.RuleNormalApprover.user_id == user_id
-        ).first()
-        
-        if is_normal:
-            print(f"  User {user_id} is a NORMAL approver (sequence {is_normal.sequence})")
-            
-            # First check: All required approvers must be done
-            all_required = db.query(models.RuleRequiredApprover).filter(
-                models.RuleRequiredApprover.rule_id == rule.rule_id
-            ).all()
-            
-            if all_required:
-                required_approved_count = db.query(models.ExpenseApproval).filter(
-                    models.ExpenseApproval.expense_id == expense.expense_id,
-                    models.ExpenseApproval.approver_id.in_([r.user_id for r in all_required]),
-                    models.ExpenseApproval.status == 'Approved'
-                ).count()
-                
-                print(f"  Required approvals complete: {required_approved_count}/{len(all_required)}")
-                
-                if required_approved_count < len(all_required):
-                    print(f"  ❌ Required approvers not done yet")
-                    continue
-            
-            # CRITICAL: Check if enough approvals have been received to satisfy percentage
-            all_normal = db.query(models.RuleNormalApprover).filter(
-                models.RuleNormalApprover.rule_id == rule.rule_id
-            ).order_by(models.RuleNormalApprover.sequence).all()
-            
-            approval_percentage = rule.approval_percentage if rule.approval_percentage else 100.0
-            import math
-            normal_approvers_needed = math.ceil(len(all_normal) * (approval_percentage / 100.0))
-            
-            # Count current normal approvals
-            normal_approvals_count = db.query(models.ExpenseApproval).filter(
-                models.ExpenseApproval.expense_id == expense.expense_id,
-                models.ExpenseApproval.approver_id.in_([n.user_id for n in all_normal]),
-                models.ExpenseApproval.status == 'Approved'
-            ).count()
-            
-            print(f"  Normal approvals: {normal_approvals_count}/{normal_approvers_needed} needed (from {len(all_normal)} total)")
-            
-            # If we already have enough approvals, don't show to anyone else
-            if normal_approvals_count >= normal_approvers_needed:
-                print(f"  ❌ Already have enough normal approvals ({normal_approvals_count}/{normal_approvers_needed})")
+    if company_id is not None:
+        query = query.where(Expense.company_id == company_id)
+    if approver_id is not None:
+        query = query.where(candidate_id == approver_id)
+    if expense_ids is not None:
+        query = query.where(Expense.expense_id.in_(expense_ids))
+
+    return query.order_by(Expense.expense_id)
+
+def _is_actionable(progress) -> bool:
+    """Decides from one _approval_progress_query() row whether the approver can act now."""
+    required_pending = progress.required_done < progress.required_total
+
+    # Required approvers are notified together and act before anyone else
+    if progress.is_required and required_pending:
+        return True
+
+    if progress.normal_sequence is None or required_pending:
+        return False
+
+    # Once the percentage is satisfied, nobody else needs to see the expense
+    needed = normal_approvals_needed(progress.normal_total, progress.approval_percentage)
+    if progress.normal_done >= needed:
+        return False
+
+    # Normal approvers act in sequence: everyone before this approver must be done
+    return progress.previous_done == progress.previous_total
+
+def _inbox_queries(expense_ids: List[int]):
+    """The approval progress rows and the current inbox entries of the given expenses."""
+    return (
+        _approval_progress_query(expense_ids=expense_ids),
+        select(models.ApprovalInbox).where(models.ApprovalInbox.expense_id.in_(expense_ids))
+    )
+
+def _inbox_changes(progress_rows, existing: List[models.ApprovalInbox]) -> Tuple[List[models.ApprovalInbox], List[models.ApprovalInbox]]:
+    """The inbox entries to delete and to add, given the expenses' progress rows and current entries."""
+    actionable = {
+        (row.Expense.expense_id, row.approver_id): row.Expense.company_id
+        for row in progress_rows
+        if _is_actionable(row)
+    }
+
+    stale = []
+    for entry in existing:
+        # Keep entries that are still actionable so their 'since' is preserved
+        if actionable.pop((entry.expense_id, entry.approver_id), None) is None:
+            stale.append(entry)
+
+    added = [
+        models.ApprovalInbox(
+            expense_id=expense_id,
+            approver_id=approver_id,
+            company_id=company_id,
+            since=datetime.datetime.utcnow()
+        )
+        for (expense_id, approver_id), company_id in actionable.items()
+    ]
+    return stale, added
+
+def sync_approval_inbox(db: Session, expense_ids: List[int]) -> None:
+    """
+    Recomputes the approval inbox entries of the given expenses.
+
+    Runs inside the caller's transaction, so the inbox changes are committed
+    together with the expense or approval write that caused them.
+    """
+    db.flush()
+
+    progress_query, inbox_query = _inbox_queries(expense_ids)
+    stale, added = _inbox_changes(db.execute(progress_query).all(), db.execute(inbox_query).scalars().all())
+    for entry in stale:
+        db.delete(entry)
+    db.add_all(added)
+
+def refresh_approval_state_for_employee(db: Session, employee_id: int) -> None:
+    """
+    Re-syncs the approval counters and inbox of an employee's pending expenses,
+    e.g. after their approval rule changed.
+    """
+    expense_ids = [
+        expense_id for (expense_id,) in db.query(models.Expense.expense_id).filter(
+            models.Expense.employee_id == employee_id,
+            models.Expense.status == 'Pending'
+        ).all()
+    ]
+    if not expense_ids:
+        return
+
+    db.flush()
+    for expected in _recount_approval_counters(db, expense_ids=expense_ids):
+        expense = expected.pop("expense")
+        for field, value in expected.items():
+            setattr(expense, field, value)
+
+    sync_approval_inbox(db, expense_ids)
+
+def rebuild_approval_inbox(db: Session, company_id: Optional[int] = None, batch_size: int = 1000) -> int:
+    """
+    Regenerates the approval inbox from the approval log.
+
+    Existing entries (for one company, or all companies) are discarded and
+    recomputed in batches of pending expenses. The 'since' timestamp of each
+    entry is the latest approval on the expense, or its submission date.
+    Returns the number of inbox entries written.
+    """
+    inbox = db.query(models.ApprovalInbox)
+    pending = db.query(models.Expense.expense_id).filter(models.Expense.status == 'Pending')
+    if company_id is not None:
+        inbox = inbox.filter(models.ApprovalInbox.company_id == company_id)
+        pending = pending.filter(models.Expense.company_id == company_id)
+    inbox.delete(synchronize_session=False)
+
+    expense_ids = [expense_id for (expense_id,) in pending.order_by(models.Expense.expense_id).all()]
+    written = 0
+
+    for start in range(0, len(expense_ids), batch_size):
+        batch = expense_ids[start:start + batch_size]
+
+        last_approval = dict(db.query(
+            models.ExpenseApproval.expense_id,
+            func.max(models.ExpenseApproval.approval_date)
+        ).filter(
+            models.ExpenseApproval.expense_id.in_(batch)
+        ).group_by(models.ExpenseApproval.expense_id).all())
+
+        for row in db.execute(_approval_progress_query(expense_ids=batch)).all():
+            if not _is_actionable(row):
                 continue
-            
-            # Check sequential order: all previous approvers must have approved
-            previous_approvers = db.query(models.RuleNormalApprover).filter(
-                models.RuleNormalApprover.rule_id == rule.rule_id,
-                models.RuleNormalApprover.sequence < is_normal.sequence
-            ).all()
-            
-            if previous_approvers:
-                previous_approved_count = db.query(models.ExpenseApproval).filter(
-                    models.ExpenseApproval.expense_id == expense.expense_id,
-                    models.ExpenseApproval.approver_id.in_([p.user_id for p in previous_approvers]),
-                    models.ExpenseApproval.status == 'Approved'
-                ).count()
-                
-                print(f"  Previous sequential approvals: {previous_approved_count}/{len(previous_approvers)}")
-                
-                if previous_approved_count == len(previous_approvers):
-                    print(f"  ✅ All previous approvers done, adding to pending list for user {user_id}")
-                    pending_expenses.append(expense)
-                else:
-                    print(f"  ❌ Not this user's turn yet (need {len(previous_approvers) - previous_approved_count} more before)")
-            else:
-                # This is the first normal approver
-                print(f"  ✅ First normal approver - adding to pending list")
-                pending_expenses.append(expense)
-    
-    print(f"\nTotal pending for user {user_id}: {len(pending_expenses)}")
-    print(f"{'='*60}\n")
-    
-    return pending_expenses
+            expense = row.Expense
+            db.add(models.ApprovalInbox(
+                expense_id=expense.expense_id,
+                approver_id=row.approver_id,
+                company_id=expense.company_id,
+                since=last_approval.get(expense.expense_id) or expense.submission_date
+            ))
+            written += 1
 
-def create_expense_approval(
-    db: Session,
-    expense_id: int,
-    approver_id: int,
-    status: str,
-    comments: Optional[str] = None
-) -> models.ExpenseApproval:
-    """Create an approval record."""
-    db_approval = models.ExpenseApproval(
-        expense_id=expense_id,
+        db.flush()
+
+    db.commit()
+    return written
+
+def _pending_approvals_query(user_id: int, params: schemas.ExpenseListParams, sort: str):
+    """The page query of get_pending_approvals_for_user(), read from the approval inbox."""
+    query = _query_expense_listing(models.Expense, params).join(
+        models.ApprovalInbox,
+        models.ApprovalInbox.expense_id == models.Expense.expense_id
+    ).join(
+        models.User,
+        models.User.user_id == models.ApprovalInbox.approver_id
+    ).where(
+        models.ApprovalInbox.approver_id == user_id,
+        models.ApprovalInbox.company_id == models.User.company_id
+    )
+    return _with_expense_details(page_query(filter_expenses(query, models.Expense, params), models.Expense, params, sort), models.Expense, params)
+
+def get_pending_approvals_for_user(db: Session, user_id: int, params: Optional[schemas.ExpenseListParams] = None) -> Page:
+    """
+    Get one page of the expenses in the user's company that are pending
+    approval by this user, oldest first unless params.sort says otherwise.
+    """
+    params = params or schemas.ExpenseListParams()
+    sort = params.sort or 'asc'
+    return make_page(_listing_rows(db.execute(_pending_approvals_query(user_id, params, sort)), params), params, sort)
+
+def _already_approved_query(expense_id: int, user_id: int):
+    return select(exists().where(
+        models.ExpenseApproval.expense_id == expense_id,
+        models.ExpenseApproval.approver_id == user_id,
+        models.ExpenseApproval.status == 'Approved'
+    ))
+
+def _rule_allows(expense: models.Expense, rule, user_id: int) -> bool:
+    """Whether the rule lets a user who has not approved the expense yet act on it now, from its counters."""
+    required_pending = expense.required_approvals_done < len(rule.required_ids)
+
+    # Required approvers are notified together and act before anyone else
+    if user_id in rule.required_ids and required_pending:
+        return True
+
+    user_sequence = rule.normal_sequence_of(user_id)
+    if user_sequence is None or required_pending:
+        return False
+
+    # Once the percentage is satisfied, nobody else needs to act
+    if expense.normal_approvals_done >= rule.normal_needed:
+        return False
+
+    # Normal approvers act in sequence: it must be this approver's turn
+    return expense.next_normal_sequence is not None and user_sequence <= expense.next_normal_sequence
+
+def can_user_act_on_expense(db: Session, expense: models.Expense, user_id: int) -> bool:
+    """
+    Checks whether the user can approve or reject this expense right now.
+
+    Only the target expense is evaluated against its rule, using the expense's
+    running approval counters, so the cost does not depend on the size of the
+    user's approval queue.
+    """
+    if expense.status != 'Pending':
+        return False
+
+    employee = db.get(models.User, expense.employee_id)
+    rule = rule_cache.get(db, employee.approval_rule_id) if employee else None
+    if not rule or db.execute(_already_approved_query(expense.expense_id, user_id)).scalar():
+        return False
+    return _rule_allows(expense, rule, user_id)
+
+def _new_approval(expense: models.Expense, approver_id: int, status: str, comments: Optional[str]) -> models.ExpenseApproval:
+    """A new, unsaved approval of the expense; a rejection also rejects the expense."""
+    if status == 'Rejected':
+        expense.status = 'Rejected'
+    return models.ExpenseApproval(
+        expense_id=expense.expense_id,
         approver_id=approver_id,
         status=status,
         comments=comments,
         approval_date=datetime.datetime.utcnow()
     )
+
+def _count_approval(expense: models.Expense, rule, approver_id: int):
+    """Increments the expense's approval counters in SQL, so concurrent approvals cannot lose an update."""
+    return update(models.Expense).where(
+        models.Expense.expense_id == expense.expense_id
+    ).values({
+        models.Expense.required_approvals_done: models.Expense.required_approvals_done + int(approver_id in rule.required_ids),
+        models.Expense.normal_approvals_done: models.Expense.normal_approvals_done + int(rule.is_normal_approver(approver_id))
+    }).execution_options(synchronize_session=False)
+
+def _advance_expense(expense: models.Expense, rule) -> None:
+    """Moves the expense to its next approver, or approves it, from its refreshed counters."""
+    expense.next_normal_sequence = rule.next_normal_sequence(expense.normal_approvals_done)
+    all_required_approved = expense.required_approvals_done >= len(rule.required_ids)
+    enough_normal_approved = expense.normal_approvals_done >= rule.normal_needed
+    expense.status = 'Approved' if all_required_approved and enough_normal_approved else 'Pending'
+
+APPROVAL_COUNTERS = ['required_approvals_done', 'normal_approvals_done']
+
+def _apply_expense_approval(
+    db: Session,
+    expense: models.Expense,
+    approver_id: int,
+    status: str,
+    comments: Optional[str] = None
+) -> models.ExpenseApproval:
+    """
+    Records an approval and advances the expense's counters and status.
+
+    Flushes but does not commit and does not touch the approval inbox, so
+    several approvals can be applied in one transaction.
+    """
+    db_approval = _new_approval(expense, approver_id, status, comments)
     db.add(db_approval)
     
-    # IMPORTANT: Commit the approval first
-    db.commit()
-    db.refresh(db_approval)
-    
-    # Update expense status
-    expense = db.query(models.Expense).filter(
-        models.Expense.expense_id == expense_id
-    ).first()
-    
-    if status == 'Rejected':
-        expense.status = 'Rejected'
-        db.commit()
-        db.refresh(expense)
-        return db_approval
-    
     if status == 'Approved':
-        # Get employee and rule
-        employee = db.query(models.User).filter(
-            models.User.user_id == expense.employee_id
-        ).first()
-        
-        if not employee or not employee.approval_rule_id:
-            # No approval rule, mark as approved
-            expense.status = 'Approved'
-            db.commit()
-            db.refresh(expense)
-            return db_approval
-        
-        rule = db.query(models.ApprovalRule).filter(
-            models.ApprovalRule.rule_id == employee.approval_rule_id
-        ).first()
+        employee = db.get(models.User, expense.employee_id)
+        rule = rule_cache.get(db, employee.approval_rule_id) if employee else None
         
         if not rule:
+            # No approval rule, mark as approved
             expense.status = 'Approved'
-            db.commit()
-            db.refresh(expense)
-            return db_approval
-        
-        # Count all required approvers
-        all_required = db.query(models.RuleRequiredApprover).filter(
-            models.RuleRequiredApprover.rule_id == rule.rule_id
-        ).all()
-        
-        # Count all normal approvers (ordered by sequence)
-        all_normal = db.query(models.RuleNormalApprover).filter(
-            models.RuleNormalApprover.rule_id == rule.rule_id
-        ).order_by(models.RuleNormalApprover.sequence).all()
-        
-        # Count current approvals
-        current_approvals = db.query(models.ExpenseApproval).filter(
-            models.ExpenseApproval.expense_id == expense_id,
-            models.ExpenseApproval.status == 'Approved'
-        ).all()
-        
-        # Count required approvals
-        required_approvals = [a for a in current_approvals if any(r.user_id == a.approver_id for r in all_required)]
-        
-        # Count normal approvals
-        normal_approvals = [a for a in current_approvals if any(n.user_id == a.approver_id for n in all_normal)]
-        
-        # Calculate percentage needed
-        approval_percentage = rule.approval_percentage if rule.approval_percentage else 100.0
-        normal_approvers_needed = len(all_normal)
-        
-        if approval_percentage < 100.0 and len(all_normal) > 0:
-            # Calculate how many normal approvers are needed based on percentage
-            import math
-            normal_approvers_needed = math.ceil(len(all_normal) * (approval_percentage / 100.0))
-        
-        print(f"\n{'='*60}")
-        print(f"APPROVAL STATUS CHECK FOR EXPENSE {expense_id}")
-        print(f"{'='*60}")
-        print(f"Approval Rule: {rule.name}")
-        print(f"Approval Percentage: {approval_percentage}%")
-        print(f"Required approvers:")
-        print(f"  - Total: {len(all_required)}")
-        print(f"  - Approved: {len(required_approvals)}")
-        print(f"Normal approvers:")
-        print(f"  - Total: {len(all_normal)}")
-        print(f"  - Approved: {len(normal_approvals)}")
-        print(f"  - Needed (based on {approval_percentage}%): {normal_approvers_needed}")
-        
-        # IMPORTANT: Verify sequential approval (even with percentage)
-        if len(normal_approvals) > 0 and approval_percentage < 100.0:
-            # Get the highest sequence number that has approved
-            approved_sequences = []
-            for approval in normal_approvals:
-                for normal in all_normal:
-                    if normal.user_id == approval.approver_id:
-                        approved_sequences.append(normal.sequence)
-                        break
-            
-            if approved_sequences:
-                max_approved_sequence = max(approved_sequences)
-                print(f"  - Highest approved sequence: {max_approved_sequence}")
-                
-                # Verify all sequences before max are approved
-                for seq in range(1, max_approved_sequence + 1):
-                    if seq not in approved_sequences:
-                        print(f"  ⚠️ WARNING: Sequence {seq} skipped! Sequential order violated!")
-        
-        # Check if all conditions are met
-        all_required_approved = len(required_approvals) == len(all_required)
-        enough_normal_approved = len(normal_approvals) >= normal_approvers_needed
-        
-        print(f"All required approved: {all_required_approved}")
-        print(f"Enough normal approved: {enough_normal_approved}")
-        
-        if all_required_approved and enough_normal_approved:
-            expense.status = 'Approved'
-            print(f"✅ All conditions met! Setting status to Approved")
         else:
-            expense.status = 'Pending'
-            if not all_required_approved:
-                print(f"⏳ Still need {len(all_required) - len(required_approvals)} required approval(s)")
-            if not enough_normal_approved:
-                print(f"⏳ Still need {normal_approvers_needed - len(normal_approvals)} more normal approval(s) (in sequence)")
-        print(f"{'='*60}\n")
+            db.execute(_count_approval(expense, rule, approver_id))
+            db.refresh(expense, APPROVAL_COUNTERS)
+            _advance_expense(expense, rule)
     
-    db.commit()
-    db.refresh(expense)
+    db.flush()
     return db_approval
 
+def create_expense_approval(
+    db: Session,
+    expense_id: int,
+    approver_id: int,
+    status: str,
+    comments: Optional[str] = None
+) -> models.ExpenseApproval:
+    """
+    Create an approval record and advance the expense.
+
+    The approval row, the expense's running approval counters, its status and
+    its inbox entries are written in one transaction, so the transition check
+    only compares counters instead of recounting the approval log.
+    """
+    expense = db.get(models.Expense, expense_id)
+    
+    with unit_of_work(db):
+        db_approval = _apply_expense_approval(db, expense, approver_id, status, comments)
+        sync_approval_inbox(db, [expense_id])
+    return db_approval
+
+def _batch_query(decisions: List[schemas.ApprovalDecision]):
+    """
+    The expenses of a batch with their submitting employees. The employees are
+    loaded in one extra query and held by the expenses, so per-item lookups
+    of an employee find it in the session without SQL.
+    """
+    expense_ids = {decision.expense_id for decision in decisions}
+    return select(models.Expense).where(models.Expense.expense_id.in_(expense_ids)).options(selectinload(models.Expense.employee))
+
+def _decision_error(expense: Optional[models.Expense], decision: schemas.ApprovalDecision, comments: Optional[str]) -> Optional[str]:
+    """Why a batch decision cannot be applied, before authorization; None if it is valid."""
+    if not expense:
+        return "Expense not found"
+    if decision.decision not in ('Approved', 'Rejected'):
+        return "Decision must be 'Approved' or 'Rejected'"
+    if decision.decision == 'Rejected' and not comments:
+        return "Comments are required when rejecting an expense"
+    return None
+
+NOT_AUTHORIZED = "You are not authorized to act on this expense at this time"
+
+def apply_approval_batch(
+    db: Session,
+    approver_id: int,
+    decisions: List[schemas.ApprovalDecision]
+) -> List[schemas.ApprovalDecisionResult]:
+    """
+    Applies many approve/reject decisions of one approver in a single transaction.
+
+    Each decision is authorized and validated on its own; failed items are
+    reported in their result and do not prevent the others from being applied.
+    The inbox is re-synced once for all touched expenses and the whole batch
+    is committed once, in one unit of work.
+    """
+    # The employees are prefetched with the expenses (see _batch_query())
+    expenses = {expense.expense_id: expense for expense in db.execute(_batch_query(decisions)).scalars().all()}
+
+    results = []
+    touched = []
+    with unit_of_work(db):
+        for decision in decisions:
+            expense = expenses.get(decision.expense_id)
+            comments = decision.comments.strip() if decision.comments else None
+
+            detail = _decision_error(expense, decision, comments)
+            if detail is None and not can_user_act_on_expense(db, expense, approver_id):
+                detail = NOT_AUTHORIZED
+            if detail is None:
+                approval = _apply_expense_approval(db, expense, approver_id, decision.decision, comments)
+                touched.append(expense.expense_id)
+                results.append(_decision_result(expense, approval))
+            else:
+                results.append(schemas.ApprovalDecisionResult(expense_id=decision.expense_id, success=False, detail=detail))
+
+        if touched:
+            sync_approval_inbox(db, touched)
+
+    return results
+
+def _decision_result(expense: models.Expense, approval: models.ExpenseApproval) -> schemas.ApprovalDecisionResult:
+    return schemas.ApprovalDecisionResult(
+        expense_id=expense.expense_id,
+        success=True,
+        approval_id=approval.approval_id,
+        expense_status=expense.status
+    )
+
+def _recount_approval_counters(db: Session, expense_ids: Optional[List[int]] = None, company_id: Optional[int] = None) -> List[dict]:
+    """
+    Recomputes the running approval counters of expenses from the approval log.
+
+    Approvals are counted against the rule currently assigned to the expense's
+    employee, like the approval workflow itself. Returns one dict per expense
+    with the stored and the expected values; nothing is written.
+    """
+    Employee = aliased(models.User)
+    rule_id = Employee.approval_rule_id
+
+    query = db.query(
+        models.Expense,
+        rule_id.label("rule_id"),
+        _logged_approvals(models.RuleRequiredApprover, rule_id).label("required_done"),
+        _logged_approvals(models.RuleNormalApprover, rule_id).label("normal_done")
+    ).join(
+        Employee, Employee.user_id == models.Expense.employee_id
+    ).filter(rule_id.isnot(None))
+
+    if expense_ids is not None:
+        query = query.filter(models.Expense.expense_id.in_(expense_ids))
+    if company_id is not None:
+        query = query.filter(models.Expense.company_id == company_id)
+    rows = query.order_by(models.Expense.expense_id).all()
+
+    rules = {rule_id: rule_cache.get(db, rule_id) for rule_id in {row.rule_id for row in rows}}
+
+    return [{
+        "expense": row.Expense,
+        "required_approvals_done": row.required_done,
+        "normal_approvals_done": row.normal_done,
+        "next_normal_sequence": rules[row.rule_id].next_normal_sequence(row.normal_done) if rules[row.rule_id] else None
+    } for row in rows]
+
+def check_approval_counters(db: Session, company_id: Optional[int] = None, fix: bool = False) -> List[dict]:
+    """
+    Verifies the running approval counters of every expense against the approval log.
+
+    Returns the mismatches as dicts (expense_id, field, stored, expected). With
+    fix=True the counters are overwritten with the values derived from the log.
+    """
+    mismatches = []
+    for expected in _recount_approval_counters(db, company_id=company_id):
+        expense = expected.pop("expense")
+        for field, value in expected.items():
+            stored = getattr(expense, field)
+            if stored != value:
+                mismatches.append({
+                    "expense_id": expense.expense_id,
+                    "field": field,
+                    "stored": stored,
+                    "expected": value
+                })
+                if fix:
+                    setattr(expense, field, value)
+
+    if fix and mismatches:
+        db.commit()
+    return mismatches
+
 def get_all_company_manager_candidates(db: Session, company_id: int) -> List[models.User]:
     """Retrieves all users in the company who can be assigned as a manager/required approver."""
     return db.query(models.User).filter(
@@ -1,37 +1,297 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from typing import Generator
+import threading
+import time
+from collections import OrderedDict
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from contextvars import ContextVar
+from pathlib import Path
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from typing import AsyncGenerator, Callable, Generator, Optional
 from ..models.models import Base # Import Base from our models file
+from ..core.config import settings
 
-# SQLite URL is relative to the project root.
-# For production, you might use a more robust DB like PostgreSQL.
-SQLITE_DATABASE_URL = "sqlite:///./backend/expense_management.db"
+# --- Engine ---
+# The database is chosen by settings.DATABASE_URL (SQLite by default, relative
+# to the project root). SQLite connections are tuned for concurrent requests:
+# WAL lets readers proceed while a writer commits, and busy_timeout makes a
+# writer wait for the lock instead of failing with "database is locked".
+# Other backends (PostgreSQL) use a connection pool sized from the settings.
 
-# Setting connect_args={"check_same_thread": False} is required for SQLite
-# when using it with FastAPI because FastAPI runs multiple threads.
-engine = create_engine(
-    SQLITE_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _sqlite_pragmas(read_only: bool = False) -> list:
+    pragmas = [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_BYTES)}",
+        f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}",
+    ]
+    if read_only:
+        # Any write on a read connection fails instead of competing with the writer
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+def _set_sqlite_pragmas_on_connect(sync_engine: Engine, read_only: bool = False) -> None:
+    pragmas = _sqlite_pragmas(read_only)
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+
+def build_engine(database_url: Optional[str] = None, read_only: bool = False) -> Engine:
+    """Creates the SQLAlchemy engine for database_url (default: settings.DATABASE_URL)."""
+    url = make_url(database_url or settings.DATABASE_URL)
+
+    if url.get_backend_name() == "sqlite":
+        # check_same_thread=False is required because FastAPI runs requests in several threads
+        new_engine = create_engine(
+            url,
+            echo=settings.DB_ECHO,
+            connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+        )
+        _set_sqlite_pragmas_on_connect(new_engine, read_only)
+        return new_engine
+
+    return create_engine(url, echo=settings.DB_ECHO, **_pool_options())
+
+engine = build_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# --- Async Engine ---
+# Async routes use an AsyncSession on the same database through an async
+# driver (aiosqlite for SQLite, asyncpg for PostgreSQL), so waiting on the
+# database does not hold a threadpool thread.
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def async_database_url(database_url: Optional[str] = None) -> URL:
+    """The async-driver equivalent of database_url (default: settings.ASYNC_DATABASE_URL or DATABASE_URL)."""
+    if database_url is None and settings.ASYNC_DATABASE_URL:
+        return make_url(settings.ASYNC_DATABASE_URL)
+    url = make_url(database_url or settings.DATABASE_URL)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver) if driver else url
+
+def build_async_engine(database_url: Optional[str] = None, read_only: bool = False) -> AsyncEngine:
+    """Creates the async engine for database_url, configured like build_engine()."""
+    url = async_database_url(database_url)
+
+    if url.get_backend_name() == "sqlite":
+        new_engine = create_async_engine(
+            url,
+            echo=settings.DB_ECHO,
+            connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+        )
+        _set_sqlite_pragmas_on_connect(new_engine.sync_engine, read_only)
+        return new_engine
+
+    return create_async_engine(url, echo=settings.DB_ECHO, **_pool_options())
+
+async_engine = build_async_engine()
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# --- Read Sessions ---
+# Read-only routes use ReadSessionLocal/AsyncReadSessionLocal. With
+# READ_DATABASE_URL they read from a replica; on a SQLite file they use a
+# second, query-only connection pool, which WAL lets read while the primary
+# pool writes. Other databases without a replica read from the primary.
+#
+# Read-your-writes: commits on the primary record the authenticated user
+# (current_user_id, set by auth_utils.get_current_user), and that user's reads
+# go to the primary for READ_YOUR_WRITES_SECONDS, so a replica that lags behind
+# never hides their own changes. Writes are tracked per process.
+
+current_user_id: ContextVar[Optional[int]] = ContextVar("current_user_id", default=None)
+
+def read_database_url() -> Optional[str]:
+    """The database read-only sessions use, or None when they share the primary engine."""
+    if settings.READ_DATABASE_URL:
+        return settings.READ_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return settings.DATABASE_URL
+    return None
+
+def build_read_engine() -> Engine:
+    url = read_database_url()
+    return build_engine(url, read_only=True) if url else engine
+
+def build_async_read_engine() -> AsyncEngine:
+    if settings.ASYNC_READ_DATABASE_URL:
+        return build_async_engine(settings.ASYNC_READ_DATABASE_URL, read_only=True)
+    url = read_database_url()
+    return build_async_engine(url, read_only=True) if url else async_engine
+
+read_engine = build_read_engine()
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=read_engine)
+async_read_engine = build_async_read_engine()
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+
+# Users by the time of their last write, oldest first
+_last_write: "OrderedDict[int, float]" = OrderedDict()
+_last_write_lock = threading.Lock()
+
+def record_write(user_id: int) -> None:
+    """Marks that user_id has just committed a write, and forgets users whose window has passed."""
+    now = time.monotonic()
+    with _last_write_lock:
+        _last_write[user_id] = now
+        _last_write.move_to_end(user_id)
+        while _last_write:
+            oldest, at = next(iter(_last_write.items()))
+            if now - at < settings.READ_YOUR_WRITES_SECONDS:
+                break
+            del _last_write[oldest]
+
+def wrote_recently(user_id: Optional[int]) -> bool:
+    """True while user_id's last write may not have reached the read database yet."""
+    if user_id is None:
+        return False
+    at = _last_write.get(user_id)
+    return at is not None and time.monotonic() - at < settings.READ_YOUR_WRITES_SECONDS
+
+@event.listens_for(Session, "after_commit")
+def _record_write_on_commit(session: Session) -> None:
+    # Read sessions never commit, and background workers run without a user
+    user_id = current_user_id.get()
+    if user_id is not None:
+        record_write(user_id)
+
+def _tenant_session_factory(use_async: bool):
+    """
+    The session factory of the authenticated user's shard when tenant sharding
+    is enabled and their company was moved to a shard (see tenancy.py), else None.
+    """
+    if not settings.TENANT_SHARDS:
+        return None
+    shard = tenancy.shard_for_user(current_user_id.get())
+    if shard == tenancy.DEFAULT_SHARD:
+        return None
+    return tenancy.async_session_factory(shard) if use_async else tenancy.session_factory(shard)
 
 def get_db() -> Generator:
     """Dependency to yield a new database session for each request."""
-    db = SessionLocal()
+    db = (_tenant_session_factory(use_async=False) or SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to yield a new async database session for each request."""
+    async with (_tenant_session_factory(use_async=True) or AsyncSessionLocal)() as db:
+        yield db
+
+def read_session_factory() -> Callable[[], Session]:
+    """The session factory get_read_db() uses, for reads that outlive the request's dependencies (streams)."""
+    session_factory = _tenant_session_factory(use_async=False)
+    if session_factory is None:
+        session_factory = SessionLocal if wrote_recently(current_user_id.get()) else ReadSessionLocal
+    return session_factory
+
+def get_read_db() -> Generator:
+    """
+    Dependency to yield a session for read-only routes: the read database, or
+    the primary if the current user wrote recently. Declare it after
+    get_current_user so the user is known. Sharded tenants read from their shard.
+    """
+    db = read_session_factory()()
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Async version of get_read_db()."""
+    session_factory = _tenant_session_factory(use_async=True)
+    if session_factory is None:
+        session_factory = AsyncSessionLocal if wrote_recently(current_user_id.get()) else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
+
+# --- Schema Migrations ---
+# The schema is versioned with Alembic (backend/migrations). init_db() applies
+# pending migrations; databases created before migrations existed are stamped
+# at the baseline revision first, so only the later revisions run on them.
+# Every tenant shard is migrated after the primary, see tenancy.Shard.migrate().
+# A migration that changes directory tables (companies, users, rules...)
+# must skip shards: context.config.attributes["tenant_shard"] is set there.
+
+MIGRATIONS_INI = Path(__file__).resolve().parents[1] / "alembic.ini"
+BASELINE_REVISION = "0001"
+
+def alembic_config(connection=None) -> Config:
+    config = Config(str(MIGRATIONS_INI))
+    config.attributes["connection"] = connection
+    return config
+
+def current_revision() -> Optional[str]:
+    """Revision the database is at, or None if it is not versioned."""
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+def migrate(revision: str = "head") -> Optional[str]:
+    """Upgrades the database to revision and returns the revision it was at before."""
+    with engine.begin() as connection:
+        before = MigrationContext.configure(connection).get_current_revision()
+        config = alembic_config(connection)
+        if before is None and inspect(connection).has_table('expenses'):
+            # Created by create_all() before migrations existed
+            command.stamp(config, BASELINE_REVISION)
+            before = BASELINE_REVISION
+        command.upgrade(config, revision)
+
+    if before == BASELINE_REVISION and current_revision() != BASELINE_REVISION:
+        # Revision 0002 added approval counters and the inbox to a database
+        # that already has expenses: derive them from the approval log
+        from . import crud
+        db = SessionLocal()
+        try:
+            crud.check_approval_counters(db, fix=True)
+            crud.rebuild_approval_inbox(db)
+        finally:
+            db.close()
+
+    if settings.TENANT_SHARDS:
+        tenancy.migrate_shards(revision)
+    return before
+
 def init_db():
-    """Initializes the database by creating all tables defined in Base."""
-    # This automatically calls CREATE TABLE statements based on the ORM models
-    Base.metadata.create_all(bind=engine)
-    print("Database tables initialized successfully.")
+    """Brings the database schema up to date by applying pending migrations."""
+    before = migrate()
+    print(f"Database schema at revision {current_revision()} (was {before or 'empty'})")
 
 def reset_db():
     """Drops all tables and recreates them. USE WITH CAUTION - DELETES ALL DATA!"""
     Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    init_db()
     print("Database reset successfully. All tables recreated.")
 
 # Run init_db() on application startup (will be called from main.py)
+
+# --- Session Listeners ---
+# Imported last since tenancy builds on this module. Their listeners must
+# cover every session of the process, whichever modules it imports:
+# company_version bumps a company's data_version on writes to its reference
+# data, tenancy allocates tenant row ids and enforces the fence of a company
+# being moved.
+from . import company_version, tenancy # noqa: E402
+
+company_version.register_listeners()
@@ -0,0 +1,141 @@
+import csv
+import datetime
+import io
+import math
+import zlib
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from ..core.config import settings
+from ..models import models, schemas
+from .archive import archive_cutoff
+from .conversion import convert_amounts
+from .pagination import filter_expenses
+
+# --- Expense Export ---
+# Streams a company's expenses for finance exports. Rows are read in batches
+# of EXPORT_BATCH_SIZE with yield_per (a server-side cursor where the driver
+# has one) and each batch is encoded and handed to the response before the
+# next is read, so memory stays flat however many rows are exported.
+# Archived expenses are included when since reaches past the archive window,
+# as in the listings. With to_currency, each batch's totals are re-priced in
+# one convert_amounts() call (rates looked up once per currency).
+
+EXPENSE_COLUMNS = [
+    'expense_id', 'employee_id', 'submission_date', 'description', 'status', 'total_amount_local',
+    'local_currency_code', 'exchange_rate', 'total_amount_company_currency', 'rate_provisional'
+]
+LINE_COLUMNS = ['line_id', 'category_id', 'vendor_name', 'date', 'amount_local', 'description', 'receipt_url', 'expense_type']
+APPROVAL_COLUMNS = ['approval_id', 'approver_id', 'status', 'comments', 'approval_date']
+CONVERTED_COLUMN = 'total_amount_converted' # With to_currency: the total in that currency (empty without a rate)
+
+MEDIA_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+def _expense_tables(params: schemas.ExpenseFilterParams) -> List[Tuple[type, bool]]:
+    """(expense model, archived) pairs to read for params."""
+    tables = [(models.Expense, False)]
+    if params.since is not None and datetime.datetime.combine(params.since, datetime.time.min) < archive_cutoff():
+        tables.append((models.ArchivedExpense, True))
+    return tables
+
+def _converted_totals(db: Session, rows: list, params: schemas.ExpenseExportParams) -> List[Optional[float]]:
+    """The total_amount_local of each row in params.to_currency, None where no rate is known."""
+    result = convert_amounts(
+        db, [row.total_amount_local for row in rows], [row.local_currency_code for row in rows],
+        params.to_currency.upper(), params.on_date
+    )
+    return [None if math.isnan(value) else value for value in result.converted.tolist()]
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+def _csv_chunks(db: Session, company_id: int, params: schemas.ExpenseExportParams) -> Iterator[bytes]:
+    """
+    One row per expense line (or approval), after the columns of its expense.
+    Expenses without lines (or approvals) get one row with empty child columns.
+    """
+    child_columns = LINE_COLUMNS if params.rows == 'lines' else APPROVAL_COLUMNS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    prefix = params.rows[:-1] # 'line' or 'approval', for child columns named like an expense column
+    converted_columns = [CONVERTED_COLUMN] if params.to_currency else []
+    writer.writerow(
+        EXPENSE_COLUMNS + converted_columns + ['archived']
+        + [f"{prefix}_{name}" if name in EXPENSE_COLUMNS else name for name in child_columns]
+    )
+
+    for model, archived in _expense_tables(params):
+        child = model.expense_lines if params.rows == 'lines' else model.expense_approvals
+        child_model = child.property.mapper.class_
+        query = select(
+            *[getattr(model, name) for name in EXPENSE_COLUMNS], *[getattr(child_model, name) for name in child_columns]
+        ).outerjoin(child).where(model.company_id == company_id)
+        query = filter_expenses(query, model, params).order_by(model.expense_id, getattr(child_model, child_columns[0]))
+
+        result = db.execute(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            converted = _converted_totals(db, rows, params) if params.to_currency else None
+            for i, row in enumerate(rows):
+                values = [_csv_value(value) for value in row]
+                writer.writerow(
+                    values[:len(EXPENSE_COLUMNS)] + ([converted[i]] if converted is not None else []) + [archived]
+                    + values[len(EXPENSE_COLUMNS):]
+                )
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+def _ndjson_chunks(db: Session, company_id: int, params: schemas.ExpenseExportParams) -> Iterator[bytes]:
+    """One JSON object per expense, with its lines and approvals."""
+    for model, archived in _expense_tables(params):
+        query = select(model).where(model.company_id == company_id)
+        query = filter_expenses(query, model, params).order_by(model.expense_id).options(
+            selectinload(model.expense_lines), selectinload(model.expense_approvals)
+        )
+
+        result = db.execute(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        for expenses in result.scalars().partitions():
+            chunk = bytearray()
+            converted = _converted_totals(db, expenses, params) if params.to_currency else None
+            for i, expense in enumerate(expenses):
+                record = {name: getattr(expense, name) for name in EXPENSE_COLUMNS}
+                if converted is not None:
+                    record[CONVERTED_COLUMN] = converted[i]
+                record['archived'] = archived
+                record['expense_lines'] = [{name: getattr(line, name) for name in LINE_COLUMNS} for line in expense.expense_lines]
+                record['expense_approvals'] = [
+                    {name: getattr(approval, name) for name in APPROVAL_COLUMNS} for approval in expense.expense_approvals
+                ]
+                chunk += orjson.dumps(record)
+                chunk += b"\n"
+            # The session holds loaded objects weakly, so finished batches are freed
+            yield bytes(chunk)
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31) # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def stream_company_expenses(
+    session_factory: Callable[[], Session],
+    company_id: int,
+    params: schemas.ExpenseExportParams
+) -> Iterator[bytes]:
+    """
+    Yields the export of a company's expenses as encoded chunks. The session is
+    opened here and closed when the stream ends, as the stream outlives the request handler.
+    """
+    db = session_factory()
+    try:
+        chunks = _csv_chunks(db, company_id, params) if params.format == 'csv' else _ndjson_chunks(db, company_id, params)
+        yield from (_gzip(chunks) if params.gzip else chunks)
+    finally:
+        db.close()
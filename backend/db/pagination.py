@@ -0,0 +1,71 @@
+import base64
+import datetime
+import json
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from ..models import schemas
+
+# --- Keyset Pagination ---
+# Expense listings are paged by (submission_date, expense_id) instead of by
+# offset: each page continues strictly after the last row of the previous one,
+# so a page costs the same however deep it is, and rows added meanwhile do not
+# shift later pages. The cursor handed to clients is that last key, encoded.
+# Filters are applied in SQL to the Expense model or ArchivedExpense (same columns).
+
+@dataclass
+class Page:
+    items: List = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+def encode_cursor(submission_date: datetime.datetime, expense_id: int) -> str:
+    raw = json.dumps([submission_date.isoformat(), expense_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """Returns the (submission_date, expense_id) key of a cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        submission_date, expense_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(submission_date), int(expense_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def filter_expenses(query, model, params: schemas.ExpenseFilterParams):
+    """Applies the filters of params to a query (ORM Query or select()) over model."""
+    if params.status:
+        query = query.where(model.status.in_(params.status))
+    if params.since:
+        query = query.where(model.submission_date >= datetime.datetime.combine(params.since, datetime.time.min))
+    if params.until:
+        query = query.where(model.submission_date < datetime.datetime.combine(params.until + datetime.timedelta(days=1), datetime.time.min))
+    if params.currency:
+        query = query.where(model.local_currency_code == params.currency.upper())
+    if params.min_amount is not None:
+        query = query.where(model.total_amount_company_currency >= params.min_amount)
+    if params.max_amount is not None:
+        query = query.where(model.total_amount_company_currency <= params.max_amount)
+    return query
+
+def page_query(query: Query, model, params: schemas.ExpenseListParams, sort: str) -> Query:
+    """Orders a query over model by the page key, continues after params.cursor and fetches one extra row."""
+    key = tuple_(model.submission_date, model.expense_id)
+    if params.cursor:
+        after = tuple_(*decode_cursor(params.cursor))
+        query = query.filter(key < after if sort == 'desc' else key > after)
+    if sort == 'desc':
+        query = query.order_by(model.submission_date.desc(), model.expense_id.desc())
+    else:
+        query = query.order_by(model.submission_date, model.expense_id)
+    return query.limit(params.limit + 1)
+
+def make_page(rows: List, params: schemas.ExpenseListParams, sort: str) -> Page:
+    """Builds a page from rows fetched with page_query(), possibly merged from several queries."""
+    rows = sorted(rows, key=lambda row: (row.submission_date, row.expense_id), reverse=sort == 'desc')
+    if len(rows) <= params.limit:
+        return Page(items=rows)
+    items = rows[:params.limit]
+    return Page(items=items, next_cursor=encode_cursor(items[-1].submission_date, items[-1].expense_id))
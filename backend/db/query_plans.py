@@ -0,0 +1,73 @@
+import datetime
+import re
+from typing import Callable, Dict, List
+
+from sqlalchemy import exists, select, tuple_
+from sqlalchemy.orm import Session
+
+from ..models import models
+from . import crud
+
+# --- Hot Query Plans ---
+# The queries below run on every listing, submission and approval. On SQLite,
+# check_hot_query_plans() asks the planner how it would execute each of them
+# and reports any full scan of a large table, e.g. after a missing migration.
+
+# Tables that grow with usage and must never be scanned by a hot query
+LARGE_TABLES = ("expenses", "expense_approvals", "expense_lines", "rule_required_approvers", "rule_normal_approvers")
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?! USING)")
+
+HOT_QUERIES: Dict[str, Callable[[Session], object]] = {
+    # crud.get_user_expenses (a page after a cursor)
+    "user_expenses": lambda db: select(models.Expense).where(
+        models.Expense.employee_id == 1,
+        tuple_(models.Expense.submission_date, models.Expense.expense_id) < tuple_(datetime.datetime(2026, 1, 1), 100)
+    ).order_by(models.Expense.submission_date.desc(), models.Expense.expense_id.desc()).limit(51),
+    # Expense lines loaded for a page of expenses (selectinload)
+    "expense_lines": lambda db: select(models.ExpenseLine).where(models.ExpenseLine.expense_id.in_([1, 2, 3])),
+    # Approvals loaded for a page of expenses (selectinload)
+    "expense_approvals": lambda db: select(models.ExpenseApproval).where(models.ExpenseApproval.expense_id.in_([1, 2, 3])),
+    # crud.can_user_act_on_expense
+    "approval_log_probe": lambda db: select(exists().where(
+        models.ExpenseApproval.expense_id == 1,
+        models.ExpenseApproval.approver_id == 1,
+        models.ExpenseApproval.status == 'Approved'
+    )),
+    # rule_cache.compile_rule
+    "rule_normal_approvers": lambda db: select(models.RuleNormalApprover.sequence, models.RuleNormalApprover.user_id).where(
+        models.RuleNormalApprover.rule_id == 1
+    ),
+    "rule_required_approvers": lambda db: select(models.RuleRequiredApprover.user_id).where(
+        models.RuleRequiredApprover.rule_id == 1,
+        models.RuleRequiredApprover.user_id == 1
+    ),
+    # crud.rebuild_approval_inbox / refresh_approval_state_for_employee
+    "approval_progress": lambda db: crud._approval_progress_query(company_id=1),
+}
+
+def explain(db: Session, statement) -> List[str]:
+    """Returns SQLite's EXPLAIN QUERY PLAN lines for a statement."""
+    connection = db.connection()
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+def check_hot_query_plans(db: Session) -> List[dict]:
+    """
+    Explains every hot query. Each result has the query name, its plan and the
+    large tables it scans without an index (empty when the plan is fine).
+    Only SQLite is supported; other databases return an empty list.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return []
+
+    results = []
+    for name, build in HOT_QUERIES.items():
+        plan = explain(db, build(db))
+        scans = []
+        for line in plan:
+            match = _FULL_SCAN.match(line.strip())
+            if match and match.group(1) in LARGE_TABLES:
+                scans.append(match.group(1))
+        results.append({"query": name, "plan": plan, "full_scans": scans})
+    return results
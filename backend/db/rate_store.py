@@ -0,0 +1,415 @@
+import abc
+import datetime
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from ..models import models
+from ..core.config import settings
+from ..core.exchange_rates import exchange_rate_cache
+from . import database, tenancy
+
+# --- Local Exchange Rate Store ---
+# Rates are read from memory or the exchange_rates table only; the provider
+# is called exclusively by the background refresher below, so submitting an
+# expense never waits on the network.
+
+def store_rates(db: Session, base: str, rates: Dict[str, float], as_of: Optional[datetime.date] = None) -> int:
+    """Inserts or updates one day's rates for a base currency. Returns the number of rates written."""
+    as_of = (as_of or datetime.date.today()).isoformat()
+    existing = {
+        row.quote: row for row in db.query(models.ExchangeRate).filter(
+            models.ExchangeRate.base == base,
+            models.ExchangeRate.as_of == as_of
+        ).all()
+    }
+    now = datetime.datetime.utcnow()
+
+    for quote, rate in rates.items():
+        row = existing.get(quote)
+        if row:
+            row.rate = rate
+            row.fetched_at = now
+        else:
+            db.add(models.ExchangeRate(base=base, quote=quote, rate=rate, as_of=as_of, fetched_at=now))
+
+    db.flush()
+    return len(rates)
+
+class RateQuote(NamedTuple):
+    rate: float
+    as_of: str # Day the rate applies to (YYYY-MM-DD)
+
+def _stored_rate_queries(base: str, quote: str, on_date: Optional[str]) -> List:
+    """Queries for a stored rate, in order: the latest day on or before on_date, else the earliest later day."""
+    query = select(models.ExchangeRate.rate, models.ExchangeRate.as_of).where(
+        models.ExchangeRate.base == base,
+        models.ExchangeRate.quote == quote
+    )
+    if on_date is None:
+        return [query.order_by(models.ExchangeRate.as_of.desc()).limit(1)]
+    return [
+        query.where(models.ExchangeRate.as_of <= on_date).order_by(models.ExchangeRate.as_of.desc()).limit(1),
+        query.where(models.ExchangeRate.as_of > on_date).order_by(models.ExchangeRate.as_of.asc()).limit(1)
+    ]
+
+def _stored_rate(db: Session, base: str, quote: str, on_date: Optional[str]) -> Optional[RateQuote]:
+    """Rate stored for the latest day on or before on_date, else the earliest later day."""
+    for query in _stored_rate_queries(base, quote, on_date):
+        row = db.execute(query).first()
+        if row:
+            return RateQuote(row.rate, row.as_of) if row.rate else None
+    return None
+
+async def _stored_rate_async(db: AsyncSession, base: str, quote: str, on_date: Optional[str]) -> Optional[RateQuote]:
+    for query in _stored_rate_queries(base, quote, on_date):
+        row = (await db.execute(query)).first()
+        if row:
+            return RateQuote(row.rate, row.as_of) if row.rate else None
+    return None
+
+def _cached_rate(from_currency: str, to_currency: str, on_date: Optional[str]) -> Tuple[Optional[RateQuote], Optional[str]]:
+    """
+    The rate when it is known without a query (same currency, or today's rate
+    in memory), and the day to look it up in the table for otherwise.
+    """
+    today = datetime.date.today().isoformat()
+    if from_currency == to_currency:
+        return RateQuote(1.0, on_date or today), on_date
+
+    if on_date is None or on_date >= today:
+        direct = exchange_rate_cache.peek(from_currency)
+        if direct and direct.get(to_currency):
+            return RateQuote(direct[to_currency], today), None
+        inverse = exchange_rate_cache.peek(to_currency)
+        if inverse and inverse.get(from_currency):
+            return RateQuote(1.0 / inverse[from_currency], today), None
+        return None, None
+    return None, on_date
+
+def _inverted(found: Optional[RateQuote]) -> Optional[RateQuote]:
+    return RateQuote(1.0 / found.rate, found.as_of) if found else None
+
+def find_rate(
+    db: Session,
+    from_currency: str,
+    to_currency: str,
+    on_date: Optional[str] = None
+) -> Optional[RateQuote]:
+    """
+    Returns the rate from one currency to another without calling the provider.
+
+    Today's rates come from the in-memory cache when it holds them, otherwise
+    from the exchange_rates table (the rate stored for on_date, a YYYY-MM-DD
+    string, or the latest one). A pair is also resolved through its inverse,
+    so fetching the company currencies as bases covers every expense currency.
+    Returns None when no rate is known yet.
+    """
+    found, on_date = _cached_rate(from_currency, to_currency, on_date)
+    if found:
+        return found
+    return (_stored_rate(db, from_currency, to_currency, on_date)
+            or _inverted(_stored_rate(db, to_currency, from_currency, on_date)))
+
+async def find_rate_async(
+    db: AsyncSession,
+    from_currency: str,
+    to_currency: str,
+    on_date: Optional[str] = None
+) -> Optional[RateQuote]:
+    """find_rate() on an async session."""
+    found, on_date = _cached_rate(from_currency, to_currency, on_date)
+    if found:
+        return found
+    return (await _stored_rate_async(db, from_currency, to_currency, on_date)
+            or _inverted(await _stored_rate_async(db, to_currency, from_currency, on_date)))
+
+def lookup_rate(
+    db: Session,
+    from_currency: str,
+    to_currency: str,
+    on_date: Optional[str] = None
+) -> Optional[float]:
+    """Like find_rate, but returns only the rate."""
+    found = find_rate(db, from_currency, to_currency, on_date)
+    return found.rate if found else None
+
+def rate_date_for_lines(lines) -> Optional[str]:
+    """Date to convert an expense at: its most recent valid line date, if any (YYYY-MM-DD)."""
+    dates = []
+    for line in lines:
+        try:
+            dates.append(datetime.date.fromisoformat(line.date).isoformat())
+        except (TypeError, ValueError):
+            continue
+    return max(dates) if dates else None
+
+def is_provisional(found: Optional[RateQuote], on_date: Optional[str]) -> bool:
+    """
+    A rate is provisional when none was known, or when it is older than the
+    day it was wanted for (e.g. the last known rate while the provider is
+    unreachable). Such expenses are re-priced by reprice_provisional_expenses.
+    """
+    target = min(on_date or datetime.date.today().isoformat(), datetime.date.today().isoformat())
+    return found is None or found.as_of < target
+
+# --- Re-pricing ---
+
+def _rate_on_or_after(db: Session, from_currency: str, to_currency: str, on_date: str) -> Optional[float]:
+    if from_currency == to_currency:
+        return 1.0
+    for base, quote, inverse in ((from_currency, to_currency, False), (to_currency, from_currency, True)):
+        row = db.query(models.ExchangeRate.rate).filter(
+            models.ExchangeRate.base == base,
+            models.ExchangeRate.quote == quote,
+            models.ExchangeRate.as_of >= on_date
+        ).order_by(models.ExchangeRate.as_of.asc()).first()
+        if row and row.rate:
+            return 1.0 / row.rate if inverse else row.rate
+    return None
+
+def reprice_provisional_expenses(db: Session, company_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """
+    Re-prices expenses converted at a provisional rate, using the first rate
+    stored on or after the day they were wanted for. Expenses for which no
+    such rate exists yet stay provisional. Returns the number re-priced.
+    """
+    query = db.query(models.Expense, models.Company.default_currency_code).join(
+        models.Company, models.Company.company_id == models.Expense.company_id
+    ).filter(
+        models.Expense.rate_provisional == True
+    ).options(selectinload(models.Expense.expense_lines))
+    if company_id is not None:
+        query = query.filter(models.Expense.company_id == company_id)
+
+    repriced = 0
+    last_id = 0
+    while True:
+        batch = query.filter(
+            models.Expense.expense_id > last_id
+        ).order_by(models.Expense.expense_id).limit(batch_size).all()
+        if not batch:
+            break
+
+        for expense, company_currency in batch:
+            last_id = expense.expense_id
+            submitted = expense.submission_date.date().isoformat()
+            target = min(rate_date_for_lines(expense.expense_lines) or submitted, submitted)
+            rate = _rate_on_or_after(db, expense.local_currency_code, company_currency, target)
+            if rate is None:
+                continue
+            expense.exchange_rate = rate
+            expense.total_amount_company_currency = expense.total_amount_local * rate
+            expense.rate_provisional = False
+            repriced += 1
+        db.commit()
+
+    print(f"Re-priced {repriced} expense(s) with provisional exchange rates")
+    return repriced
+
+# --- Deferred Conversion ---
+# With FX_DEFERRED_CONVERSION, submitting an expense in a foreign currency
+# stores it with exchange_rate NULL and returns; the conversion worker below
+# fills in the rate afterwards. Without it, an expense whose rate is not
+# stored yet is queued the same way instead of being priced at a guess. Queued expenses are grouped by currency pair
+# and rate date, so each batch needs one rate lookup per group.
+
+def _conversion_date(expense: models.Expense) -> str:
+    """Day an expense is converted at: its latest line date, but no later than its submission day."""
+    submitted = expense.submission_date.date().isoformat()
+    return min(rate_date_for_lines(expense.expense_lines) or submitted, submitted)
+
+def convert_pending_expenses(db: Session, batch_size: Optional[int] = None) -> int:
+    """
+    Fills in exchange_rate and total_amount_company_currency of queued expenses.
+    Expenses whose rate is not known yet stay queued and the refresher is
+    asked to fetch it. Returns the number of expenses converted.
+    """
+    batch_size = batch_size or settings.FX_CONVERSION_BATCH_SIZE
+    query = db.query(models.Expense, models.Company.default_currency_code).join(
+        models.Company, models.Company.company_id == models.Expense.company_id
+    ).filter(
+        models.Expense.exchange_rate.is_(None)
+    ).options(selectinload(models.Expense.expense_lines))
+
+    converted = 0
+    last_id = 0
+    while True:
+        batch = query.filter(
+            models.Expense.expense_id > last_id
+        ).order_by(models.Expense.expense_id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1][0].expense_id
+
+        groups: Dict[tuple, list] = {}
+        for expense, company_currency in batch:
+            key = (expense.local_currency_code, company_currency, _conversion_date(expense))
+            groups.setdefault(key, []).append(expense)
+
+        for (from_currency, to_currency, on_date), expenses in groups.items():
+            found = find_rate(db, from_currency, to_currency, on_date)
+            if found is None:
+                exchange_rate_refresher.request(from_currency, to_currency)
+                continue
+            provisional = is_provisional(found, on_date)
+            for expense in expenses:
+                expense.exchange_rate = found.rate
+                expense.total_amount_company_currency = expense.total_amount_local * found.rate
+                expense.rate_provisional = provisional
+            converted += len(expenses)
+        db.commit()
+
+    if converted:
+        print(f"Converted {converted} queued expense(s)")
+    return converted
+
+# --- Background Workers ---
+
+class _BackgroundWorker(abc.ABC):
+    """A daemon thread that runs run_once() every interval, or sooner when notified."""
+
+    name = "background-worker"
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[datetime.datetime] = None
+
+    def enabled(self) -> bool:
+        return True
+
+    @abc.abstractmethod
+    def interval(self) -> float:
+        """Seconds to wait between runs."""
+
+    @abc.abstractmethod
+    def run_once(self):
+        """Does one pass of the worker's job."""
+
+    def notify(self) -> None:
+        """Wakes the worker before its next scheduled run."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"{self.name} error: {e}")
+            self._wake.wait(self.interval())
+            self._wake.clear()
+
+    def start(self) -> None:
+        """Starts the worker thread (no-op when disabled or already running)."""
+        if not self.enabled() or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+class ExchangeRateRefresher(_BackgroundWorker):
+    """
+    Periodically pulls rates for the configured bases into memory and the database.
+
+    The bases are every company's default currency, FX_REFRESH_BASES, and any
+    currency a lookup found missing (see request()), which also wakes the
+    refresher before its next scheduled run.
+    """
+
+    name = "exchange-rate-refresher"
+
+    def __init__(self):
+        super().__init__()
+        self._requested: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def enabled(self) -> bool:
+        return settings.FX_REFRESH_ENABLED
+
+    def interval(self) -> float:
+        return settings.FX_REFRESH_INTERVAL_SECONDS
+
+    def request(self, *currencies: str) -> None:
+        """Asks for rates of these base currencies to be fetched soon."""
+        with self._lock:
+            self._requested.update(currencies)
+        self.notify()
+
+    def _bases(self, db: Session) -> Set[str]:
+        company_currencies = {
+            code for (code,) in db.query(models.Company.default_currency_code).distinct().all()
+        }
+        with self._lock:
+            requested, self._requested = self._requested, set()
+        return company_currencies | set(settings.FX_REFRESH_BASES) | requested
+
+    def run_once(self) -> Dict[str, int]:
+        return self.refresh_once()
+
+    def refresh_once(self, bases: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Fetches and stores the rates of every base once, then re-prices expenses
+        converted at a provisional rate and wakes the conversion worker.
+        Returns the number of rates stored per base.
+        """
+        db = database.SessionLocal()
+        stored = {}
+        try:
+            for base in sorted(set(bases) if bases is not None else self._bases(db)):
+                try:
+                    rates = exchange_rate_cache.get_rates(base, force=True)
+                    stored[base] = store_rates(db, base, rates)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    print(f"Exchange rate refresh failed for {base}: {e}")
+        finally:
+            db.close()
+        if stored:
+            for session_factory in tenancy.session_factories():
+                shard_db = session_factory()
+                try:
+                    reprice_provisional_expenses(shard_db)
+                finally:
+                    shard_db.close()
+        self.last_run = datetime.datetime.utcnow()
+        print(f"Exchange rates refreshed: {stored}")
+        if stored:
+            currency_converter.notify()
+        return stored
+
+class CurrencyConverter(_BackgroundWorker):
+    """Converts queued expenses shortly after they are submitted (see convert_pending_expenses)."""
+
+    name = "currency-converter"
+
+    def interval(self) -> float:
+        return settings.FX_CONVERSION_INTERVAL_SECONDS
+
+    def run_once(self) -> int:
+        converted = 0
+        # The primary and every tenant shard
+        for session_factory in tenancy.session_factories():
+            db = session_factory()
+            try:
+                converted += convert_pending_expenses(db)
+            finally:
+                db.close()
+        self.last_run = datetime.datetime.utcnow()
+        return converted
+
+# Single process-wide workers
+exchange_rate_refresher = ExchangeRateRefresher()
+currency_converter = CurrencyConverter()
@@ -0,0 +1,249 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import models
+
+# --- Compiled Approval Rules ---
+# Rules change rarely but are evaluated on every submission, approval and
+# authorization check. A compiled rule holds everything the workflow needs
+# in memory, so evaluating it costs no queries.
+#
+# A cached rule remembers its company's data_version (see company_version.py)
+# from when it was compiled. Every write to a rule bumps that version in the
+# writer's transaction, whichever process it runs in, so a cached rule is only
+# used while the version is unchanged. The version is read once per session.
+
+def normal_approvals_needed(normal_count: int, approval_percentage: Optional[float]) -> int:
+    """Number of normal approvals a rule needs, based on its approval percentage."""
+    approval_percentage = approval_percentage if approval_percentage else 100.0
+    if approval_percentage >= 100.0:
+        return normal_count
+    return math.ceil(normal_count * (approval_percentage / 100.0))
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """Immutable, query-free view of an ApprovalRule and its approvers."""
+    rule_id: int
+    company_id: int
+    name: str
+    approval_percentage: Optional[float]
+    required_ids: FrozenSet[int]
+    normal_approvers: Tuple[Tuple[int, int], ...] # (sequence, user_id), ordered by sequence
+    normal_needed: int
+
+    @property
+    def normal_sequences(self) -> Tuple[int, ...]:
+        return tuple(sequence for sequence, _ in self.normal_approvers)
+
+    def is_normal_approver(self, user_id: int) -> bool:
+        return self.normal_sequence_of(user_id) is not None
+
+    def normal_sequence_of(self, user_id: int) -> Optional[int]:
+        """First sequence at which the user appears as a normal approver."""
+        for sequence, approver_id in self.normal_approvers:
+            if approver_id == user_id:
+                return sequence
+        return None
+
+    def next_normal_sequence(self, normal_approvals_done: int) -> Optional[int]:
+        """Sequence whose turn it is once the first normal_approvals_done normal approvers have approved."""
+        if normal_approvals_done < len(self.normal_approvers):
+            return self.normal_approvers[normal_approvals_done][0]
+        return None
+
+def _rule_queries(rule_id: int):
+    """The rule, its required approvers and its normal approvers, ordered by sequence."""
+    return (
+        select(models.ApprovalRule).where(models.ApprovalRule.rule_id == rule_id).limit(1),
+        select(models.RuleRequiredApprover.user_id).where(models.RuleRequiredApprover.rule_id == rule_id),
+        select(
+            models.RuleNormalApprover.sequence,
+            models.RuleNormalApprover.user_id
+        ).where(
+            models.RuleNormalApprover.rule_id == rule_id
+        ).order_by(models.RuleNormalApprover.sequence, models.RuleNormalApprover.id)
+    )
+
+def _compiled(rule: models.ApprovalRule, required: List[int], normal: List[Tuple[int, int]]) -> CompiledRule:
+    return CompiledRule(
+        rule_id=rule.rule_id,
+        company_id=rule.company_id,
+        name=rule.name,
+        approval_percentage=rule.approval_percentage,
+        required_ids=frozenset(required),
+        normal_approvers=tuple((sequence, user_id) for sequence, user_id in normal),
+        normal_needed=normal_approvals_needed(len(normal), rule.approval_percentage)
+    )
+
+def compile_rule(db: Session, rule_id: int) -> Optional[CompiledRule]:
+    """Loads a rule and its approvers from the database and compiles them."""
+    rule_query, required_query, normal_query = _rule_queries(rule_id)
+    rule = db.execute(rule_query).scalar()
+    if not rule:
+        return None
+    return _compiled(rule, db.execute(required_query).scalars().all(), db.execute(normal_query).all())
+
+async def compile_rule_async(db: AsyncSession, rule_id: int) -> Optional[CompiledRule]:
+    """compile_rule() on an async session."""
+    rule_query, required_query, normal_query = _rule_queries(rule_id)
+    rule = (await db.execute(rule_query)).scalar()
+    if not rule:
+        return None
+    return _compiled(rule, (await db.execute(required_query)).scalars().all(), (await db.execute(normal_query)).all())
+
+def _data_version_query(company_id: int):
+    return select(models.Company.data_version).where(models.Company.company_id == company_id)
+
+def company_data_version(db: Session, company_id: int) -> Optional[int]:
+    """The company's data_version, read once per session (until it commits or rolls back)."""
+    versions = db.info.setdefault("company_data_versions", {})
+    if company_id not in versions:
+        versions[company_id] = db.execute(_data_version_query(company_id)).scalar()
+    return versions[company_id]
+
+async def company_data_version_async(db: AsyncSession, company_id: int) -> Optional[int]:
+    """company_data_version() on an async session (sharing its session's memo)."""
+    versions = db.info.setdefault("company_data_versions", {})
+    if company_id not in versions:
+        versions[company_id] = (await db.execute(_data_version_query(company_id))).scalar()
+    return versions[company_id]
+
+class RuleCache:
+    """
+    Thread-safe, size-bounded LRU cache of compiled rules keyed by rule_id,
+    each valid for the company data_version it was compiled at.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._rules: "OrderedDict[int, Tuple[CompiledRule, Optional[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale = 0
+
+    def get(self, db: Session, rule_id: Optional[int]) -> Optional[CompiledRule]:
+        """Returns the compiled rule, compiling and caching it on a miss or when its company changed."""
+        if rule_id is None:
+            return None
+
+        entry = self._entry(rule_id)
+        if entry is not None:
+            compiled = self._validate(rule_id, entry, company_data_version(db, entry[0].company_id))
+            if compiled is not None:
+                return compiled
+
+        self._count_miss()
+        compiled = compile_rule(db, rule_id)
+        if compiled is None:
+            # Do not cache unknown ids: the rule may be created later
+            return None
+        # Read after the rule: a change committed in between makes the entry stale, not wrong
+        self._store(rule_id, compiled, company_data_version(db, compiled.company_id))
+        return compiled
+
+    async def get_async(self, db: AsyncSession, rule_id: Optional[int]) -> Optional[CompiledRule]:
+        """get() on an async session."""
+        if rule_id is None:
+            return None
+
+        entry = self._entry(rule_id)
+        if entry is not None:
+            compiled = self._validate(rule_id, entry, await company_data_version_async(db, entry[0].company_id))
+            if compiled is not None:
+                return compiled
+
+        self._count_miss()
+        compiled = await compile_rule_async(db, rule_id)
+        if compiled is None:
+            return None
+        self._store(rule_id, compiled, await company_data_version_async(db, compiled.company_id))
+        return compiled
+
+    def _entry(self, rule_id: int) -> Optional[Tuple[CompiledRule, Optional[int]]]:
+        with self._lock:
+            return self._rules.get(rule_id)
+
+    def _validate(self, rule_id: int, entry: Tuple[CompiledRule, Optional[int]], current: Optional[int]) -> Optional[CompiledRule]:
+        """The cached rule if its company is still at the version it was compiled at, else None."""
+        compiled, version = entry
+        with self._lock:
+            if current == version:
+                self.hits += 1
+                if rule_id in self._rules:
+                    self._rules.move_to_end(rule_id)
+                return compiled
+            # Changed by another process since it was compiled
+            self.stale += 1
+            return None
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def _store(self, rule_id: int, compiled: CompiledRule, version: Optional[int]) -> None:
+        with self._lock:
+            self._rules[rule_id] = (compiled, version)
+            self._rules.move_to_end(rule_id)
+            while len(self._rules) > self.max_size:
+                self._rules.popitem(last=False)
+
+    def invalidate(self, rule_id: int) -> None:
+        with self._lock:
+            if self._rules.pop(rule_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rules.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._rules),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "stale": self.stale
+            }
+
+# Single process-wide cache
+rule_cache = RuleCache()
+
+# --- Invalidation ---
+# Any ORM write to a rule or its approvers in this process invalidates the
+# cached rule at flush time, and again after commit so a concurrent reader
+# cannot keep a version compiled between the flush and the commit. Writes in
+# other processes are caught by the data_version check in RuleCache.get().
+
+def _invalidate_on_write(mapper, connection, target) -> None:
+    rule_id = target.rule_id
+    rule_cache.invalidate(rule_id)
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_rule_ids", set()).add(rule_id)
+        session.info.pop("company_data_versions", None)
+
+for _model in (models.ApprovalRule, models.RuleRequiredApprover, models.RuleNormalApprover):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _invalidate_on_write)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    session.info.pop("company_data_versions", None)
+    for rule_id in session.info.pop("invalidated_rule_ids", ()):
+        rule_cache.invalidate(rule_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop("company_data_versions", None)
+    session.info.pop("invalidated_rule_ids", None)
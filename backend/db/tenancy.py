@@ -0,0 +1,562 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Tuple
+
+from alembic import command
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import MetaData, event, func, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, object_session, selectinload, sessionmaker
+
+from ..core.config import settings
+from ..models import models
+from ..models.models import Base
+from . import database
+
+# --- Tenant Shards ---
+# With settings.TENANT_SHARDS, a company's expenses can live in a shard of
+# their own, so tenants on different shards do not share a write lock. A
+# shard holds only the high-volume tenant tables below; companies, users,
+# rules and exchange rates stay in the primary database (the directory).
+#
+# On SQLite a shard is a separate file and its connections ATTACH the primary
+# file; on PostgreSQL a shard is a schema and its connections put it first on
+# the search_path. Either way unqualified table names resolve to the shard's
+# tenant tables and to the primary's directory tables, so every CRUD function
+# runs unchanged on a shard session.
+#
+# Shards are versioned like the primary, with their own alembic_version table
+# (see Shard.migrate()), and database.migrate() upgrades them after the primary.
+#
+# The tenant_shards table maps companies to shards (companies without a row
+# stay in the primary). Sessions are routed by the authenticated user's
+# company, see database.get_db(). move_company() moves a company between shards.
+#
+# Each process caches a company's shard for TENANT_ROUTE_TTL_SECONDS, and a
+# move may run in another process (`manage move-company`). So a move fences
+# the company first: a tenant_fences row in the source refuses commits that
+# write the company's tenant rows there (see _check_write_fence()), while reads
+# go on. Workers still using the old route read the old copy, which is deleted
+# by purge_moved_companies() once the TTL has passed; the fence stays.
+#
+# Expense, line and approval ids are allocated from the directory (see
+# "Tenant Row Ids" below), so they are unique across shards and a move keeps them.
+
+DEFAULT_SHARD = "default"
+SHARD_BASELINE_REVISION = "0004" # Revision that introduced shards; unversioned shards are stamped at it
+
+TENANT_TABLES = [
+    models.Expense.__table__,
+    models.ExpenseLine.__table__,
+    models.ExpenseApproval.__table__,
+    models.ApprovalInbox.__table__,
+    models.ArchivedExpense.__table__,
+    models.ArchivedExpenseLine.__table__,
+    models.ArchivedExpenseApproval.__table__,
+    models.TenantFence.__table__,
+]
+
+_lock = threading.Lock()
+_shards: Dict[str, "Shard"] = {}
+_company_shards: Dict[int, Tuple[str, float]] = {} # company -> (shard, time.monotonic() it expires)
+_user_companies_lock = threading.Lock()
+_user_companies: "OrderedDict[int, int]" = OrderedDict() # user -> company, least recently used first
+
+def sharding_enabled() -> bool:
+    return bool(settings.TENANT_SHARDS)
+
+def _is_sqlite() -> bool:
+    return make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
+
+def _route_names_on_connect(sync_engine: Engine, location: str) -> None:
+    """Makes the shard's connections see its tenant tables and the primary's directory tables."""
+    if _is_sqlite():
+        directory = database.engine.url.database
+
+        @event.listens_for(sync_engine, "connect")
+        def _attach_directory(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("ATTACH DATABASE ? AS directory", (directory,))
+            cursor.close()
+    else:
+        @event.listens_for(sync_engine, "connect")
+        def _set_search_path(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f'SET search_path TO "{location}", public')
+            cursor.close()
+
+class Shard:
+    """Engines and session factories of one shard."""
+
+    def __init__(self, name: str, location: str):
+        self.name = name
+        self.location = location
+        url = f"sqlite:///{location}" if _is_sqlite() else None
+        self.engine = database.build_engine(url)
+        _route_names_on_connect(self.engine, location)
+        self.async_engine = database.build_async_engine(url)
+        _route_names_on_connect(self.async_engine.sync_engine, location)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=self.engine)
+        self.AsyncSessionLocal = async_sessionmaker(bind=self.async_engine, autoflush=False, expire_on_commit=False)
+
+    @property
+    def schema(self) -> Optional[str]:
+        """The shard's PostgreSQL schema (None on SQLite, where the shard is a file)."""
+        return None if _is_sqlite() else self.location
+
+    def _create_tables(self, connection: Connection) -> None:
+        if self.schema is None:
+            Base.metadata.create_all(bind=connection, tables=TENANT_TABLES)
+            return
+        # Copies of the tenant tables in the shard's schema; foreign keys to
+        # directory tables keep pointing at the public schema
+        tenant_names = {table.name for table in TENANT_TABLES}
+        metadata = MetaData()
+        for table in TENANT_TABLES:
+            table.to_metadata(
+                metadata,
+                schema=self.schema,
+                referred_schema_fn=lambda table, to_schema, constraint, referred_schema:
+                    to_schema if constraint.referred_table.name in tenant_names else referred_schema
+            )
+        metadata.create_all(bind=connection)
+
+    def migrate(self, revision: str = "head") -> Optional[str]:
+        """
+        Brings the shard's tenant tables up to date and returns the revision the
+        shard was at before (None for a new shard). A new shard is created from
+        the models at head; a shard created before shards were versioned is
+        stamped at SHARD_BASELINE_REVISION first, so only the later revisions run.
+        """
+        # On SQLite a plain connection, so the directory's tables do not count as existing
+        engine = database.engine if self.schema else database.build_engine(f"sqlite:///{self.location}")
+        try:
+            with engine.begin() as connection:
+                if self.schema:
+                    connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{self.schema}"'))
+                    connection.execute(text(f'SET LOCAL search_path TO "{self.schema}", public'))
+                before = MigrationContext.configure(
+                    connection, opts={"version_table_schema": self.schema}
+                ).get_current_revision()
+                config = database.alembic_config(connection)
+                config.attributes["tenant_shard"] = self.name
+                config.attributes["version_table_schema"] = self.schema
+
+                if before is None and not inspect(connection).has_table("expenses", schema=self.schema):
+                    self._create_tables(connection)
+                    command.stamp(config, "head")
+                    return None
+                if before is None:
+                    command.stamp(config, SHARD_BASELINE_REVISION)
+                    before = SHARD_BASELINE_REVISION
+                command.upgrade(config, revision)
+        finally:
+            if engine is not database.engine:
+                engine.dispose()
+        return before
+
+def get_shard(name: str) -> Shard:
+    """The shard configured under name in TENANT_SHARDS, with its tables created and migrated."""
+    if name not in settings.TENANT_SHARDS:
+        raise ValueError(f"Unknown shard '{name}'; configured shards: {', '.join(settings.TENANT_SHARDS) or 'none'}")
+    with _lock:
+        shard = _shards.get(name)
+        if shard is None:
+            shard = Shard(name, settings.TENANT_SHARDS[name])
+            shard.migrate()
+            _shards[name] = shard
+    return shard
+
+def migrate_shards(revision: str = "head") -> None:
+    """Applies pending migrations to every configured shard."""
+    for name in settings.TENANT_SHARDS:
+        get_shard(name).migrate(revision)
+        print(f"Shard '{name}' migrated to revision {revision}")
+    sync_id_blocks()
+
+def shard_for_company(company_id: int) -> str:
+    """Name of the shard holding a company's expenses (DEFAULT_SHARD for the primary)."""
+    cached = _company_shards.get(company_id)
+    if cached is not None and time.monotonic() < cached[1]:
+        return cached[0]
+    db = database.SessionLocal()
+    try:
+        row = db.get(models.TenantShard, company_id)
+    finally:
+        db.close()
+    shard = row.shard if row else DEFAULT_SHARD
+    _company_shards[company_id] = (shard, time.monotonic() + settings.TENANT_ROUTE_TTL_SECONDS)
+    return shard
+
+def company_of_user(user_id: int) -> Optional[int]:
+    """A user's company, cached for the TENANT_USER_CACHE_SIZE most recent users since users never change company."""
+    with _user_companies_lock:
+        company_id = _user_companies.get(user_id)
+        if company_id is not None:
+            _user_companies.move_to_end(user_id)
+            return company_id
+
+    db = database.SessionLocal()
+    try:
+        company_id = db.query(models.User.company_id).filter(models.User.user_id == user_id).scalar()
+    finally:
+        db.close()
+    if company_id is not None:
+        with _user_companies_lock:
+            _user_companies[user_id] = company_id
+            _user_companies.move_to_end(user_id)
+            while len(_user_companies) > settings.TENANT_USER_CACHE_SIZE:
+                _user_companies.popitem(last=False)
+    return company_id
+
+def shard_for_user(user_id: Optional[int]) -> str:
+    """The shard of a user's company; DEFAULT_SHARD without sharding or for unknown users."""
+    if not sharding_enabled() or user_id is None:
+        return DEFAULT_SHARD
+    company_id = company_of_user(user_id)
+    return shard_for_company(company_id) if company_id is not None else DEFAULT_SHARD
+
+def session_factory(shard: str) -> Callable[[], Session]:
+    return database.SessionLocal if shard == DEFAULT_SHARD else get_shard(shard).SessionLocal
+
+def async_session_factory(shard: str):
+    return database.AsyncSessionLocal if shard == DEFAULT_SHARD else get_shard(shard).AsyncSessionLocal
+
+def session_factories() -> List[Callable[[], Session]]:
+    """Session factories of the primary and every configured shard, for jobs that cover all tenants."""
+    return [database.SessionLocal] + [get_shard(name).SessionLocal for name in settings.TENANT_SHARDS]
+
+def company_session_factory(company_id: int) -> Callable[[], Session]:
+    return session_factory(shard_for_company(company_id)) if sharding_enabled() else database.SessionLocal
+
+def company_async_session_factory(company_id: int):
+    return async_session_factory(shard_for_company(company_id)) if sharding_enabled() else database.AsyncSessionLocal
+
+# --- Tenant Row Ids ---
+# Expenses, lines and approvals keep their ids when their company moves, so
+# ids must not collide across the primary and the shards: they are assigned
+# here instead of by each database's own sequence. A process reserves
+# TENANT_ID_BLOCK_SIZE ids of a table at a time from the directory's
+# tenant_id_blocks table, in the transaction of the insert that needs them,
+# and shares the rest of the block with its other sessions only once that
+# transaction commits (after a rollback the directory hands the block out
+# again). Ids left in a block when the process exits are skipped.
+
+# Allocated models and their archive models, which keep the ids
+ID_MODELS = {
+    models.Expense: models.ArchivedExpense,
+    models.ExpenseLine: models.ArchivedExpenseLine,
+    models.ExpenseApproval: models.ArchivedExpenseApproval,
+}
+_RESERVED_IDS = "tenancy.reserved_ids" # session.info key: blocks reserved in the session's transaction
+
+_id_lock = threading.Lock()
+_free_ids: Dict[Tuple[str, str], range] = {} # (directory URL, table) -> committed ids not handed out yet
+
+def _take(free: Dict[Tuple[str, str], range], key: Tuple[str, str], count: int) -> List[int]:
+    ids = free.get(key, range(0))
+    free[key] = ids[count:]
+    return list(ids[:count])
+
+def _take_ids(db, table: str, count: int) -> List[int]:
+    """Up to count ids from the process's committed blocks, then from the blocks db's transaction reserved."""
+    key = (str(database.engine.url), table)
+    with _id_lock:
+        ids = _take(_free_ids, key, count)
+    if len(ids) < count:
+        ids += _take(db.info.setdefault(_RESERVED_IDS, {}), key, count - len(ids))
+    return ids
+
+def _reserve_block(table: str, size: int):
+    block = models.TenantIdBlock
+    return update(block).where(block.table_name == table).values(next_id=block.next_id + size).returning(block.next_id)
+
+def _use_block(db, table: str, next_id: int, size: int, count: int) -> List[int]:
+    """The first count ids of the block reserved up to next_id; the rest stays with db's transaction."""
+    block = range(next_id - size, next_id)
+    db.info.setdefault(_RESERVED_IDS, {})[(str(database.engine.url), table)] = block[count:]
+    return list(block[:count])
+
+def allocate_ids(db: Session, table: str, count: int, connection: Optional[Connection] = None) -> List[int]:
+    """
+    count new ids for rows of table (one of ID_MODELS) inserted in db's
+    transaction. connection is the session's connection inside flush events.
+    """
+    ids = _take_ids(db, table, count)
+    missing = count - len(ids)
+    if missing:
+        size = max(missing, settings.TENANT_ID_BLOCK_SIZE)
+        next_id = (connection or db).execute(_reserve_block(table, size)).scalar_one()
+        ids += _use_block(db, table, next_id, size, missing)
+    return ids
+
+async def allocate_ids_async(db: AsyncSession, table: str, count: int) -> List[int]:
+    """allocate_ids() on an async session."""
+    ids = _take_ids(db, table, count)
+    missing = count - len(ids)
+    if missing:
+        size = max(missing, settings.TENANT_ID_BLOCK_SIZE)
+        next_id = (await db.execute(_reserve_block(table, size))).scalar_one()
+        ids += _use_block(db, table, next_id, size, missing)
+    return ids
+
+def _assign_id(mapper, connection: Connection, target) -> None:
+    key = mapper.primary_key[0].key
+    if getattr(target, key) is None:
+        setattr(target, key, allocate_ids(object_session(target), mapper.local_table.name, 1, connection)[0])
+
+for model in ID_MODELS:
+    event.listen(model, "before_insert", _assign_id)
+
+@event.listens_for(Session, "after_commit")
+def _share_reserved_ids(session: Session) -> None:
+    reserved = session.info.pop(_RESERVED_IDS, None)
+    if reserved:
+        with _id_lock:
+            for key, ids in reserved.items():
+                # Of two partial blocks the shorter one is dropped
+                if len(ids) > len(_free_ids.get(key, ())):
+                    _free_ids[key] = ids
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_reserved_ids(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_RESERVED_IDS, None)
+
+def sync_id_blocks() -> None:
+    """Raises the directory's id blocks above the ids used in the primary and every shard."""
+    highest = {}
+    for session_factory in session_factories():
+        db = session_factory()
+        try:
+            for model, archived in ID_MODELS.items():
+                key = inspect(model).primary_key[0].key
+                for table_model in (model, archived):
+                    found = db.query(func.max(getattr(table_model, key))).scalar() or 0
+                    highest[model.__tablename__] = max(highest.get(model.__tablename__, 0), found)
+        finally:
+            db.close()
+
+    db = database.SessionLocal()
+    try:
+        for table, found in highest.items():
+            db.query(models.TenantIdBlock).filter(
+                models.TenantIdBlock.table_name == table,
+                models.TenantIdBlock.next_id <= found
+            ).update({"next_id": found + 1}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+# --- Write Fence ---
+# Sessions note whether they wrote tenant rows; with sharding enabled, a
+# request's commit that did is refused while its company is fenced in the
+# session's database. Background jobs run without a user and are not fenced.
+
+class CompanyMovingError(Exception):
+    """A request wrote rows of a company that is being moved to another shard."""
+
+    def __init__(self, company_id: int):
+        super().__init__(f"Company {company_id} is being moved to another shard; retry shortly")
+        self.company_id = company_id
+
+FENCE_LOCK = 0x7465 # PostgreSQL advisory lock class of the fences; the company id is the key
+_TENANT_WRITE = "tenancy.tenant_write" # session.info key: the transaction wrote tenant rows
+_FENCED_TABLES = {table.name for table in TENANT_TABLES if table is not models.TenantFence.__table__}
+
+@event.listens_for(Session, "after_flush")
+def _note_tenant_flush(session: Session, flush_context) -> None:
+    if sharding_enabled() and any(
+        getattr(type(instance), "__tablename__", None) in _FENCED_TABLES
+        for instance in chain(session.new, session.dirty, session.deleted)
+    ):
+        session.info[_TENANT_WRITE] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_tenant_statement(orm_execute_state) -> None:
+    if not sharding_enabled() or not (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if getattr(table, "name", None) in _FENCED_TABLES:
+        orm_execute_state.session.info[_TENANT_WRITE] = True
+
+@event.listens_for(Session, "before_commit")
+def _check_write_fence(session: Session) -> None:
+    if not session.info.pop(_TENANT_WRITE, False):
+        return
+    user_id = database.current_user_id.get()
+    company_id = company_of_user(user_id) if user_id is not None else None
+    if company_id is None:
+        return
+
+    connection = session.connection()
+    if connection.dialect.name == "postgresql":
+        # Held until this commit ends, so a move cannot fence the company in between
+        connection.execute(select(func.pg_advisory_xact_lock_shared(FENCE_LOCK, company_id)))
+    fenced = connection.execute(
+        select(models.TenantFence.company_id).where(models.TenantFence.company_id == company_id)
+    ).first()
+    if fenced:
+        # The retry looks the company's shard up again
+        _company_shards.pop(company_id, None)
+        raise CompanyMovingError(company_id)
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_tenant_write(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_TENANT_WRITE, None)
+
+def _fence(db: Session, company_id: int, target: str) -> None:
+    """Refuses further request writes to the company in db's database and commits."""
+    if db.connection().dialect.name == "postgresql":
+        # Waits for commits that checked the fence before it existed
+        db.execute(select(func.pg_advisory_xact_lock(FENCE_LOCK, company_id)))
+    db.merge(models.TenantFence(company_id=company_id, moved_to=target, fenced_at=datetime.datetime.utcnow(), moved_at=None))
+    db.commit()
+
+def _unfence(db: Session, company_id: int) -> None:
+    db.query(models.TenantFence).filter(models.TenantFence.company_id == company_id).delete(synchronize_session=False)
+    db.commit()
+
+# --- Moving Companies ---
+
+def _copy(row):
+    """A new, unsaved copy of an ORM row, ids included."""
+    mapper = inspect(type(row))
+    return mapper.class_(**{attr.key: getattr(row, attr.key) for attr in mapper.column_attrs})
+
+def _delete_company_rows(db: Session, company_id: int) -> int:
+    archived_ids = db.query(models.ArchivedExpense.expense_id).filter(models.ArchivedExpense.company_id == company_id).scalar_subquery()
+    db.query(models.ArchivedExpenseApproval).filter(models.ArchivedExpenseApproval.expense_id.in_(archived_ids)).delete(synchronize_session=False)
+    db.query(models.ArchivedExpenseLine).filter(models.ArchivedExpenseLine.expense_id.in_(archived_ids)).delete(synchronize_session=False)
+    archived = db.query(models.ArchivedExpense).filter(models.ArchivedExpense.company_id == company_id).delete(synchronize_session=False)
+
+    expense_ids = db.query(models.Expense.expense_id).filter(models.Expense.company_id == company_id).scalar_subquery()
+    db.query(models.ApprovalInbox).filter(models.ApprovalInbox.company_id == company_id).delete(synchronize_session=False)
+    db.query(models.ExpenseApproval).filter(models.ExpenseApproval.expense_id.in_(expense_ids)).delete(synchronize_session=False)
+    db.query(models.ExpenseLine).filter(models.ExpenseLine.expense_id.in_(expense_ids)).delete(synchronize_session=False)
+    return archived + db.query(models.Expense).filter(models.Expense.company_id == company_id).delete(synchronize_session=False)
+
+def _copy_company_rows(source_db: Session, target_db: Session, company_id: int) -> Tuple[int, int]:
+    """Copies the company's rows into target_db (no commit); returns the numbers of hot and archived expenses."""
+    expenses = source_db.query(models.Expense).filter(
+        models.Expense.company_id == company_id
+    ).options(
+        selectinload(models.Expense.expense_lines),
+        selectinload(models.Expense.expense_approvals)
+    ).all()
+    archived = source_db.query(models.ArchivedExpense).filter(
+        models.ArchivedExpense.company_id == company_id
+    ).options(
+        selectinload(models.ArchivedExpense.expense_lines),
+        selectinload(models.ArchivedExpense.expense_approvals)
+    ).all()
+    inbox = source_db.query(models.ApprovalInbox).filter(models.ApprovalInbox.company_id == company_id).all()
+
+    for expense in expenses + archived:
+        copy = _copy(expense)
+        copy.expense_lines = [_copy(line) for line in expense.expense_lines]
+        copy.expense_approvals = [_copy(approval) for approval in expense.expense_approvals]
+        target_db.add(copy)
+    target_db.add_all(_copy(entry) for entry in inbox)
+    return len(expenses), len(archived)
+
+def _route_company(company_id: int, target: str) -> None:
+    """Points the directory at the company's new shard."""
+    db = database.SessionLocal()
+    try:
+        row = db.get(models.TenantShard, company_id)
+        if target == DEFAULT_SHARD:
+            if row:
+                db.delete(row)
+        elif row:
+            row.shard = target
+            row.moved_at = datetime.datetime.utcnow()
+        else:
+            db.add(models.TenantShard(company_id=company_id, shard=target))
+        db.commit()
+    finally:
+        db.close()
+    _company_shards[company_id] = (target, time.monotonic() + settings.TENANT_ROUTE_TTL_SECONDS)
+
+def move_company(company_id: int, target: str) -> int:
+    """
+    Moves a company's expenses, lines, approvals, inbox and archived expenses
+    to another shard (DEFAULT_SHARD for the primary), keeping their ids, and
+    returns the number of expenses moved.
+
+    The company is fenced in the source first: until it is served from the
+    target, requests that write its expenses fail with CompanyMovingError and
+    can be retried, while reads go on. The copy is committed before the
+    directory is switched over, and a failed copy lifts the fence again, so a
+    move can simply be re-run. The source copy is left to
+    purge_moved_companies(). Do not archive the company's expenses meanwhile;
+    background jobs are not fenced.
+    """
+    if target != DEFAULT_SHARD:
+        get_shard(target)
+    # The directory, not this process's cached route
+    _company_shards.pop(company_id, None)
+    source = shard_for_company(company_id)
+    if source == target:
+        print(f"Company {company_id} is already on shard '{target}'")
+        return 0
+
+    source_db = session_factory(source)()
+    target_db = session_factory(target)()
+    try:
+        _fence(source_db, company_id, target)
+        try:
+            # Leftovers and the fence of an earlier move away from the target are not live
+            _delete_company_rows(target_db, company_id)
+            target_db.query(models.TenantFence).filter(models.TenantFence.company_id == company_id).delete(synchronize_session=False)
+            moved, archived = _copy_company_rows(source_db, target_db, company_id)
+            target_db.commit()
+        except Exception:
+            target_db.rollback()
+            _unfence(source_db, company_id)
+            raise
+
+        _route_company(company_id, target)
+        source_db.query(models.TenantFence).filter(
+            models.TenantFence.company_id == company_id
+        ).update({"moved_at": datetime.datetime.utcnow()}, synchronize_session=False)
+        source_db.commit()
+    finally:
+        source_db.close()
+        target_db.close()
+
+    print(f"Company {company_id} moved from shard '{source}' to '{target}': {moved} expense(s), {archived} archived")
+    purge_moved_companies()
+    return moved + archived
+
+def purge_moved_companies() -> int:
+    """
+    Deletes the copies that companies left behind when they moved away more
+    than TENANT_ROUTE_TTL_SECONDS ago, in the primary and every shard, and
+    returns the number of expenses deleted. The fences stay, so a request
+    that was still routed to an old copy cannot write to it.
+    """
+    moved_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=settings.TENANT_ROUTE_TTL_SECONDS)
+    purged = 0
+    for session_factory in session_factories():
+        db = session_factory()
+        try:
+            fenced = db.query(models.TenantFence.company_id).filter(
+                models.TenantFence.moved_at.isnot(None),
+                models.TenantFence.moved_at <= moved_before
+            ).all()
+            for (company_id,) in fenced:
+                purged += _delete_company_rows(db, company_id)
+            db.commit()
+        finally:
+            db.close()
+    if purged:
+        print(f"Purged {purged} expense(s) of moved companies")
+    return purged
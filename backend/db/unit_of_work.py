@@ -0,0 +1,49 @@
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# --- Unit of Work ---
+# Every write operation runs in exactly one transaction: the outermost
+# unit_of_work() commits once when its block succeeds and rolls back when it
+# raises. CRUD functions open a unit themselves, so composing them (e.g.
+# creating a company and its admin) inside an outer unit still commits once.
+# async_unit_of_work() is the same for an AsyncSession (see async_crud.py).
+#
+# Sessions are created with expire_on_commit=False, so objects written by a
+# unit keep their values after the commit and need no refresh query.
+
+_DEPTH_KEY = "unit_of_work_depth"
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """Runs the block as one transaction, joining an enclosing unit of work if there is one."""
+    depth = db.info.get(_DEPTH_KEY, 0)
+    db.info[_DEPTH_KEY] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            db.commit()
+    except Exception:
+        if depth == 0:
+            db.rollback()
+        raise
+    finally:
+        db.info[_DEPTH_KEY] = depth
+
+@asynccontextmanager
+async def async_unit_of_work(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """unit_of_work() for an AsyncSession."""
+    depth = db.info.get(_DEPTH_KEY, 0)
+    db.info[_DEPTH_KEY] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            await db.commit()
+    except Exception:
+        if depth == 0:
+            await db.rollback()
+        raise
+    finally:
+        db.info[_DEPTH_KEY] = depth
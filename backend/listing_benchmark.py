@@ -0,0 +1,90 @@
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .core.config import settings
+from .models import models
+
+# --- Expense Listing Benchmark ---
+# Requests an expense listing through the application, in process and without
+# a server, once with the default (Pydantic) serialization and once with
+# FAST_JSON_LISTINGS, checks that both return the same JSON and times them.
+# Used by `manage benchmark-listings`.
+
+LISTINGS = {
+    "expenses": "/expenses/",
+    "pending": "/expenses/pending-approvals",
+}
+
+def busiest_user(db: Session, listing: str) -> Optional[int]:
+    """The user with the most expenses, or with the most pending approvals."""
+    if listing == "pending":
+        key = models.ApprovalInbox.approver_id
+    else:
+        key = models.Expense.employee_id
+    row = db.query(key, func.count()).group_by(key).order_by(func.count().desc()).first()
+    return row[0] if row else None
+
+async def _get(app, path: str, query: str, user_id: int) -> Tuple[int, Dict[str, str], bytes]:
+    """Sends one GET request straight to the ASGI app."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"authorization", f"Bearer MOCK_TOKEN_{user_id}".encode())],
+        "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    headers = {name.decode().lower(): value.decode() for name, value in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return start["status"], headers, body
+
+async def _run(path: str, query: str, user_id: int, repeat: int) -> Dict[str, dict]:
+    from .main import app
+
+    results = {}
+    saved = settings.FAST_JSON_LISTINGS
+    try:
+        for mode, fast in (("default", False), ("fast", True)):
+            settings.FAST_JSON_LISTINGS = fast
+            status, headers, body = await _get(app, path, query, user_id) # Warm-up
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                await _get(app, path, query, user_id)
+                timings.append(time.perf_counter() - started)
+            results[mode] = {
+                "status": status,
+                "next_cursor": headers.get("x-next-cursor"),
+                "body": body,
+                "median_ms": statistics.median(timings) * 1000
+            }
+    finally:
+        settings.FAST_JSON_LISTINGS = saved
+    return results
+
+def benchmark_listing(listing: str, user_id: int, limit: int, view: str, repeat: int) -> dict:
+    """Runs the benchmark; returns the results per mode and whether the JSON is identical."""
+    query = f"limit={limit}&view={view}"
+    results = asyncio.run(_run(LISTINGS[listing], query, user_id, repeat))
+    default, fast = results["default"], results["fast"]
+    return {
+        "results": results,
+        "items": len(json.loads(default["body"])) if default["status"] == 200 else 0,
+        "same_json": (default["status"], default["next_cursor"], json.loads(default["body"]))
+                     == (fast["status"], fast["next_cursor"], json.loads(fast["body"])),
+        "same_bytes": default["body"] == fast["body"],
+    }
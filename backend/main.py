@@ -1,10 +1,16 @@
-from fastapi import FastAPI
+import math
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from .core.config import settings
 from .db.database import init_db
+from .db.tenancy import CompanyMovingError
+from .db.rate_store import exchange_rate_refresher, currency_converter
 from .routers import auth
 from .routers import expenses
 from .routers import rules
 from .routers import companies
+from .routers import system
 
 app = FastAPI(
     title="Expense Management API",
@@ -32,12 +38,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"], # Cursor of the next page of expense listings
 )
 
 @app.on_event("startup")
 def on_startup():
-    """Initializes the database when the application starts."""
+    """Initializes the database and starts the exchange rate refresher and currency converter."""
     init_db()
+    exchange_rate_refresher.start()
+    currency_converter.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    """Stops background jobs."""
+    currency_converter.stop()
+    exchange_rate_refresher.stop()
+
+@app.exception_handler(CompanyMovingError)
+async def company_moving_handler(request: Request, exc: CompanyMovingError):
+    """Writes to a company being moved to another shard are refused until it is served from there."""
+    retry_after = max(1, math.ceil(settings.TENANT_ROUTE_TTL_SECONDS))
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(retry_after)})
 
 @app.get("/")
 def read_root():
@@ -47,4 +68,5 @@ def read_root():
 app.include_router(auth.router)
 app.include_router(expenses.router)
 app.include_router(rules.router)
-app.include_router(companies.router)
\ No newline at end of file
+app.include_router(companies.router)
+app.include_router(system.router)
\ No newline at end of file
@@ -0,0 +1,242 @@
+"""
+Maintenance commands for the Expense Management backend.
+
+Run from the project root, e.g.:
+    python -m backend.manage rebuild-inbox
+    python -m backend.manage rebuild-inbox --company-id 1
+    python -m backend.manage check-counters --fix
+    python -m backend.manage refresh-rates
+    python -m backend.manage reprice-expenses
+    python -m backend.manage convert-pending
+    python -m backend.manage migrate
+    python -m backend.manage check-indexes
+    python -m backend.manage move-company --company-id 1 --shard eu
+    python -m backend.manage purge-moved-companies
+    python -m backend.manage archive-expenses --older-than-days 365
+    python -m backend.manage benchmark-listings --listing pending --limit 500
+    python -m backend.manage import-expenses --company-id 1 card_feed.csv
+"""
+import argparse
+import asyncio
+from typing import Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from .db.database import SessionLocal, init_db, migrate, current_revision
+from .db import bulk_import, crud, tenancy
+from .db.archive import archive_finalized_expenses
+from .db.query_plans import check_hot_query_plans
+from .db.rate_store import exchange_rate_refresher, reprice_provisional_expenses, convert_pending_expenses
+from .listing_benchmark import benchmark_listing, busiest_user
+
+def tenant_sessions(company_id: Optional[int] = None) -> Iterator[Session]:
+    """Sessions on the databases holding expenses: the company's shard, or the primary and every shard."""
+    if company_id is not None:
+        session_factories = [tenancy.company_session_factory(company_id)]
+    else:
+        session_factories = tenancy.session_factories()
+    for session_factory in session_factories:
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+def rebuild_inbox(args: argparse.Namespace) -> None:
+    """Regenerates the approval inbox from the approval log."""
+    written = 0
+    for db in tenant_sessions(args.company_id):
+        written += crud.rebuild_approval_inbox(db, company_id=args.company_id)
+    print(f"Approval inbox rebuilt: {written} entries")
+
+def check_counters(args: argparse.Namespace) -> None:
+    """Verifies the expenses' running approval counters against the approval log."""
+    mismatches = []
+    for db in tenant_sessions(args.company_id):
+        mismatches += crud.check_approval_counters(db, company_id=args.company_id, fix=args.fix)
+    print(f"Approval counters: {len(mismatches)} mismatch(es){' fixed' if args.fix and mismatches else ''}")
+    for mismatch in mismatches:
+        print(f"  Expense {mismatch['expense_id']}: {mismatch['field']} "
+              f"stored={mismatch['stored']} expected={mismatch['expected']}")
+    if mismatches and not args.fix:
+        raise SystemExit(1)
+
+def refresh_rates(args: argparse.Namespace) -> None:
+    """Fetches exchange rates once into the exchange_rates table."""
+    stored = exchange_rate_refresher.refresh_once(bases=args.base or None)
+    if not stored:
+        raise SystemExit(1)
+
+def reprice_expenses(args: argparse.Namespace) -> None:
+    """Re-prices expenses converted at a provisional exchange rate."""
+    for db in tenant_sessions(args.company_id):
+        reprice_provisional_expenses(db, company_id=args.company_id)
+
+def convert_pending(args: argparse.Namespace) -> None:
+    """Converts expenses still queued for currency conversion."""
+    for db in tenant_sessions():
+        convert_pending_expenses(db, batch_size=args.batch_size)
+
+def migrate_schema(args: argparse.Namespace) -> None:
+    """Applies schema migrations up to the given revision."""
+    before = migrate(args.revision)
+    print(f"Database schema at revision {current_revision()} (was {before or 'empty'})")
+
+def check_indexes(args: argparse.Namespace) -> None:
+    """Verifies with EXPLAIN QUERY PLAN that the hot queries use indexes (SQLite only)."""
+    db = SessionLocal()
+    try:
+        results = check_hot_query_plans(db)
+    finally:
+        db.close()
+
+    if not results:
+        print("Query plan check is only available for SQLite")
+        return
+
+    failed = [result for result in results if result["full_scans"]]
+    for result in results:
+        print(f"{result['query']}: {'full scan of ' + ', '.join(result['full_scans']) if result['full_scans'] else 'ok'}")
+        if args.verbose or result["full_scans"]:
+            for line in result["plan"]:
+                print(f"    {line}")
+    if failed:
+        raise SystemExit(1)
+
+def move_company(args: argparse.Namespace) -> None:
+    """Moves a company's expenses to another tenant shard."""
+    try:
+        tenancy.move_company(args.company_id, args.shard)
+    except ValueError as e:
+        print(e)
+        raise SystemExit(1)
+
+def purge_moved_companies(args: argparse.Namespace) -> None:
+    """Deletes the copies that moved companies left in their previous shard."""
+    tenancy.purge_moved_companies()
+
+def archive_expenses(args: argparse.Namespace) -> None:
+    """Moves old Approved and Rejected expenses to the archive tables."""
+    for db in tenant_sessions(args.company_id):
+        archive_finalized_expenses(
+            db, older_than_days=args.older_than_days, company_id=args.company_id, batch_size=args.batch_size
+        )
+
+def benchmark_listings(args: argparse.Namespace) -> None:
+    """Compares the default and the FAST_JSON_LISTINGS serialization of an expense listing."""
+    user_id = args.user_id
+    if user_id is None:
+        db = SessionLocal()
+        try:
+            user_id = busiest_user(db, args.listing)
+        finally:
+            db.close()
+    if user_id is None:
+        print("No expenses to list")
+        raise SystemExit(1)
+
+    report = benchmark_listing(args.listing, user_id, args.limit, args.view, args.repeat)
+    for mode, result in report["results"].items():
+        print(f"{mode}: HTTP {result['status']}, {len(result['body'])} bytes, median {result['median_ms']:.2f} ms")
+    default, fast = report["results"]["default"], report["results"]["fast"]
+    print(f"User {user_id}, {report['items']} expense(s): "
+          f"{default['median_ms'] / fast['median_ms']:.1f}x faster, "
+          f"{'identical bytes' if report['same_bytes'] else 'same JSON' if report['same_json'] else 'OUTPUT DIFFERS'}")
+    if not report["same_json"]:
+        raise SystemExit(1)
+
+def import_expenses(args: argparse.Namespace) -> None:
+    """Imports expense lines from a CSV or NDJSON file into a company."""
+    format = args.format or ('ndjson' if args.file.lower().endswith(('.ndjson', '.jsonl')) else 'csv')
+
+    async def run(stream):
+        session_factory = tenancy.company_async_session_factory(args.company_id)
+        try:
+            async with session_factory() as db:
+                return await bulk_import.import_expenses(db, args.company_id, stream, format)
+        finally:
+            # Closes the pooled connections before the event loop ends
+            await session_factory.kw["bind"].dispose()
+
+    with open(args.file, encoding='utf-8-sig', newline='') as stream:
+        try:
+            result = asyncio.run(run(stream))
+        except ValueError as e:
+            print(e)
+            raise SystemExit(1)
+    print(f"Imported {result.rows_imported} of {result.rows_read} row(s) in {result.claims_created} claim(s), {result.error_count} error(s)")
+    for error in result.errors:
+        print(f"  Row {error.row}: {error.detail}")
+    if result.error_count > len(result.errors):
+        print(f"  ... and {result.error_count - len(result.errors)} more error(s)")
+    if result.error_count:
+        raise SystemExit(1)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Expense Management maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = subparsers.add_parser("rebuild-inbox", help="Regenerate the approval inbox from the approval log")
+    rebuild.add_argument("--company-id", type=int, default=None, help="Only rebuild this company's inbox")
+    rebuild.set_defaults(func=rebuild_inbox)
+
+    counters = subparsers.add_parser("check-counters", help="Verify expense approval counters against the approval log")
+    counters.add_argument("--company-id", type=int, default=None, help="Only check this company's expenses")
+    counters.add_argument("--fix", action="store_true", help="Overwrite mismatching counters with the logged values")
+    counters.set_defaults(func=check_counters)
+
+    rates = subparsers.add_parser("refresh-rates", help="Fetch exchange rates into the local rate store")
+    rates.add_argument("--base", action="append", help="Base currency to fetch (repeatable); defaults to the configured bases")
+    rates.set_defaults(func=refresh_rates)
+
+    reprice = subparsers.add_parser("reprice-expenses", help="Re-price expenses converted at a provisional exchange rate")
+    reprice.add_argument("--company-id", type=int, help="Only re-price expenses of this company")
+    reprice.set_defaults(func=reprice_expenses)
+
+    convert = subparsers.add_parser("convert-pending", help="Convert expenses queued for currency conversion")
+    convert.add_argument("--batch-size", type=int, help="Expenses per batch; defaults to FX_CONVERSION_BATCH_SIZE")
+    convert.set_defaults(func=convert_pending)
+
+    migrate_parser = subparsers.add_parser("migrate", help="Apply schema migrations")
+    migrate_parser.add_argument("--revision", default="head", help="Target revision (default: head)")
+    migrate_parser.set_defaults(func=migrate_schema, init=False)
+
+    indexes = subparsers.add_parser("check-indexes", help="Check that the hot queries use indexes")
+    indexes.add_argument("--verbose", action="store_true", help="Print every query plan")
+    indexes.set_defaults(func=check_indexes)
+
+    move = subparsers.add_parser("move-company", help="Move a company's expenses to another tenant shard")
+    move.add_argument("--company-id", type=int, required=True, help="Company to move")
+    move.add_argument("--shard", required=True, help=f"Target shard from TENANT_SHARDS, or '{tenancy.DEFAULT_SHARD}' for the primary database")
+    move.set_defaults(func=move_company)
+
+    purge = subparsers.add_parser("purge-moved-companies", help="Delete the copies moved companies left in their previous shard")
+    purge.set_defaults(func=purge_moved_companies)
+
+    archive = subparsers.add_parser("archive-expenses", help="Move old finalized expenses to the archive tables")
+    archive.add_argument("--older-than-days", type=int, help="Age of the submission in days; defaults to ARCHIVE_AFTER_DAYS")
+    archive.add_argument("--company-id", type=int, help="Only archive this company's expenses")
+    archive.add_argument("--batch-size", type=int, help="Expenses per batch; defaults to ARCHIVE_BATCH_SIZE")
+    archive.set_defaults(func=archive_expenses)
+
+    bench = subparsers.add_parser("benchmark-listings", help="Time an expense listing with and without FAST_JSON_LISTINGS and compare the output")
+    bench.add_argument("--listing", choices=["expenses", "pending"], default="pending", help="GET /expenses/ or /expenses/pending-approvals")
+    bench.add_argument("--user-id", type=int, help="User to list for; defaults to the one with the most rows")
+    bench.add_argument("--limit", type=int, default=500, help="Page size")
+    bench.add_argument("--view", choices=["full", "summary"], default="full")
+    bench.add_argument("--repeat", type=int, default=20, help="Timed requests per mode")
+    bench.set_defaults(func=benchmark_listings)
+
+    importer = subparsers.add_parser("import-expenses", help="Import expense lines from a CSV or NDJSON file")
+    importer.add_argument("--company-id", type=int, required=True, help="Company to import into")
+    importer.add_argument("--format", choices=bulk_import.IMPORT_FORMATS, help="File format; defaults to the file extension")
+    importer.add_argument("file", help="CSV or NDJSON file of expense lines")
+    importer.set_defaults(func=import_expenses)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "init", True):
+        init_db()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+from alembic import context
+
+# Allow "alembic -c backend/alembic.ini ..." from the project root
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.core.config import settings
+from backend.models.models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+def run_migrations_offline() -> None:
+    """Emits the migration SQL for settings.DATABASE_URL without connecting."""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    """
+    Runs the migrations on the connection passed by init_db(), or on a new
+    connection from the application's engine when invoked from the CLI.
+    """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_on(connection)
+        return
+
+    from backend.db.database import engine
+    with engine.begin() as connection:
+        _run_on(connection)
+
+def _run_on(connection) -> None:
+    # render_as_batch lets future ALTER-style migrations run on SQLite. Tenant
+    # shards (see backend/db/tenancy.py) keep their own version table: in the
+    # shard's file on SQLite, in the shard's schema on PostgreSQL.
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True,
+        version_table_schema=config.attributes.get("version_table_schema")
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
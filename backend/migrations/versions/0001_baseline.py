@@ -0,0 +1,159 @@
+"""Baseline schema
+
+The tables as created by Base.metadata.create_all() before migrations were
+introduced. Existing databases without an alembic_version table are stamped
+at this revision by init_db() instead of running it.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'companies',
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('default_currency_code', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('company_id')
+    )
+    op.create_index('ix_companies_company_id', 'companies', ['company_id'])
+
+    op.create_table(
+        'expense_categories',
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.company_id']),
+        sa.PrimaryKeyConstraint('category_id')
+    )
+    op.create_index('ix_expense_categories_category_id', 'expense_categories', ['category_id'])
+
+    op.create_table(
+        'approval_rules',
+        sa.Column('rule_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String()),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('threshold_amount', sa.Float()),
+        sa.Column('approval_percentage', sa.Float()),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.company_id']),
+        sa.PrimaryKeyConstraint('rule_id')
+    )
+    op.create_index('ix_approval_rules_rule_id', 'approval_rules', ['rule_id'])
+
+    op.create_table(
+        'users',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('hashed_password', sa.String(), nullable=False),
+        sa.Column('manager_id', sa.Integer()),
+        sa.Column('is_manager_approver', sa.Boolean()),
+        sa.Column('approval_rule_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.company_id']),
+        sa.ForeignKeyConstraint(['manager_id'], ['users.user_id']),
+        sa.ForeignKeyConstraint(['approval_rule_id'], ['approval_rules.rule_id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_users_user_id', 'users', ['user_id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'approval_flow_steps',
+        sa.Column('step_id', sa.Integer(), nullable=False),
+        sa.Column('rule_id', sa.Integer(), nullable=False),
+        sa.Column('step_sequence', sa.Integer(), nullable=False),
+        sa.Column('approver_type', sa.String(), nullable=False),
+        sa.Column('target_value', sa.String()),
+        sa.ForeignKeyConstraint(['rule_id'], ['approval_rules.rule_id']),
+        sa.PrimaryKeyConstraint('step_id')
+    )
+    op.create_index('ix_approval_flow_steps_step_id', 'approval_flow_steps', ['step_id'])
+
+    op.create_table(
+        'expenses',
+        sa.Column('expense_id', sa.Integer(), nullable=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('submission_date', sa.DateTime(), nullable=False),
+        sa.Column('description', sa.String()),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('total_amount_local', sa.Float(), nullable=False),
+        sa.Column('local_currency_code', sa.String(), nullable=False),
+        sa.Column('exchange_rate', sa.Float()),
+        sa.Column('total_amount_company_currency', sa.Float()),
+        sa.Column('current_approval_step', sa.Integer(), nullable=False),
+        sa.Column('current_flow_rule_id', sa.Integer()),
+        sa.ForeignKeyConstraint(['employee_id'], ['users.user_id']),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.company_id']),
+        sa.ForeignKeyConstraint(['current_flow_rule_id'], ['approval_rules.rule_id']),
+        sa.PrimaryKeyConstraint('expense_id')
+    )
+    op.create_index('ix_expenses_expense_id', 'expenses', ['expense_id'])
+
+    for table in ('rule_required_approvers', 'rule_normal_approvers'):
+        op.create_table(
+            table,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('rule_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('sequence', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['rule_id'], ['approval_rules.rule_id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.user_id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(f'ix_{table}_id', table, ['id'])
+
+    op.create_table(
+        'expense_lines',
+        sa.Column('line_id', sa.Integer(), nullable=False),
+        sa.Column('expense_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer()),
+        sa.Column('vendor_name', sa.String()),
+        sa.Column('date', sa.String()),
+        sa.Column('amount_local', sa.Float(), nullable=False),
+        sa.Column('description', sa.String()),
+        sa.Column('receipt_url', sa.String()),
+        sa.Column('expense_type', sa.String()),
+        sa.ForeignKeyConstraint(['expense_id'], ['expenses.expense_id']),
+        sa.ForeignKeyConstraint(['category_id'], ['expense_categories.category_id']),
+        sa.PrimaryKeyConstraint('line_id')
+    )
+    op.create_index('ix_expense_lines_line_id', 'expense_lines', ['line_id'])
+
+    op.create_table(
+        'expense_approvals',
+        sa.Column('approval_id', sa.Integer(), nullable=False),
+        sa.Column('expense_id', sa.Integer(), nullable=False),
+        sa.Column('approver_id', sa.Integer(), nullable=False),
+        sa.Column('flow_step_id', sa.Integer()),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('comments', sa.String()),
+        sa.Column('approval_date', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['expense_id'], ['expenses.expense_id']),
+        sa.ForeignKeyConstraint(['approver_id'], ['users.user_id']),
+        sa.ForeignKeyConstraint(['flow_step_id'], ['approval_flow_steps.step_id']),
+        sa.PrimaryKeyConstraint('approval_id')
+    )
+    op.create_index('ix_expense_approvals_approval_id', 'expense_approvals', ['approval_id'])
+
+
+def downgrade() -> None:
+    for table in (
+        'expense_approvals', 'expense_lines', 'rule_normal_approvers', 'rule_required_approvers',
+        'expenses', 'approval_flow_steps', 'users', 'approval_rules', 'expense_categories', 'companies'
+    ):
+        op.drop_table(table)
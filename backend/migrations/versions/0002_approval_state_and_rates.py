@@ -0,0 +1,75 @@
+"""Approval counters, approval inbox, exchange rate store and company data version
+
+Before migrations existed these were added by init_db() directly, so every
+step checks whether it has already been applied.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+EXPENSE_COLUMNS = [
+    sa.Column('required_approvals_done', sa.Integer(), nullable=False, server_default=sa.text('0')),
+    sa.Column('normal_approvals_done', sa.Integer(), nullable=False, server_default=sa.text('0')),
+    sa.Column('next_normal_sequence', sa.Integer()),
+    sa.Column('rate_provisional', sa.Boolean(), nullable=False, server_default=sa.false()),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    existing = {column['name'] for column in inspector.get_columns('expenses')}
+    for column in EXPENSE_COLUMNS:
+        if column.name not in existing:
+            op.add_column('expenses', column)
+
+    if 'data_version' not in {column['name'] for column in inspector.get_columns('companies')}:
+        op.add_column('companies', sa.Column('data_version', sa.Integer(), nullable=False, server_default=sa.text('1')))
+
+    if not inspector.has_table('approval_inbox'):
+        op.create_table(
+            'approval_inbox',
+            sa.Column('expense_id', sa.Integer(), nullable=False),
+            sa.Column('approver_id', sa.Integer(), nullable=False),
+            sa.Column('company_id', sa.Integer(), nullable=False),
+            sa.Column('since', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['expense_id'], ['expenses.expense_id']),
+            sa.ForeignKeyConstraint(['approver_id'], ['users.user_id']),
+            sa.ForeignKeyConstraint(['company_id'], ['companies.company_id']),
+            sa.PrimaryKeyConstraint('expense_id', 'approver_id')
+        )
+        op.create_index('ix_approval_inbox_approver_id', 'approval_inbox', ['approver_id', 'expense_id'])
+
+    if not inspector.has_table('exchange_rates'):
+        op.create_table(
+            'exchange_rates',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('base', sa.String(), nullable=False),
+            sa.Column('quote', sa.String(), nullable=False),
+            sa.Column('rate', sa.Float(), nullable=False),
+            sa.Column('as_of', sa.String(), nullable=False),
+            sa.Column('fetched_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('base', 'quote', 'as_of', name='uq_exchange_rates_pair_day')
+        )
+        op.create_index('ix_exchange_rates_id', 'exchange_rates', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('exchange_rates')
+    op.drop_table('approval_inbox')
+    with op.batch_alter_table('companies') as batch_op:
+        batch_op.drop_column('data_version')
+    with op.batch_alter_table('expenses') as batch_op:
+        for column in reversed(EXPENSE_COLUMNS):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,41 @@
+"""Indexes for the hot query paths
+
+Expense listings filter by employee, approval checks by status and company,
+the approval log is probed by (expense, approver, status), rule lookups by
+(rule, user), and expense lines are loaded by expense. Unversioned databases
+created by Base.metadata.create_all() may already have them.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_expenses_employee_id', 'expenses', ['employee_id']),
+    ('ix_expenses_status_company_id', 'expenses', ['status', 'company_id']),
+    ('ix_expense_approvals_expense_approver_status', 'expense_approvals', ['expense_id', 'approver_id', 'status']),
+    ('ix_rule_required_approvers_rule_user', 'rule_required_approvers', ['rule_id', 'user_id']),
+    ('ix_rule_normal_approvers_rule_user', 'rule_normal_approvers', ['rule_id', 'user_id']),
+    ('ix_expense_lines_expense_id', 'expense_lines', ['expense_id']),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,32 @@
+"""Tenant shard directory
+
+Maps companies whose expenses were moved to a shard (see
+backend/db/tenancy.py) to that shard.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('tenant_shards'):
+        return
+    op.create_table(
+        'tenant_shards',
+        sa.Column('company_id', sa.Integer(), sa.ForeignKey('companies.company_id'), primary_key=True),
+        sa.Column('shard', sa.String(), nullable=False),
+        sa.Column('moved_at', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('tenant_shards')
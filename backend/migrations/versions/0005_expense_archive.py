@@ -0,0 +1,98 @@
+"""Expense archive tables
+
+Adds the archive tables for finalized expenses (see backend/db/archive.py).
+On SQLite the hot expense tables are rebuilt with AUTOINCREMENT, so the ids
+of archived rows are never handed out again.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+HOT_TABLES = ['expenses', 'expense_lines', 'expense_approvals']
+
+
+def _create_archive_tables() -> None:
+    op.create_table(
+        'expenses_archive',
+        sa.Column('expense_id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('submission_date', sa.DateTime(), nullable=False),
+        sa.Column('description', sa.String()),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('total_amount_local', sa.Float(), nullable=False),
+        sa.Column('local_currency_code', sa.String(), nullable=False),
+        sa.Column('exchange_rate', sa.Float()),
+        sa.Column('total_amount_company_currency', sa.Float()),
+        sa.Column('rate_provisional', sa.Boolean(), nullable=False),
+        sa.Column('current_approval_step', sa.Integer(), nullable=False),
+        sa.Column('current_flow_rule_id', sa.Integer()),
+        sa.Column('required_approvals_done', sa.Integer(), nullable=False),
+        sa.Column('normal_approvals_done', sa.Integer(), nullable=False),
+        sa.Column('next_normal_sequence', sa.Integer()),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_expenses_archive_employee_date', 'expenses_archive', ['employee_id', 'submission_date'])
+    op.create_index('ix_expenses_archive_company_id', 'expenses_archive', ['company_id'])
+
+    op.create_table(
+        'expense_lines_archive',
+        sa.Column('line_id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('expense_id', sa.Integer(), sa.ForeignKey('expenses_archive.expense_id'), nullable=False),
+        sa.Column('category_id', sa.Integer()),
+        sa.Column('vendor_name', sa.String()),
+        sa.Column('date', sa.String()),
+        sa.Column('amount_local', sa.Float(), nullable=False),
+        sa.Column('description', sa.String()),
+        sa.Column('receipt_url', sa.String()),
+        sa.Column('expense_type', sa.String()),
+    )
+    op.create_index('ix_expense_lines_archive_expense_id', 'expense_lines_archive', ['expense_id'])
+
+    op.create_table(
+        'expense_approvals_archive',
+        sa.Column('approval_id', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('expense_id', sa.Integer(), sa.ForeignKey('expenses_archive.expense_id'), nullable=False),
+        sa.Column('approver_id', sa.Integer(), nullable=False),
+        sa.Column('flow_step_id', sa.Integer()),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('comments', sa.String()),
+        sa.Column('approval_date', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_expense_approvals_archive_expense_id', 'expense_approvals_archive', ['expense_id'])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Set on tenant shards in PostgreSQL schemas, whose tables are found through the search_path
+    schema = context.config.attributes.get('version_table_schema')
+    if not sa.inspect(bind).has_table('expenses_archive', schema=schema):
+        _create_archive_tables()
+
+    if bind.dialect.name == 'sqlite':
+        for table in HOT_TABLES:
+            sql = bind.execute(
+                sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table}
+            ).scalar()
+            if 'AUTOINCREMENT' not in sql.upper():
+                # resolve_fks=False: on a tenant shard the referenced directory tables live elsewhere
+                with op.batch_alter_table(
+                    table, recreate='always', table_kwargs={'sqlite_autoincrement': True}, reflect_kwargs={'resolve_fks': False}
+                ):
+                    pass
+
+
+def downgrade() -> None:
+    op.drop_table('expense_approvals_archive')
+    op.drop_table('expense_lines_archive')
+    op.drop_table('expenses_archive')
@@ -0,0 +1,33 @@
+"""Keyset pagination index for expense listings
+
+A user's expenses are paged by (submission_date, expense_id); this index
+serves both the filter on the employee and the page order, and replaces the
+plain employee index.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Set on tenant shards in PostgreSQL schemas
+    schema = context.config.attributes.get('version_table_schema')
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('expenses', schema=schema)}
+    if 'ix_expenses_employee_submission' not in existing:
+        op.create_index('ix_expenses_employee_submission', 'expenses', ['employee_id', 'submission_date', 'expense_id'], schema=schema)
+    if 'ix_expenses_employee_id' in existing:
+        op.drop_index('ix_expenses_employee_id', table_name='expenses', schema=schema)
+
+
+def downgrade() -> None:
+    op.create_index('ix_expenses_employee_id', 'expenses', ['employee_id'])
+    op.drop_index('ix_expenses_employee_submission', table_name='expenses')
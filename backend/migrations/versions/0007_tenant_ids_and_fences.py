@@ -0,0 +1,74 @@
+"""Tenant id blocks and move fences
+
+Expense, line and approval ids are allocated from the directory's
+tenant_id_blocks table, so a company moved between shards keeps them (see
+backend/db/tenancy.py). Every database holding tenant tables gets
+tenant_fences, which refuses writes to a company while it is being moved.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+# Allocated tables and their archive tables, which keep the original ids
+ID_TABLES = {
+    'expenses': ('expense_id', 'expenses_archive'),
+    'expense_lines': ('line_id', 'expense_lines_archive'),
+    'expense_approvals': ('approval_id', 'expense_approvals_archive'),
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Set on tenant shards in PostgreSQL schemas
+    schema = context.config.attributes.get('version_table_schema')
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('tenant_fences', schema=schema):
+        op.create_table(
+            'tenant_fences',
+            sa.Column('company_id', sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column('moved_to', sa.String(), nullable=False),
+            sa.Column('fenced_at', sa.DateTime(), nullable=False),
+            sa.Column('moved_at', sa.DateTime()),
+            schema=schema,
+        )
+
+    # Directory table: not created in shards. Shards migrated after this
+    # revision raise the blocks above their own ids, see tenancy.sync_id_blocks()
+    if context.config.attributes.get('tenant_shard') is not None:
+        return
+    if inspector.has_table('tenant_id_blocks'):
+        blocks = sa.table('tenant_id_blocks', sa.column('table_name', sa.String()), sa.column('next_id', sa.Integer()))
+    else:
+        blocks = op.create_table(
+            'tenant_id_blocks',
+            sa.Column('table_name', sa.String(), primary_key=True),
+            sa.Column('next_id', sa.Integer(), nullable=False),
+        )
+    seeded = set(bind.execute(sa.text('SELECT table_name FROM tenant_id_blocks')).scalars())
+    rows = []
+    for table, (key, archive) in ID_TABLES.items():
+        if table in seeded:
+            continue
+        highest = max(
+            bind.execute(sa.text(f'SELECT MAX({key}) FROM {table}')).scalar() or 0,
+            bind.execute(sa.text(f'SELECT MAX({key}) FROM {archive}')).scalar() or 0,
+        )
+        rows.append({'table_name': table, 'next_id': highest + 1})
+    if rows:
+        op.bulk_insert(blocks, rows)
+
+
+def downgrade() -> None:
+    if context.config.attributes.get('tenant_shard') is None:
+        op.drop_table('tenant_id_blocks')
+    op.drop_table('tenant_fences', schema=context.config.attributes.get('version_table_schema'))
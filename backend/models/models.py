@@ -1,5 +1,5 @@
 import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -13,6 +13,7 @@ class Company(Base):
     company_id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     default_currency_code = Column(String, nullable=False) # e.g., 'USD', 'EUR'
+    data_version = Column(Integer, default=1, nullable=False) # Bumped on every change to the company, its users or rules (ETags)
 
     # Relationships
     users = relationship("User", back_populates="company")
@@ -75,17 +76,31 @@ class Expense(Base):
     local_currency_code = Column(String, nullable=False)
     exchange_rate = Column(Float)
     total_amount_company_currency = Column(Float)
+    rate_provisional = Column(Boolean, default=False, nullable=False) # Converted at a missing or outdated rate; re-priced later
 
     # Workflow tracking
     current_approval_step = Column(Integer, default=1, nullable=False)
     current_flow_rule_id = Column(Integer, ForeignKey('approval_rules.rule_id'))
 
+    # Running approval progress, updated together with each approval
+    required_approvals_done = Column(Integer, default=0, nullable=False)
+    normal_approvals_done = Column(Integer, default=0, nullable=False)
+    next_normal_sequence = Column(Integer) # Sequence of the normal approver(s) whose turn it is
+
     # Relationships
     employee = relationship("User", back_populates="expenses")
     rule = relationship("ApprovalRule")
     expense_lines = relationship("ExpenseLine", back_populates="expense", cascade="all, delete-orphan")
     expense_approvals = relationship("ExpenseApproval", back_populates="expense", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination of a user's expenses (see db/pagination.py)
+        Index('ix_expenses_employee_submission', 'employee_id', 'submission_date', 'expense_id'),
+        Index('ix_expenses_status_company_id', 'status', 'company_id'),
+        # Ids are never reused once archived rows leave the table
+        {'sqlite_autoincrement': True},
+    )
+
 
 class ExpenseLine(Base):
     """Corresponds to the ExpenseLines table (Detailed items)."""
@@ -105,6 +120,12 @@ class ExpenseLine(Base):
     expense = relationship("Expense", back_populates="expense_lines")
     category = relationship("ExpenseCategory", back_populates="expense_lines")
 
+    __table_args__ = (
+        Index('ix_expense_lines_expense_id', 'expense_id'),
+        # Ids are never reused once archived rows leave the table
+        {'sqlite_autoincrement': True},
+    )
+
 
 class ApprovalRule(Base):
     """Corresponds to the ApprovalRules table."""
@@ -137,6 +158,10 @@ class RuleRequiredApprover(Base):
     rule = relationship("ApprovalRule", back_populates="required_approvers")
     user = relationship("User", foreign_keys=[user_id])
 
+    __table_args__ = (
+        Index('ix_rule_required_approvers_rule_user', 'rule_id', 'user_id'),
+    )
+
 
 class RuleNormalApprover(Base):
     """Normal approvers who approve in sequence after required approvers."""
@@ -151,6 +176,10 @@ class RuleNormalApprover(Base):
     rule = relationship("ApprovalRule", back_populates="normal_approvers")
     user = relationship("User", foreign_keys=[user_id])
 
+    __table_args__ = (
+        Index('ix_rule_normal_approvers_rule_user', 'rule_id', 'user_id'),
+    )
+
 
 class ApprovalFlowStep(Base):
     """Corresponds to the ApprovalFlowSteps table."""
@@ -182,3 +211,163 @@ class ExpenseApproval(Base):
     expense = relationship("Expense", back_populates="expense_approvals")
     approver = relationship("User", back_populates="approvals")
     flow_step = relationship("ApprovalFlowStep", back_populates="expense_approvals")
+
+    __table_args__ = (
+        Index('ix_expense_approvals_expense_approver_status', 'expense_id', 'approver_id', 'status'),
+        # Ids are never reused once archived rows leave the table
+        {'sqlite_autoincrement': True},
+    )
+
+
+class ApprovalInbox(Base):
+    """Denormalized list of the expenses each approver can act on right now.
+
+    Maintained by the CRUD write paths whenever an expense moves to its next
+    approver(s), and regenerated from the approval log by `manage rebuild-inbox`.
+    """
+    __tablename__ = 'approval_inbox'
+
+    expense_id = Column(Integer, ForeignKey('expenses.expense_id'), primary_key=True)
+    approver_id = Column(Integer, ForeignKey('users.user_id'), primary_key=True)
+    company_id = Column(Integer, ForeignKey('companies.company_id'), nullable=False)
+    since = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('ix_approval_inbox_approver_id', 'approver_id', 'expense_id'),
+    )
+
+
+class ExchangeRate(Base):
+    """Locally stored exchange rates, refreshed in the background from the provider.
+
+    One row per currency pair and day, so expenses can be converted at the
+    rate of a past date without calling the provider.
+    """
+    __tablename__ = 'exchange_rates'
+
+    id = Column(Integer, primary_key=True, index=True)
+    base = Column(String, nullable=False) # e.g., 'USD'
+    quote = Column(String, nullable=False) # e.g., 'EUR'
+    rate = Column(Float, nullable=False) # 1 base = rate quote
+    as_of = Column(String, nullable=False) # YYYY-MM-DD, same format as ExpenseLine.date
+    fetched_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('base', 'quote', 'as_of', name='uq_exchange_rates_pair_day'),
+    )
+
+
+class TenantShard(Base):
+    """Which shard holds a company's expenses when tenant sharding is enabled.
+
+    Companies without a row live in the primary database. Rows are written by
+    `manage move-company`; see backend/db/tenancy.py.
+    """
+    __tablename__ = 'tenant_shards'
+
+    company_id = Column(Integer, ForeignKey('companies.company_id'), primary_key=True)
+    shard = Column(String, nullable=False) # A key of settings.TENANT_SHARDS
+    moved_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+
+class TenantFence(Base):
+    """A company whose rows in this database are being moved to another shard.
+
+    Lives next to the tenant tables, in the primary and in every shard: while
+    the row exists, commits that write the company's tenant rows here are
+    refused. moved_at is set once the directory routes the company to
+    moved_to. See move_company() in backend/db/tenancy.py.
+    """
+    __tablename__ = 'tenant_fences'
+
+    company_id = Column(Integer, primary_key=True, autoincrement=False)
+    moved_to = Column(String, nullable=False) # Target shard of the move
+    fenced_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    moved_at = Column(DateTime)
+
+
+class TenantIdBlock(Base):
+    """Next free id of a tenant table whose ids are allocated in the directory.
+
+    Expense, line and approval ids are reserved from here in blocks, so they
+    are unique across the primary and every shard and survive a company move.
+    See backend/db/tenancy.py.
+    """
+    __tablename__ = 'tenant_id_blocks'
+
+    table_name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+
+class ArchivedExpense(Base):
+    """Finalized expense moved out of the hot tables by the archival job.
+
+    Same columns as Expense plus archived_at, keeping the original ids. See
+    backend/db/archive.py.
+    """
+    __tablename__ = 'expenses_archive'
+
+    expense_id = Column(Integer, primary_key=True, autoincrement=False)
+    employee_id = Column(Integer, nullable=False)
+    company_id = Column(Integer, nullable=False)
+    submission_date = Column(DateTime, nullable=False)
+    description = Column(String)
+    status = Column(String, nullable=False)
+    total_amount_local = Column(Float, nullable=False)
+    local_currency_code = Column(String, nullable=False)
+    exchange_rate = Column(Float)
+    total_amount_company_currency = Column(Float)
+    rate_provisional = Column(Boolean, nullable=False)
+    current_approval_step = Column(Integer, nullable=False)
+    current_flow_rule_id = Column(Integer)
+    required_approvals_done = Column(Integer, nullable=False)
+    normal_approvals_done = Column(Integer, nullable=False)
+    next_normal_sequence = Column(Integer)
+    archived_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    # Relationships
+    expense_lines = relationship("ArchivedExpenseLine", cascade="all, delete-orphan")
+    expense_approvals = relationship("ArchivedExpenseApproval", cascade="all, delete-orphan")
+
+    archived = True # Marks archived rows in API responses
+
+    __table_args__ = (
+        Index('ix_expenses_archive_employee_date', 'employee_id', 'submission_date'),
+        Index('ix_expenses_archive_company_id', 'company_id'),
+    )
+
+
+class ArchivedExpenseLine(Base):
+    """Line of an archived expense (same columns as ExpenseLine)."""
+    __tablename__ = 'expense_lines_archive'
+
+    line_id = Column(Integer, primary_key=True, autoincrement=False)
+    expense_id = Column(Integer, ForeignKey('expenses_archive.expense_id'), nullable=False)
+    category_id = Column(Integer)
+    vendor_name = Column(String)
+    date = Column(String)
+    amount_local = Column(Float, nullable=False)
+    description = Column(String)
+    receipt_url = Column(String)
+    expense_type = Column(String)
+
+    __table_args__ = (
+        Index('ix_expense_lines_archive_expense_id', 'expense_id'),
+    )
+
+
+class ArchivedExpenseApproval(Base):
+    """Approval log entry of an archived expense (same columns as ExpenseApproval)."""
+    __tablename__ = 'expense_approvals_archive'
+
+    approval_id = Column(Integer, primary_key=True, autoincrement=False)
+    expense_id = Column(Integer, ForeignKey('expenses_archive.expense_id'), nullable=False)
+    approver_id = Column(Integer, nullable=False)
+    flow_step_id = Column(Integer)
+    status = Column(String, nullable=False)
+    comments = Column(String)
+    approval_date = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_expense_approvals_archive_expense_id', 'expense_id'),
+    )
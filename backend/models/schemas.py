@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Dict, List, Literal, Optional
 import datetime
 
 # --- Base Schemas for Core Tables (Read) ---
@@ -45,7 +45,7 @@ class UserCreate(UserBase):
     pass # No change needed for creation yet
 
 class ExpenseLineCreate(ExpenseLineBase):
-    pass
+    amount_local: float = Field(gt=0)
 
 class ExpenseCreate(BaseModel):
     description: Optional[str] = None
@@ -63,6 +63,14 @@ class ApprovalRuleCreate(ApprovalRuleBase):
     required_approvers: List[RequiredApproverCreate] = []
     normal_approvers: List[NormalApproverCreate] = []
 
+class ApprovalDecision(BaseModel):
+    expense_id: int
+    decision: str # 'Approved' or 'Rejected'
+    comments: Optional[str] = None # Required when rejecting
+
+class ApprovalBatch(BaseModel):
+    decisions: List[ApprovalDecision]
+
 # --- Full Schemas (Response) ---
 
 class ExpenseLine(ExpenseLineBase):
@@ -93,7 +101,9 @@ class Expense(BaseModel):
     local_currency_code: str
     exchange_rate: Optional[float] = None  # Ensure this is included
     total_amount_company_currency: Optional[float] = None
+    rate_provisional: bool = False
     current_approval_step: int
+    archived: bool = False # Finalized expense read from the archive
     
     expense_lines: List[ExpenseLine] = []
     expense_approvals: List[ExpenseApproval] = []
@@ -101,6 +111,105 @@ class Expense(BaseModel):
     class Config:
         from_attributes = True
 
+class ExpenseListItem(BaseModel):
+    """An expense in a view=summary listing: the header fields only, without lines or approvals."""
+    expense_id: int
+    employee_id: int
+    submission_date: datetime.datetime
+    description: Optional[str] = None
+    status: str
+    total_amount_local: float
+    local_currency_code: str
+    exchange_rate: Optional[float] = None
+    total_amount_company_currency: Optional[float] = None
+    rate_provisional: bool = False
+    archived: bool = False
+
+    class Config:
+        from_attributes = True
+
+class ExpenseFilterParams(BaseModel):
+    """Expense filters shared by the listings and the export."""
+    status: List[str] = []
+    since: Optional[datetime.date] = None # Submitted on or after this date
+    until: Optional[datetime.date] = None # Submitted on or before this date
+    currency: Optional[str] = None # Local currency code
+    min_amount: Optional[float] = None # In the company's currency
+    max_amount: Optional[float] = None
+
+class ExpenseListParams(ExpenseFilterParams):
+    """Query parameters of the expense listings (keyset pagination and filters)."""
+    view: Literal['full', 'summary'] = 'full' # summary returns ExpenseListItem rows
+    limit: int = Field(50, ge=1, le=500)
+    cursor: Optional[str] = None # X-Next-Cursor of the previous page
+    sort: Optional[Literal['asc', 'desc']] = None # By (submission_date, expense_id); the default depends on the listing
+
+class ExpenseExportParams(ExpenseFilterParams):
+    """Query parameters of the expense export."""
+    format: Literal['csv', 'ndjson'] = 'csv'
+    rows: Literal['lines', 'approvals'] = 'lines' # CSV: one row per expense line or per approval
+    gzip: bool = False
+    # Adds each expense's total re-priced into this currency, at the rates of
+    # on_date (YYYY-MM-DD, default the latest), as in the expense summary
+    to_currency: Optional[str] = None
+    on_date: Optional[str] = None
+
+class ExpensePage(BaseModel):
+    items: List[Expense]
+    next_cursor: Optional[str] = None # None on the last page
+
+    class Config:
+        from_attributes = True
+
+class ExpenseListItemPage(BaseModel):
+    items: List[ExpenseListItem]
+    next_cursor: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class ExpenseImportRow(BaseModel):
+    """One expense line of a bulk import file (CSV column or NDJSON key names)."""
+    employee_id: Optional[int] = None # Either employee_id or employee_email
+    employee_email: Optional[str] = None
+    claim_ref: Optional[str] = None # Lines with the same employee, claim_ref and currency form one claim
+    claim_description: Optional[str] = None
+    currency: str
+    amount: float = Field(gt=0) # Validated like ExpenseLineCreate.amount_local
+    date: Optional[datetime.date] = None
+    vendor_name: Optional[str] = None
+    description: Optional[str] = None
+    category_id: Optional[int] = None
+    expense_type: Optional[str] = None
+    receipt_url: Optional[str] = None
+
+class ExpenseImportError(BaseModel):
+    row: int # 1-based data row (CSV: not counting the header)
+    claim_ref: Optional[str] = None # Set when the row belongs to a claim_ref
+    detail: str
+
+class ExpenseImportResult(BaseModel):
+    rows_read: int
+    rows_imported: int
+    claims_created: int
+    error_count: int
+    errors: List[ExpenseImportError] = [] # The first IMPORT_MAX_REPORTED_ERRORS errors
+
+class ApprovalDecisionResult(BaseModel):
+    expense_id: int
+    success: bool
+    approval_id: Optional[int] = None
+    expense_status: Optional[str] = None # Status of the expense after the decision
+    detail: Optional[str] = None # Why the decision was not applied
+
+class ExpenseSummary(BaseModel):
+    currency: str # Reporting currency
+    expense_count: int
+    total: float # Sum of all expenses with a known rate, in the reporting currency
+    subtotals: Dict[str, float] = {} # Converted sum per local currency
+    rates: Dict[str, float] = {} # Rate used per local currency
+    missing_rates: List[str] = [] # Local currencies left out of the total for lack of a rate
+
 class User(UserBase):
     user_id: int
     company_id: int
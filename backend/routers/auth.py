@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import Optional, Dict, List # <--- FIX: ADDED 'List'
 from pydantic import BaseModel # Must import BaseModel for the classes below
 
-from ..db.database import get_db
+from ..db.database import get_db, get_read_db
 from ..db import crud
+from ..db.company_version import company_etag, get_user_company_version
+from ..db.unit_of_work import unit_of_work
 from ..models import schemas
 from ..core.security import verify_password, get_password_hash
 from ..core.auth_utils import get_current_user
+from ..core.http_cache import is_not_modified, not_modified, set_cache_validators
 # Note: Token creation logic is simplified/omitted here for brevity, but would be handled by security.py
 
 router = APIRouter(
@@ -222,22 +225,31 @@ def admin_create_user(
 # --- Endpoint to get list of potential Managers ---
 @router.get("/managers", response_model=List[schemas.User])
 def get_potential_managers(
+    request: Request,
+    response: Response,
     user_id: int = Depends(get_current_user), 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Admin endpoint to retrieve a list of ALL USERS (Admin, Manager, Employee) 
     within the company to be assigned as managers or required approvers.
+    Conditional on the company's data version (ETag).
     """
     # ... (admin verification logic remains the same)
-    admin_user = db.query(crud.models.User).filter(crud.models.User.user_id == user_id).first()
+    found = get_user_company_version(db, user_id)
+    admin_user = found[0] if found else None
     
     if not admin_user or admin_user.role != 'Admin':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied.")
     
+    etag = company_etag(admin_user.company_id, found[1])
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
     # Use the CRUD function to fetch ALL users as manager candidates
     managers = crud.get_all_company_manager_candidates(db, company_id=admin_user.company_id) # <--- UPDATED CALL
     
+    set_cache_validators(response, etag)
     return managers
 
 # --- Endpoint for Admin to Update a User (e.g., assign rule/manager) ---
@@ -287,9 +299,11 @@ def admin_update_user(
             print(f"Updated {key} = {value}")
 
     try:
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        with unit_of_work(db):
+            db.add(user)
+            # A different rule changes who can act on the user's pending expenses
+            if 'approval_rule_id' in update_data:
+                crud.refresh_approval_state_for_employee(db, user.user_id)
         
         print(f"✅ User {user_id} updated successfully")
         print(f"   Approval Rule ID: {user.approval_rule_id}\n")
@@ -297,7 +311,6 @@ def admin_update_user(
         return user
         
     except Exception as e:
-        db.rollback()
         print(f"❌ Error updating user: {e}\n")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from ..db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from ..db.database import get_async_read_db
 from ..db import crud
+from ..db.company_version import company_etag, get_user_company_version_async
+from ..db.conversion import convert_expenses
 from ..models import schemas
 from ..core.auth_utils import get_current_user
+from ..core.http_cache import is_not_modified, not_modified, set_cache_validators
 
 router = APIRouter(
     prefix="/companies",
@@ -11,26 +15,28 @@ router = APIRouter(
 )
 
 @router.get("/{company_id}", response_model=schemas.CompanyBase)
-def get_company(
+async def get_company(
     company_id: int,
+    request: Request,
+    response: Response,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get company details."""
+    """Get company details. Conditional on the company's data version (ETag)."""
     # Verify user belongs to this company
-    user = db.query(crud.models.User).filter(
-        crud.models.User.user_id == user_id
-    ).first()
+    found = await get_user_company_version_async(db, user_id)
     
-    if not user or user.company_id != company_id:
+    if not found or found[0].company_id != company_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
-    company = db.query(crud.models.Company).filter(
-        crud.models.Company.company_id == company_id
-    ).first()
+    etag = company_etag(company_id, found[1])
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    
+    company = await db.get(crud.models.Company, company_id)
     
     if not company:
         raise HTTPException(
@@ -38,4 +44,51 @@ def get_company(
             detail="Company not found"
         )
     
+    set_cache_validators(response, etag)
     return company
+
+@router.get("/{company_id}/expense-summary", response_model=schemas.ExpenseSummary)
+async def get_expense_summary(
+    company_id: int,
+    currency: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    on_date: Optional[str] = None,
+    user_id: int = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Admin report: totals of the company's expenses re-priced into a reporting
+    currency (the company currency by default), at the rates of on_date
+    (YYYY-MM-DD, default today), optionally only for one status.
+    """
+    user = await db.get(crud.models.User, user_id)
+    
+    if not user or user.company_id != company_id or user.role != 'Admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    company = await db.get(crud.models.Company, company_id)
+    
+    if not company:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Company not found"
+        )
+    
+    currency = (currency or company.default_currency_code).upper()
+    result = await db.run_sync(
+        lambda session: convert_expenses(
+            session, crud.get_company_expense_amounts(session, company_id, status=status_filter), currency, on_date
+        )
+    )
+    
+    return schemas.ExpenseSummary(
+        currency=currency,
+        expense_count=len(result.converted),
+        total=result.total,
+        subtotals=result.subtotals,
+        rates=result.rates,
+        missing_rates=result.missing
+    )
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
+import io
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, List, Literal, Optional, Union
 from pydantic import BaseModel
 
-from ..db.database import get_db
-from ..db import crud
+from ..db.database import get_async_db, get_async_read_db, read_session_factory
+from ..db import async_crud, bulk_import, crud, export
 from ..models import schemas
 from ..core.auth_utils import get_current_user # Import the new utility
+from ..core.config import settings
+from ..core import fast_json
 
 router = APIRouter(
     prefix="/expenses",
@@ -17,14 +22,46 @@ router = APIRouter(
 class ApprovalComments(BaseModel):
     comments: Optional[str] = None
 
-@router.get("/", response_model=List[schemas.Expense])
-def read_user_expenses(
+# Response of the expense listings: full expenses, or summaries with view=summary
+ExpenseListing = Union[List[schemas.Expense], List[schemas.ExpenseListItem]]
+
+async def run_page(db: AsyncSession, list_func, user_id: int, params: schemas.ExpenseListParams, response: Response):
+    """
+    Runs a paged CRUD listing and sets the X-Next-Cursor header when there is
+    a next page. With FAST_JSON_LISTINGS the items are plain dicts.
+    """
+    try:
+        page = await list_func(db, user_id, params)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if settings.FAST_JSON_LISTINGS:
+        page = fast_json.page_to_dicts(page, schemas.ExpenseListItem if params.view == 'summary' else schemas.Expense)
+    else:
+        page = (schemas.ExpenseListItemPage if params.view == 'summary' else schemas.ExpensePage).model_validate(page)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page
+
+def page_response(page):
+    """The endpoint result for a page from run_page(); dicts are encoded with orjson, bypassing the response_model."""
+    if settings.FAST_JSON_LISTINGS:
+        return fast_json.json_response(page.items, headers={"X-Next-Cursor": page.next_cursor} if page.next_cursor else None)
+    return page.items
+
+@router.get("/", response_model=ExpenseListing)
+async def read_user_expenses(
+    response: Response,
+    params: Annotated[schemas.ExpenseListParams, Query()],
     user_id: int = Depends(get_current_user), # Use the dependency to get authenticated user's ID
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Retrieves a list of all expenses submitted by the authenticated employee.
-    (Required feature for Employee Role: View their expense history).
+    Retrieves one page of the expenses submitted by the authenticated employee,
+    newest first. (Required feature for Employee Role: View their expense history).
+    The next page is requested with the X-Next-Cursor response header as cursor.
+    Finalized expenses older than ARCHIVE_AFTER_DAYS are archived and only
+    returned when since reaches back to them. view=summary returns the
+    expense headers only, without lines and approvals.
     """
     if not user_id:
         raise HTTPException(
@@ -33,33 +70,88 @@ def read_user_expenses(
         )
 
     # Use the CRUD function to fetch expenses for the current user ID
-    expenses = crud.get_user_expenses(db, user_id=user_id)
+    page = await run_page(db, async_crud.get_user_expenses, user_id, params, response)
     
-    if not expenses:
-        # Return an empty list instead of 404 if user has no expenses
-        return []
+    # An empty list instead of 404 if user has no expenses
+    return page_response(page)
 
-    return expenses
+@router.get("/export")
+async def export_expenses(
+    params: Annotated[schemas.ExpenseExportParams, Query()],
+    user_id: int = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Admin export of the company's expenses with their lines and approvals,
+    streamed as CSV (one row per line, or per approval with rows=approvals)
+    or NDJSON (one expense per line), optionally gzip-compressed. Takes the
+    same filters as the listings.
+    """
+    user = await db.get(crud.models.User, user_id)
+    
+    if not user or user.role != 'Admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only Admin users can export expenses."
+        )
+    
+    filename = f"expenses-{user.company_id}.{params.format}{'.gz' if params.gzip else ''}"
+    return StreamingResponse(
+        export.stream_company_expenses(read_session_factory(), user.company_id, params),
+        media_type='application/gzip' if params.gzip else export.MEDIA_TYPES[params.format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/import", response_model=schemas.ExpenseImportResult)
+async def import_expenses(
+    file: UploadFile,
+    format: Optional[Literal['csv', 'ndjson']] = None,
+    user_id: int = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Admin bulk import of expense lines (e.g. a corporate card feed) from a CSV
+    or NDJSON file, grouped into claims. The format defaults to the file
+    extension. Returns the number of imported rows and an error per rejected row.
+    The file is parsed in a worker thread, so a large file does not block the event loop.
+    """
+    admin_user = await db.get(crud.models.User, user_id)
+    
+    if not admin_user or admin_user.role != 'Admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only Admin users can import expenses."
+        )
+    
+    if format is None:
+        extension = (file.filename or '').rsplit('.', 1)[-1].lower()
+        format = 'ndjson' if extension in ('ndjson', 'jsonl') else extension
+    if format not in bulk_import.IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown file format; use a .csv or .ndjson file or set format"
+        )
+    
+    stream = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    return await bulk_import.import_expenses(db, admin_user.company_id, stream, format)
 
 @router.post("/", response_model=schemas.Expense, status_code=status.HTTP_201_CREATED)
-def create_expense_claim(
+async def create_expense_claim(
     expense_data: schemas.ExpenseCreate,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new expense claim.
     Available to all authenticated users (Admin, Manager, Employee).
     """
-    user = db.query(crud.models.User).filter(crud.models.User.user_id == user_id).first()
+    user = await db.get(crud.models.User, user_id)
     
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
     # Get company to access default currency
-    company = db.query(crud.models.Company).filter(
-        crud.models.Company.company_id == user.company_id
-    ).first()
+    company = await db.get(crud.models.Company, user.company_id)
     
     if not company:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Company not found")
@@ -67,35 +159,28 @@ def create_expense_claim(
     # Calculate total amount
     total_amount = sum(line.amount_local for line in expense_data.expense_lines)
     
-    print(f"\n{'='*60}")
-    print(f"Creating expense for {user.name}")
-    print(f"Local currency: {expense_data.local_currency_code}")
-    print(f"Company currency: {company.default_currency_code}")
-    print(f"Total amount (local): {total_amount}")
-    print(f"{'='*60}\n")
-    
-    # Create expense - currency conversion handled inside crud.create_expense
-    new_expense = crud.create_expense(
-        db=db,
+    # Create expense - currency conversion handled inside create_expense
+    return await async_crud.create_expense(
+        db,
         expense=expense_data,
         employee_id=user_id,
         company_id=user.company_id,
-        total_amount_local=total_amount,
-        exchange_rate=1.0  # Will be calculated in create_expense
+        total_amount_local=total_amount
     )
-    
-    return new_expense
 
-@router.get("/pending-approvals", response_model=List[schemas.Expense])
-def get_pending_approvals(
+@router.get("/pending-approvals", response_model=ExpenseListing)
+async def get_pending_approvals(
+    response: Response,
+    params: Annotated[schemas.ExpenseListParams, Query()],
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
-    Get all expenses pending approval by the current user.
+    Get one page of the expenses pending approval by the current user, oldest
+    first, paged like GET /expenses/.
     Available to all users (Employee, Manager, and Admin can all approve).
     """
-    user = db.query(crud.models.User).filter(crud.models.User.user_id == user_id).first()
+    user = await db.get(crud.models.User, user_id)
     
     if not user:
         raise HTTPException(
@@ -103,33 +188,48 @@ def get_pending_approvals(
             detail="User not found"
         )
     
-    # Get company details for currency
-    company = db.query(crud.models.Company).filter(
-        crud.models.Company.company_id == user.company_id
-    ).first()
-    
-    print(f"Fetching pending approvals for user {user.name} (ID: {user_id}, Role: {user.role})")
-    print(f"Company currency: {company.default_currency_code if company else 'Unknown'}")
-    
-    pending = crud.get_pending_approvals_for_user(db, user_id)
+    page = await run_page(db, async_crud.get_pending_approvals_for_user, user_id, params, response)
+    return page_response(page)
+
+# Largest number of decisions accepted in one batch request
+MAX_APPROVAL_BATCH_SIZE = 1000
+
+@router.post("/approvals:batch", response_model=List[schemas.ApprovalDecisionResult])
+async def batch_approve_expenses(
+    batch: schemas.ApprovalBatch,
+    user_id: int = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Approve and/or reject many expenses in one request.
+    All decisions are authorized and applied in a single transaction and a
+    result is returned for every decision, in request order.
+    """
+    user = await db.get(crud.models.User, user_id)
     
-    # Debug: Log exchange rates
-    for expense in pending:
-        print(f"Expense {expense.expense_id}: {expense.local_currency_code} -> {company.default_currency_code if company else 'N/A'}, Rate: {expense.exchange_rate}")
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
     
-    print(f"Found {len(pending)} pending approvals for user {user_id}")
+    if len(batch.decisions) > MAX_APPROVAL_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can contain at most {MAX_APPROVAL_BATCH_SIZE} decisions"
+        )
     
-    return pending
+    return await async_crud.apply_approval_batch(db, approver_id=user_id, decisions=batch.decisions)
 
 @router.post("/{expense_id}/approve")
-def approve_expense(
+async def approve_expense(
     expense_id: int,
     body: ApprovalComments,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Approve an expense. Available to all users who are designated as approvers."""
-    user = db.query(crud.models.User).filter(crud.models.User.user_id == user_id).first()
+    user = await db.get(crud.models.User, user_id)
     
     if not user:
         raise HTTPException(
@@ -138,9 +238,7 @@ def approve_expense(
         )
     
     # Check if this expense is actually pending for this user
-    expense = db.query(crud.models.Expense).filter(
-        crud.models.Expense.expense_id == expense_id
-    ).first()
+    expense = await db.get(crud.models.Expense, expense_id)
     
     if not expense:
         raise HTTPException(
@@ -149,15 +247,14 @@ def approve_expense(
         )
     
     # Verify user is authorized to approve this expense
-    pending_for_user = crud.get_pending_approvals_for_user(db, user_id)
-    if expense not in pending_for_user:
+    if not await async_crud.can_user_act_on_expense(db, expense, user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not authorized to approve this expense at this time"
         )
     
-    approval = crud.create_expense_approval(
-        db=db,
+    approval = await async_crud.create_expense_approval(
+        db,
         expense_id=expense_id,
         approver_id=user_id,
         status='Approved',
@@ -167,14 +264,14 @@ def approve_expense(
     return {"message": "Expense approved successfully", "approval_id": approval.approval_id}
 
 @router.post("/{expense_id}/reject")
-def reject_expense(
+async def reject_expense(
     expense_id: int,
     body: ApprovalComments,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reject an expense. Available to all users who are designated as approvers."""
-    user = db.query(crud.models.User).filter(crud.models.User.user_id == user_id).first()
+    user = await db.get(crud.models.User, user_id)
     
     if not user:
         raise HTTPException(
@@ -185,21 +282,6 @@ def reject_expense(
     # Get comments from request body
     comments = body.comments
     
-    # Debug logging
-    print(f"\n{'='*60}")
-    print(f"REJECT EXPENSE REQUEST")
-    print(f"{'='*60}")
-    print(f"Expense ID: {expense_id}")
-    print(f"User ID: {user_id}")
-    print(f"Request body: {body}")
-    print(f"Comments from body: '{comments}'")
-    print(f"Comments type: {type(comments)}")
-    print(f"Comments is None: {comments is None}")
-    if comments:
-        print(f"Comments stripped: '{comments.strip()}'")
-        print(f"Comments length after strip: {len(comments.strip())}")
-    print(f"{'='*60}\n")
-    
     # Check if comments is provided and not empty after stripping
     if not comments or (isinstance(comments, str) and comments.strip() == ''):
         raise HTTPException(
@@ -208,9 +290,7 @@ def reject_expense(
         )
     
     # Check if this expense is actually pending for this user
-    expense = db.query(crud.models.Expense).filter(
-        crud.models.Expense.expense_id == expense_id
-    ).first()
+    expense = await db.get(crud.models.Expense, expense_id)
     
     if not expense:
         raise HTTPException(
@@ -219,15 +299,14 @@ def reject_expense(
         )
     
     # Verify user is authorized to reject this expense
-    pending_for_user = crud.get_pending_approvals_for_user(db, user_id)
-    if expense not in pending_for_user:
+    if not await async_crud.can_user_act_on_expense(db, expense, user_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You are not authorized to reject this expense at this time"
         )
     
-    approval = crud.create_expense_approval(
-        db=db,
+    approval = await async_crud.create_expense_approval(
+        db,
         expense_id=expense_id,
         approver_id=user_id,
         status='Rejected',
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 
-from ..db.database import get_db
-from ..db import crud
+from ..db.database import get_async_db, get_async_read_db
+from ..db import async_crud, crud
+from ..db.company_version import company_etag, get_user_company_version_async
 from ..models import schemas
 from ..core.auth_utils import get_current_user
+from ..core.http_cache import is_not_modified, not_modified, set_cache_validators
 
 router = APIRouter(
     prefix="/rules",
@@ -14,13 +17,13 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.ApprovalRule, status_code=status.HTTP_201_CREATED)
-def create_approval_rule(
+async def create_approval_rule(
     rule_data: schemas.ApprovalRuleCreate,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Admin endpoint to create a new approval rule."""
-    admin_user = db.query(crud.models.User).filter(crud.models.User.user_id == user_id).first()
+    admin_user = await db.get(crud.models.User, user_id)
     
     if not admin_user or admin_user.role != 'Admin':
         raise HTTPException(
@@ -28,51 +31,36 @@ def create_approval_rule(
             detail="Only Admin users can create approval rules."
         )
     
-    print(f"Creating approval rule: {rule_data.name}")
-    new_rule = crud.create_approval_rule(db, rule_data, admin_user.company_id)
-    
-    # Refresh to load relationships
-    db.refresh(new_rule)
-    
-    # Manually load the relationships
-    db.query(crud.models.ApprovalRule).filter(
-        crud.models.ApprovalRule.rule_id == new_rule.rule_id
-    ).options(
-        joinedload(crud.models.ApprovalRule.required_approvers),
-        joinedload(crud.models.ApprovalRule.normal_approvers)
-    ).first()
-    
-    print(f"Rule created: ID {new_rule.rule_id}")
-    print(f"  Required approvers: {len(new_rule.required_approvers)}")
-    print(f"  Normal approvers: {len(new_rule.normal_approvers)}")
-    
-    return new_rule
+    return await async_crud.create_approval_rule(db, rule_data, admin_user.company_id)
 
 @router.get("/", response_model=List[schemas.ApprovalRule])
-def get_approval_rules(
+async def get_approval_rules(
+    request: Request,
+    response: Response,
     user_id: int = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get all approval rules for the company."""
-    user = db.query(crud.models.User).filter(crud.models.User.user_id == user_id).first()
+    """Get all approval rules for the company. Conditional on the company's data version (ETag)."""
+    found = await get_user_company_version_async(db, user_id)
     
-    if not user:
+    if not found:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    user, data_version = found
     
-    # Fetch rules with their approvers eagerly loaded
-    rules = db.query(crud.models.ApprovalRule).filter(
-        crud.models.ApprovalRule.company_id == user.company_id
-    ).options(
-        joinedload(crud.models.ApprovalRule.required_approvers),
-        joinedload(crud.models.ApprovalRule.normal_approvers)
-    ).all()
+    etag = company_etag(user.company_id, data_version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
     
-    # Log what we're returning
-    for rule in rules:
-        print(f"Returning Rule {rule.rule_id}: {len(rule.required_approvers)} required, {len(rule.normal_approvers)} normal")
-        for req in rule.required_approvers:
-            print(f"  Required: user_id={req.user_id}, sequence={req.sequence}")
-        for norm in rule.normal_approvers:
-            print(f"  Normal: user_id={norm.user_id}, sequence={norm.sequence}")
+    # Fetch rules with their approvers eagerly loaded
+    result = await db.execute(
+        select(crud.models.ApprovalRule).where(
+            crud.models.ApprovalRule.company_id == user.company_id
+        ).options(
+            selectinload(crud.models.ApprovalRule.required_approvers),
+            selectinload(crud.models.ApprovalRule.normal_approvers)
+        )
+    )
+    rules = result.scalars().all()
     
+    set_cache_validators(response, etag)
     return rules
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from ..db.database import get_db
+from ..db import crud
+from ..db.rule_cache import rule_cache
+from ..core.exchange_rates import exchange_rate_cache
+from ..core.auth_utils import get_current_user
+
+router = APIRouter(
+    prefix="/system",
+    tags=["System"]
+)
+
+@router.get("/cache-stats")
+def get_cache_stats(
+    user_id: int = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Admin endpoint exposing hit/miss statistics of the in-process caches."""
+    admin_user = db.query(crud.models.User).filter(crud.models.User.user_id == user_id).first()
+    
+    if not admin_user or admin_user.role != 'Admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied.")
+    
+    return {
+        "approval_rules": rule_cache.stats(),
+        "exchange_rates": exchange_rate_cache.stats()
+    }
@@ -34,25 +34,32 @@ async function loadApprovalManagement() {
     await fetchPendingApprovals();
 }
 
-async function fetchPendingApprovals() {
+// Loads the first page of pending approvals, or appends the page after `cursor` ("Load more")
+async function fetchPendingApprovals(cursor = null) {
     const container = document.getElementById('pending-approvals-list');
     const companyCurrency = container.getAttribute('data-company-currency') || 'USD';
     
-    container.innerHTML = '<p class="loading-message">Loading pending approvals...</p>';
+    if (cursor) {
+        document.getElementById('load-more-approvals')?.remove();
+    } else {
+        container.innerHTML = '<p class="loading-message">Loading pending approvals...</p>';
+    }
 
     try {
-        const response = await authenticatedFetch(`${API_BASE_URL}/expenses/pending-approvals`);
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const response = await authenticatedFetch(`${API_BASE_URL}/expenses/pending-approvals${query}`);
 
         if (!response.ok) {
             throw new Error('Failed to fetch pending approvals');
         }
 
         const expenses = await response.json();
+        const nextCursor = response.headers.get('X-Next-Cursor');
         
         console.log('Pending approvals:', expenses);
         console.log('Company currency:', companyCurrency);
 
-        if (expenses.length === 0) {
+        if (expenses.length === 0 && !cursor) {
             container.innerHTML = `
                 <div style="text-align: center; padding: 3rem; background: var(--surface-glass); border-radius: 24px;">
                     <p class="empty-message" style="font-size: 1.1rem; margin-bottom: 0.5rem;">No pending approvals at this time.</p>
@@ -62,11 +69,25 @@ async function fetchPendingApprovals() {
             return;
         }
 
-        container.innerHTML = expenses.map(expense => {
+        const batchToolbar = `
+            <div class="approval-batch-toolbar" style="display: flex; gap: 1rem; align-items: center; justify-content: space-between; margin-bottom: 1.5rem;">
+                <label style="color: var(--text-secondary); display: flex; gap: 0.5rem; align-items: center; cursor: pointer;">
+                    <input type="checkbox" id="approval-select-all" onchange="toggleSelectAllApprovals(this.checked)">
+                    Select all
+                </label>
+                <button id="batch-approve-btn" onclick="approveSelectedExpenses()" disabled style="padding: 0.75rem 1.5rem; background: var(--success-gradient); color: white; border: none; border-radius: 12px; cursor: pointer; font-weight: 600;">
+                    Approve selected (0)
+                </button>
+            </div>
+        `;
+
+        const cards = expenses.map(expense => {
             // Determine if currency conversion occurred
             const showConversion = expense.local_currency_code !== companyCurrency;
+            // Conversion is done in the background shortly after submission
+            const conversionPending = showConversion && expense.exchange_rate == null;
             const displayAmount = expense.total_amount_company_currency || expense.total_amount_local;
-            const displayCurrency = companyCurrency;
+            const displayCurrency = conversionPending ? expense.local_currency_code : companyCurrency;
             const exchangeRate = expense.exchange_rate || 1.0;
             
             console.log(`Expense ${expense.expense_id} - Exchange Rate Debug:`, {
@@ -80,10 +101,13 @@ async function fetchPendingApprovals() {
             });
             
             return `
-            <div class="approval-card" style="background: var(--surface-glass); backdrop-filter: var(--blur-backdrop); border: 1px solid rgba(255,255,255,0.1); padding: 2rem; border-radius: 24px; margin-bottom: 1.5rem;">
+            <div class="approval-card" id="approval-card-${expense.expense_id}" style="background: var(--surface-glass); backdrop-filter: var(--blur-backdrop); border: 1px solid rgba(255,255,255,0.1); padding: 2rem; border-radius: 24px; margin-bottom: 1.5rem;">
                 <div style="display: flex; justify-content: space-between; align-items: start; margin-bottom: 1.5rem;">
                     <div>
-                        <h3 style="color: var(--text-primary); margin-bottom: 0.5rem;">Expense #${expense.expense_id}</h3>
+                        <h3 style="color: var(--text-primary); margin-bottom: 0.5rem;">
+                            <input type="checkbox" class="approval-select" value="${expense.expense_id}" onchange="updateBatchToolbar()" style="margin-right: 0.5rem;">
+                            Expense #${expense.expense_id}
+                        </h3>
                         <p style="color: var(--text-secondary);">${expense.description || 'No description'}</p>
                         <p style="color: var(--text-muted); font-size: 0.9rem; margin-top: 0.5rem;">
                             Submitted: ${new Date(expense.submission_date).toLocaleDateString()} by Employee ID: ${expense.employee_id}
@@ -103,6 +127,11 @@ async function fetchPendingApprovals() {
                                 </p>
                             </div>
                         ` : ''}
+                        ${conversionPending ? `
+                            <p style="font-size: 0.85rem; color: var(--text-muted); margin-bottom: 0.5rem;">
+                                Conversion to ${companyCurrency} pending
+                            </p>
+                        ` : ''}
                         <span class="status-${expense.status.toLowerCase()}">${expense.status}</span>
                     </div>
                 </div>
@@ -144,6 +173,24 @@ async function fetchPendingApprovals() {
             </div>
         `}).join('');
 
+        if (cursor) {
+            container.insertAdjacentHTML('beforeend', cards);
+        } else {
+            container.innerHTML = batchToolbar + cards;
+        }
+
+        if (nextCursor) {
+            const more = document.createElement('div');
+            more.id = 'load-more-approvals';
+            more.style.textAlign = 'center';
+            more.innerHTML = '<button type="button" class="btn-secondary">Load more</button>';
+            more.querySelector('button').onclick = () => fetchPendingApprovals(nextCursor);
+            container.appendChild(more);
+        }
+
+        // "Select all" covers the cards loaded so far
+        updateBatchToolbar();
+
     } catch (error) {
         console.error('Error fetching pending approvals:', error);
         container.innerHTML = '<p class="error-message">Failed to load pending approvals. Please try again.</p>';
@@ -226,3 +273,85 @@ async function rejectExpense(expenseId) {
         alert('Network error. Please try again.');
     }
 }
+
+function getSelectedApprovalIds() {
+    return Array.from(document.querySelectorAll('.approval-select:checked')).map(box => parseInt(box.value, 10));
+}
+
+function updateBatchToolbar() {
+    const button = document.getElementById('batch-approve-btn');
+    if (!button) return;
+
+    const selected = getSelectedApprovalIds().length;
+    button.textContent = `Approve selected (${selected})`;
+    button.disabled = selected === 0;
+
+    const selectAll = document.getElementById('approval-select-all');
+    const boxes = document.querySelectorAll('.approval-select');
+    if (selectAll) {
+        selectAll.checked = boxes.length > 0 && selected === boxes.length;
+    }
+}
+
+function toggleSelectAllApprovals(checked) {
+    document.querySelectorAll('.approval-select').forEach(box => {
+        box.checked = checked;
+    });
+    updateBatchToolbar();
+}
+
+async function approveSelectedExpenses() {
+    const expenseIds = getSelectedApprovalIds();
+    if (expenseIds.length === 0) return;
+
+    // Each decision carries the comments typed on its card
+    const decisions = expenseIds.map(expenseId => {
+        const commentsInput = document.getElementById(`comments-${expenseId}`);
+        const comments = commentsInput ? commentsInput.value.trim() : '';
+        return { expense_id: expenseId, decision: 'Approved', comments: comments || null };
+    });
+
+    const button = document.getElementById('batch-approve-btn');
+    button.disabled = true;
+    button.textContent = `Approving ${decisions.length}...`;
+
+    try {
+        const response = await authenticatedFetch(`${API_BASE_URL}/expenses/approvals:batch`, {
+            method: 'POST',
+            body: JSON.stringify({ decisions })
+        });
+
+        if (!response.ok) {
+            const error = await response.json();
+            alert(error.detail || 'Failed to approve expenses');
+            updateBatchToolbar();
+            return;
+        }
+
+        const results = await response.json();
+        const failed = results.filter(result => !result.success);
+
+        // Drop the approved cards instead of reloading the whole list
+        results.filter(result => result.success).forEach(result => {
+            const card = document.getElementById(`approval-card-${result.expense_id}`);
+            if (card) card.remove();
+        });
+
+        if (failed.length > 0) {
+            alert(`${results.length - failed.length} approved, ${failed.length} failed:\n` +
+                failed.map(result => `#${result.expense_id}: ${result.detail}`).join('\n'));
+        } else {
+            alert(`${results.length} expense(s) approved successfully!`);
+        }
+
+        if (document.querySelectorAll('.approval-card').length === 0) {
+            await fetchPendingApprovals();
+        } else {
+            updateBatchToolbar();
+        }
+    } catch (error) {
+        console.error('Error approving expenses:', error);
+        alert('Network error. Please try again.');
+        updateBatchToolbar();
+    }
+}
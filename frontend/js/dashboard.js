@@ -95,15 +95,21 @@ async function initDashboard() {
 }
 
 
-// This function is the same as the one implemented in the previous step
-async function fetchUserExpenses() {
+// Loads the first page of expenses, or appends the page after `cursor` ("Load more")
+async function fetchUserExpenses(cursor = null) {
     const expenseList = document.getElementById('expense-list');
     if (!expenseList) return;
 
-    expenseList.innerHTML = '<tr><td colspan="5" class="loading-message">Fetching data...</td></tr>';
+    if (cursor) {
+        document.getElementById('load-more-expenses')?.remove();
+    } else {
+        expenseList.innerHTML = '<tr><td colspan="5" class="loading-message">Fetching data...</td></tr>';
+    }
     
     try {
-        const response = await authenticatedFetch(`${API_BASE_URL}/expenses/`); 
+        // The table only shows expense headers, so lines and approvals are not requested
+        const query = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+        const response = await authenticatedFetch(`${API_BASE_URL}/expenses/?view=summary${query}`); 
 
         if (!response.ok) {
             const errorData = await response.json();
@@ -111,6 +117,7 @@ async function fetchUserExpenses() {
         }
 
         const expenses = await response.json();
+        const nextCursor = response.headers.get('X-Next-Cursor');
         const userData = getUserData();
         
         // Fetch company currency if not in userData
@@ -133,9 +140,9 @@ async function fetchUserExpenses() {
         
         console.log('Company currency for expenses:', companyCurrency);
         
-        expenseList.innerHTML = ''; 
+        if (!cursor) expenseList.innerHTML = ''; 
 
-        if (expenses.length === 0) {
+        if (expenses.length === 0 && !cursor) {
             expenseList.innerHTML = '<tr><td colspan="5" class="empty-message">You have no expense claims submitted.</td></tr>';
             return;
         }
@@ -172,6 +179,14 @@ async function fetchUserExpenses() {
             expenseList.appendChild(row);
         });
 
+        if (nextCursor) {
+            const moreRow = document.createElement('tr');
+            moreRow.id = 'load-more-expenses';
+            moreRow.innerHTML = '<td colspan="5" style="text-align: center;"><button type="button" class="btn-secondary">Load more</button></td>';
+            moreRow.querySelector('button').onclick = () => fetchUserExpenses(nextCursor);
+            expenseList.appendChild(moreRow);
+        }
+
     } catch (error) {
         console.error('Error fetching expenses:', error);
         expenseList.innerHTML = `<tr><td colspan="5" class="error-message">Error: ${error.message}</td></tr>`;
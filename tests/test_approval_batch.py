@@ -0,0 +1,62 @@
+import re
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.db import async_crud
+
+from .conftest import count_statements, submit_expenses
+
+@pytest.fixture
+def commits():
+    """Counts the session commits made inside the test."""
+    counter = {"commits": 0}
+
+    def after_commit(session):
+        counter["commits"] += 1
+
+    event.listen(Session, "after_commit", after_commit)
+    yield counter
+    event.remove(Session, "after_commit", after_commit)
+
+def test_batch_is_committed_once(client, company, commits):
+    expense_ids = submit_expenses(client, company["employee"], 2)
+    decisions = [{"expense_id": expense_id, "decision": "Approved"} for expense_id in expense_ids]
+    decisions.append({"expense_id": 999999, "decision": "Approved"})
+
+    commits["commits"] = 0
+    response = client.post("/expenses/approvals:batch", headers=company["approver"], json={"decisions": decisions})
+    assert response.status_code == 200, response.text
+    assert [result["success"] for result in response.json()] == [True, True, False]
+    assert commits["commits"] == 1
+
+    listed = client.get("/expenses/", headers=company["employee"]).json()
+    assert {expense["status"] for expense in listed} == {"Approved"}
+
+def test_failed_batch_is_rolled_back(client, company, monkeypatch):
+    expense_ids = submit_expenses(client, company["employee"], 2)
+
+    async def fail(db, expense_ids):
+        raise RuntimeError("inbox sync failed")
+
+    with monkeypatch.context() as patch, pytest.raises(RuntimeError):
+        patch.setattr(async_crud, "sync_approval_inbox", fail)
+        client.post("/expenses/approvals:batch", headers=company["approver"], json={
+            "decisions": [{"expense_id": expense_id, "decision": "Approved"} for expense_id in expense_ids]
+        })
+
+    listed = client.get("/expenses/", headers=company["employee"]).json()
+    assert {expense["status"] for expense in listed} == {"Pending"}
+    assert all(expense["expense_approvals"] == [] for expense in listed)
+
+def test_batch_loads_the_employees_once(client, company, db_engines):
+    # Each decision writes its own rows, but the users are read once per batch
+    for size in (2, 8):
+        expense_ids = submit_expenses(client, company["employee"], size)
+        decisions = [{"expense_id": expense_id, "decision": "Approved"} for expense_id in expense_ids]
+        with count_statements(db_engines) as statements:
+            response = client.post("/expenses/approvals:batch", headers=company["approver"], json={"decisions": decisions})
+        assert response.status_code == 200 and all(result["success"] for result in response.json())
+        # The approver, then the expenses' employees
+        assert len([statement for statement in statements if re.search(r"\bFROM users\b", statement)]) == 2, statements
@@ -0,0 +1,169 @@
+import math
+
+import pytest
+
+from backend.db import crud, database
+from backend.models import models
+
+from .conftest import auth_headers, submit_expenses
+
+# Rules covering the approval workflow: required approvers before two normal
+# approvers in sequence, a 50% rule whose first two normal approvers share a
+# sequence, and a rule with required approvers only
+RULES = {
+    "required_then_sequence": {
+        "approval_percentage": 100,
+        "required_approvers": ["r1", "r2"],
+        "normal_approvers": [("n1", 1), ("n2", 2)],
+    },
+    "half_with_shared_sequence": {
+        "approval_percentage": 50,
+        "required_approvers": [],
+        "normal_approvers": [("n1", 1), ("n2", 1), ("n3", 2)],
+    },
+    "required_only": {
+        "approval_percentage": 100,
+        "required_approvers": ["r1"],
+        "normal_approvers": [],
+    },
+}
+APPROVERS = ["r1", "r2", "n1", "n2", "n3"]
+
+def legacy_pending_ids(db, user_id):
+    """
+    The expenses pending approval by user_id, evaluated expense by expense
+    from the approval log as before the approval inbox existed.
+    """
+    def approved(expense, user_ids):
+        return db.query(models.ExpenseApproval).filter(
+            models.ExpenseApproval.expense_id == expense.expense_id,
+            models.ExpenseApproval.approver_id.in_(user_ids),
+            models.ExpenseApproval.status == 'Approved'
+        ).count()
+
+    pending = set()
+    for expense in db.query(models.Expense).filter(models.Expense.status == 'Pending').all():
+        if approved(expense, [user_id]):
+            continue
+        employee = db.get(models.User, expense.employee_id)
+        rule = db.get(models.ApprovalRule, employee.approval_rule_id) if employee.approval_rule_id else None
+        if rule is None:
+            continue
+
+        required = [approver.user_id for approver in rule.required_approvers]
+        if user_id in required and approved(expense, required) < len(required):
+            pending.add(expense.expense_id)
+            continue
+
+        sequence = {approver.user_id: approver.sequence for approver in rule.normal_approvers}
+        if user_id not in sequence or approved(expense, required) < len(required):
+            continue
+        needed = math.ceil(len(sequence) * ((rule.approval_percentage or 100.0) / 100.0))
+        if approved(expense, list(sequence)) >= needed:
+            continue
+        previous = [other for other, number in sequence.items() if number < sequence[user_id]]
+        if approved(expense, previous) == len(previous):
+            pending.add(expense.expense_id)
+    return pending
+
+@pytest.fixture
+def workflow(client, company):
+    """
+    One employee per rule in RULES with two expenses each, plus the company
+    fixture's expenses. Returns the approvers' user ids and auth headers.
+    """
+    admin = company["admin"]
+    user_ids = {}
+    for name in APPROVERS + list(RULES):
+        response = client.post("/auth/users", headers=admin, json={
+            "email": f"{name}@acme.com", "name": name, "role": "Employee", "password": "pw"
+        })
+        assert response.status_code == 201, response.text
+        user_ids[name] = response.json()["user_id"]
+
+    for name, rule in RULES.items():
+        response = client.post("/rules/", headers=admin, json={
+            "name": name,
+            "approval_percentage": rule["approval_percentage"],
+            "required_approvers": [{"user_id": user_ids[user]} for user in rule["required_approvers"]],
+            "normal_approvers": [{"user_id": user_ids[user], "sequence": number} for user, number in rule["normal_approvers"]],
+        })
+        assert response.status_code == 201, response.text
+        response = client.put(f"/auth/users/{user_ids[name]}", headers=admin, json={"approval_rule_id": response.json()["rule_id"]})
+        assert response.status_code == 200, response.text
+        submit_expenses(client, auth_headers(user_ids[name]), 2)
+
+    submit_expenses(client, company["employee"], 2)
+    approvers = {name: user_ids[name] for name in APPROVERS}
+    approvers["approver"] = int(company["approver"]["Authorization"].rsplit("_", 1)[1])
+    return {name: (user_id, auth_headers(user_id)) for name, user_id in approvers.items()}
+
+def inbox_ids(client, headers):
+    response = client.get("/expenses/pending-approvals", headers=headers, params={"limit": 100})
+    assert response.status_code == 200, response.text
+    return {expense["expense_id"] for expense in response.json()}
+
+def inbox_rows():
+    with database.SessionLocal() as db:
+        return {
+            (entry.expense_id, entry.approver_id, entry.company_id)
+            for entry in db.query(models.ApprovalInbox).all()
+        }
+
+def test_inbox_matches_the_per_expense_evaluation(client, workflow):
+    decisions = 0
+    shared_sequence = False
+    while True:
+        listed = {name: inbox_ids(client, headers) for name, (_, headers) in workflow.items()}
+        shared_sequence = shared_sequence or bool(listed["n1"] & listed["n2"])
+        with database.SessionLocal() as db:
+            for name, (user_id, _) in workflow.items():
+                assert listed[name] == legacy_pending_ids(db, user_id), name
+
+        actionable = sorted((expense_id, name) for name, expense_ids in listed.items() for expense_id in expense_ids)
+        if not actionable:
+            break
+        expense_id, name = actionable[0]
+        # Every fifth decision is a rejection, which takes the expense out of every inbox
+        decisions += 1
+        action, body = ("reject", {"comments": "No receipt"}) if decisions % 5 == 0 else ("approve", {})
+        response = client.post(f"/expenses/{expense_id}/{action}", headers=workflow[name][1], json=body)
+        assert response.status_code == 200, response.text
+
+    # The approvers sharing a sequence were offered the same expense at once
+    assert shared_sequence
+    assert decisions >= 10
+
+def test_rebuild_reproduces_the_maintained_inbox(client, workflow):
+    for name in ("r1", "r2", "n1"):
+        expense_id = min(inbox_ids(client, workflow[name][1]))
+        response = client.post(f"/expenses/{expense_id}/approve", headers=workflow[name][1], json={})
+        assert response.status_code == 200, response.text
+
+    maintained = inbox_rows()
+    assert maintained
+    with database.SessionLocal() as db:
+        written = crud.rebuild_approval_inbox(db, batch_size=3)
+        db.commit()
+
+    assert written == len(maintained)
+    assert inbox_rows() == maintained
+
+def test_counter_check_flags_a_corrupted_counter(client, workflow):
+    expense_id = min(inbox_ids(client, workflow["n1"][1]))
+    response = client.post(f"/expenses/{expense_id}/approve", headers=workflow["n1"][1], json={})
+    assert response.status_code == 200, response.text
+
+    with database.SessionLocal() as db:
+        assert crud.check_approval_counters(db) == []
+        expense = db.get(models.Expense, expense_id)
+        stored = expense.normal_approvals_done
+        expense.normal_approvals_done = stored + 5
+        db.commit()
+
+        assert crud.check_approval_counters(db) == [{
+            "expense_id": expense_id, "field": "normal_approvals_done", "stored": stored + 5, "expected": stored
+        }]
+        assert len(crud.check_approval_counters(db, fix=True)) == 1
+        assert crud.check_approval_counters(db) == []
+        assert db.get(models.Expense, expense_id).normal_approvals_done == stored
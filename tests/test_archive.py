@@ -0,0 +1,82 @@
+import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from backend.db import database
+from backend.db.archive import archive_finalized_expenses
+from backend.models import models
+
+from .conftest import submit_expenses
+
+OLD = datetime.datetime.utcnow() - datetime.timedelta(days=400)
+
+@pytest.fixture
+def expense_ids(client, company):
+    """
+    Four expenses: approved, rejected and still pending ones submitted before
+    the archive window, and an approved one inside it.
+    """
+    old_approved, old_rejected, old_pending, recent = submit_expenses(client, company["employee"], 4)
+    for expense_id, action, body in ((old_approved, "approve", {}), (old_rejected, "reject", {"comments": "No receipt"}), (recent, "approve", {})):
+        response = client.post(f"/expenses/{expense_id}/{action}", headers=company["approver"], json=body)
+        assert response.status_code == 200, response.text
+
+    with database.SessionLocal() as db:
+        for offset, expense_id in enumerate((old_approved, old_rejected, old_pending)):
+            db.get(models.Expense, expense_id).submission_date = OLD + datetime.timedelta(hours=offset)
+        db.commit()
+    return {"old_approved": old_approved, "old_rejected": old_rejected, "old_pending": old_pending, "recent": recent}
+
+def count_rows(db, model, expense_ids):
+    return db.execute(select(func.count()).select_from(model).where(model.expense_id.in_(expense_ids))).scalar()
+
+def test_finalized_expenses_are_moved_to_the_archive(expense_ids):
+    archived_ids = [expense_ids["old_approved"], expense_ids["old_rejected"]]
+    with database.SessionLocal() as db:
+        before = {model: count_rows(db, model, archived_ids) for model in (models.Expense, models.ExpenseLine, models.ExpenseApproval)}
+        assert archive_finalized_expenses(db, batch_size=1) == 2
+        assert archive_finalized_expenses(db) == 0
+
+        for hot, cold in (
+            (models.Expense, models.ArchivedExpense),
+            (models.ExpenseLine, models.ArchivedExpenseLine),
+            (models.ExpenseApproval, models.ArchivedExpenseApproval),
+        ):
+            assert count_rows(db, hot, archived_ids) == 0
+            assert count_rows(db, cold, archived_ids) == before[hot]
+        kept = [expense_ids["old_pending"], expense_ids["recent"]]
+        assert count_rows(db, models.Expense, kept) == 2 and count_rows(db, models.ArchivedExpense, kept) == 0
+
+@pytest.mark.parametrize("view", ["full", "summary"])
+def test_since_reads_the_live_and_archive_tables(client, company, expense_ids, view):
+    with database.SessionLocal() as db:
+        archive_finalized_expenses(db)
+
+    def listed(**params):
+        expenses = []
+        cursor = None
+        while True:
+            response = client.get("/expenses/", headers=company["employee"], params={
+                "view": view, "limit": 1, **params, **({"cursor": cursor} if cursor else {})
+            })
+            assert response.status_code == 200, response.text
+            expenses += response.json()
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return expenses
+
+    # Without since, or with a since inside the window, only the live table is read
+    hot = [expense_ids["recent"], expense_ids["old_pending"]]
+    assert [expense["expense_id"] for expense in listed()] == hot
+    assert [expense["expense_id"] for expense in listed(since=datetime.date.today().isoformat())] == [expense_ids["recent"]]
+
+    expenses = listed(since=OLD.date().isoformat())
+    assert [expense["expense_id"] for expense in expenses] == [
+        expense_ids[name] for name in ("recent", "old_pending", "old_rejected", "old_approved")
+    ]
+    assert [expense["archived"] for expense in expenses] == [False, False, True, True]
+    assert [expense["status"] for expense in expenses] == ["Approved", "Pending", "Rejected", "Approved"]
+    if view == "full":
+        assert all(len(expense["expense_lines"]) == 2 for expense in expenses)
+        assert [len(expense["expense_approvals"]) for expense in expenses] == [1, 0, 1, 1]
@@ -0,0 +1,68 @@
+import csv
+import io
+
+import orjson
+import pytest
+
+# (employee_email, claim_ref, amount): claim A has one bad amount, so none of
+# its lines is imported; the unknown employee's line and the zero amount
+# without a claim_ref are rejected alone
+ROWS = [
+    ("employee@acme.com", "A", 10.0),
+    ("employee@acme.com", "A", -5.0),
+    ("employee@acme.com", "A", 7.0),
+    ("employee@acme.com", "B", 3.0),
+    ("employee@acme.com", "B", 4.0),
+    ("nobody@acme.com", "C", 8.0),
+    ("employee@acme.com", None, 0.0),
+    ("employee@acme.com", None, 2.0),
+]
+
+def import_file(rows, format):
+    records = [
+        {"employee_email": email, "claim_ref": claim_ref, "currency": "usd", "amount": amount, "date": "2026-01-02"}
+        for email, claim_ref, amount in rows
+    ]
+    if format == "ndjson":
+        return b"".join(orjson.dumps(record) + b"\n" for record in records)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(records[0]))
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue().encode()
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_claim_with_a_bad_line_is_rejected_as_a_whole(client, company, format):
+    response = client.post("/expenses/import", headers=company["admin"], files={"file": (f"feed.{format}", import_file(ROWS, format))})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["rows_read"], result["rows_imported"], result["claims_created"], result["error_count"]) == (8, 3, 2, 5)
+
+    errors = {error["row"]: error for error in result["errors"]}
+    assert sorted(errors) == [1, 2, 3, 6, 7]
+    assert errors[2]["claim_ref"] == "A" and errors[2]["detail"].startswith("amount: Input should be greater than 0")
+    for row in (1, 3):
+        assert errors[row]["detail"] == "Not imported: claim 'A' has an invalid line (row 2)"
+    assert errors[6]["claim_ref"] == "C" and errors[6]["detail"].startswith("Unknown employee")
+    assert errors[7]["claim_ref"] is None and errors[7]["detail"].startswith("amount:")
+
+    expenses = client.get("/expenses/", headers=company["employee"]).json()
+    assert sorted(expense["total_amount_local"] for expense in expenses) == [2.0, 7.0]
+    assert {expense["local_currency_code"] for expense in expenses} == {"USD"}
+    assert sorted(len(expense["expense_lines"]) for expense in expenses) == [1, 2]
+
+    # The imported claims wait for the employee's approver like submitted ones
+    pending = client.get("/expenses/pending-approvals", headers=company["approver"]).json()
+    assert {expense["expense_id"] for expense in pending} == {expense["expense_id"] for expense in expenses}
+
+def test_submitted_lines_need_a_positive_amount(client, company):
+    for amount in (0, -1.5):
+        response = client.post("/expenses/", headers=company["employee"], json={
+            "local_currency_code": "USD", "expense_lines": [{"amount_local": 10.0}, {"amount_local": amount}]
+        })
+        assert response.status_code == 422, response.text
+    assert client.get("/expenses/", headers=company["employee"]).json() == []
+
+def test_import_is_for_admins(client, company):
+    response = client.post("/expenses/import", headers=company["employee"], files={"file": ("feed.csv", import_file(ROWS, "csv"))})
+    assert response.status_code == 403
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from backend.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from backend.core.exchange_rates import ExchangeRateCache
+
+RECOVERY_SECONDS = 0.05
+
+def fail():
+    raise ConnectionError("provider down")
+
+def open_breaker(**options) -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_seconds=RECOVERY_SECONDS, **options)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+    return breaker
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_seconds=RECOVERY_SECONDS)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    # A success resets the count of consecutive failures
+    assert breaker.call(lambda: "ok") == "ok"
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == CLOSED
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+    # While open, the service is not called at all
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, "call")
+    assert calls == []
+    stats = breaker.stats()
+    assert (stats["calls"], stats["failures"], stats["rejected"], stats["opened"]) == (4, 3, 1, 1)
+
+def test_half_open_probe_closes_or_reopens_the_circuit():
+    breaker = open_breaker()
+    time.sleep(RECOVERY_SECONDS)
+    assert breaker.state == HALF_OPEN
+
+    # A failed probe opens the circuit again at once
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == OPEN and breaker.stats()["opened"] == 2
+
+    time.sleep(RECOVERY_SECONDS)
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED and breaker.stats()["consecutive_failures"] == 0
+
+def test_half_open_lets_a_limited_number_of_probes_through():
+    breaker = open_breaker(half_open_max_calls=1)
+    time.sleep(RECOVERY_SECONDS)
+
+    def probe():
+        # A second call while the probe is in flight is rejected
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "second")
+        return "probe"
+
+    assert breaker.call(probe) == "probe"
+    assert breaker.state == CLOSED
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_seconds=60, latency_budget_seconds=0.01)
+    for _ in range(2):
+        # The result is still returned
+        assert breaker.call(lambda: time.sleep(0.02) or "late") == "late"
+    assert breaker.state == OPEN and breaker.stats()["slow_calls"] == 2
+
+def test_open_circuit_serves_the_expired_rates():
+    rates = {"EUR": 0.8}
+    fetcher = {"fetch": lambda base_currency: rates}
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=60)
+    cache = ExchangeRateCache(fetcher=lambda base_currency: fetcher["fetch"](base_currency), ttl_seconds=0, max_bases=4, breaker=breaker)
+    assert cache.get_rates("USD") == rates
+
+    fetcher["fetch"] = lambda base_currency: fail()
+    assert cache.get_rates("USD") == rates # The failure opens the circuit
+    assert cache.get_rates("USD") == rates # Rejected without calling the provider
+    stats = cache.stats()
+    assert (stats["stale_served"], stats["fetch_errors"], stats["breaker"]["rejected"]) == (2, 2, 1)
+    with pytest.raises(CircuitOpenError):
+        cache.get_rates("USD", force=True)
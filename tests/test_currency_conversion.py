@@ -0,0 +1,33 @@
+from backend.core.config import settings
+from backend.db import database, rate_store
+
+def test_expense_without_a_stored_rate_is_queued(client, company, monkeypatch):
+    requested = []
+    monkeypatch.setattr(settings, "FX_DEFERRED_CONVERSION", False)
+    monkeypatch.setattr(rate_store.exchange_rate_refresher, "request", lambda *currencies: requested.append(currencies))
+
+    response = client.post("/expenses/", headers=company["employee"], json={
+        "description": "Conference",
+        "local_currency_code": "XTS",
+        "expense_lines": [{"amount_local": 40.0, "date": "2026-01-02"}]
+    })
+    assert response.status_code == 201, response.text
+    expense = response.json()
+    # Left for the currency converter instead of being priced at a made-up rate
+    assert expense["exchange_rate"] is None
+    assert expense["total_amount_company_currency"] is None
+    assert expense["rate_provisional"] is False
+    assert requested == [("XTS", "USD")]
+
+    db = database.SessionLocal()
+    try:
+        assert rate_store.convert_pending_expenses(db) == 0
+        rate_store.store_rates(db, "USD", {"XTS": 0.5})
+        db.commit()
+        assert rate_store.convert_pending_expenses(db) == 1
+    finally:
+        db.close()
+
+    converted = client.get("/expenses/", headers=company["employee"]).json()[0]
+    assert converted["exchange_rate"] == 2.0
+    assert converted["total_amount_company_currency"] == 80.0
@@ -0,0 +1,160 @@
+import pytest
+from collections import OrderedDict
+from sqlalchemy import func, select
+
+from backend.core.config import settings
+from backend.db import database, tenancy
+from backend.models import models
+
+from .conftest import count_statements, submit_expenses
+
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}
+
+def count_expenses(session_factory) -> int:
+    with session_factory() as db:
+        return db.execute(select(func.count(models.Expense.expense_id))).scalar()
+
+def test_sqlite_connections_use_the_configured_pragmas(db_engines):
+    if database.engine.dialect.name != "sqlite":
+        pytest.skip("SQLite only")
+    with database.engine.connect() as connection:
+        pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode").upper() == settings.SQLITE_JOURNAL_MODE.upper()
+        assert pragma("synchronous") == SQLITE_SYNCHRONOUS_LEVELS[settings.SQLITE_SYNCHRONOUS.upper()]
+        assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+        assert pragma("cache_size") == settings.SQLITE_CACHE_SIZE
+        assert pragma("query_only") == 0
+    with database.read_engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA query_only").scalar() == 1
+
+def test_postgresql_engine_uses_the_pool_settings(db_engines):
+    if database.engine.dialect.name != "postgresql":
+        pytest.skip("PostgreSQL only")
+    assert database.engine.pool.size() == settings.DB_POOL_SIZE
+    assert database.engine.pool.timeout() == settings.DB_POOL_TIMEOUT_SECONDS
+    with database.engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT 1").scalar() == 1
+
+def test_expense_is_submitted_approved_and_listed(client, company):
+    # Submissions use the sync session, approvals and listings the async ones
+    [expense_id] = submit_expenses(client, company["employee"], 1)
+    pending = client.get("/expenses/pending-approvals", headers=company["approver"]).json()
+    assert [expense["expense_id"] for expense in pending] == [expense_id]
+
+    response = client.post(f"/expenses/{expense_id}/approve", headers=company["approver"], json={"comments": "ok"})
+    assert response.status_code == 200, response.text
+
+    [expense] = client.get("/expenses/", headers=company["employee"]).json()
+    assert expense["status"] == "Approved" and expense["total_amount_local"] == 12.5
+    assert len(expense["expense_lines"]) == 2 and len(expense["expense_approvals"]) == 1
+    assert client.get("/expenses/pending-approvals", headers=company["approver"]).json() == []
+
+def test_reads_after_a_write_go_to_the_primary(client, company, db_engines, monkeypatch):
+    monkeypatch.setattr(database, "_last_write", OrderedDict())
+    primary, replica = db_engines[2], db_engines[3] # The async engines the listings use
+    submit_expenses(client, company["employee"], 1)
+
+    # The writer reads from the primary, other users from the replica
+    for user, path, used, unused in (
+        ("employee", "/expenses/", primary, replica), ("approver", "/expenses/pending-approvals", replica, primary)
+    ):
+        with count_statements([used]) as on_used, count_statements([unused]) as on_unused:
+            response = client.get(path, headers=company[user])
+        assert response.status_code == 200 and len(response.json()) == 1
+        assert on_used and not on_unused, user
+
+    # Once the window has passed, the writer reads from the replica too
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0)
+    with count_statements([primary]) as on_primary, count_statements([replica]) as on_replica:
+        response = client.get("/expenses/", headers=company["employee"])
+    assert response.status_code == 200 and len(response.json()) == 1
+    assert on_replica and not on_primary
+
+def test_expired_writes_are_forgotten(monkeypatch):
+    monkeypatch.setattr(database, "_last_write", OrderedDict())
+    database.record_write(1)
+    database.record_write(2)
+    assert list(database._last_write) == [1, 2] and database.wrote_recently(1)
+
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0)
+    database.record_write(3)
+    assert not database._last_write and not database.wrote_recently(3)
+
+@pytest.fixture
+def shard_location(db_engines, tmp_path, monkeypatch):
+    """A tenant shard "eu": a SQLite file, or a schema of the PostgreSQL test database."""
+    location = str(tmp_path / "eu.db") if database.engine.dialect.name == "sqlite" else "test_shard_eu"
+    monkeypatch.setattr(settings, "TENANT_SHARDS", {"eu": location})
+    monkeypatch.setattr(settings, "TENANT_ROUTE_TTL_SECONDS", 0.0)
+    monkeypatch.setattr(tenancy, "_shards", {})
+    monkeypatch.setattr(tenancy, "_company_shards", {})
+    monkeypatch.setattr(tenancy, "_user_companies", OrderedDict())
+
+    yield location
+
+    for shard in tenancy._shards.values():
+        shard.engine.dispose()
+        shard.async_engine.sync_engine.dispose(close=False)
+    if database.engine.dialect.name != "sqlite":
+        with database.engine.begin() as connection:
+            connection.exec_driver_sql(f'DROP SCHEMA IF EXISTS "{location}" CASCADE')
+
+def test_company_moved_to_a_shard_is_served_from_it(client, company, shard_location):
+    submit_expenses(client, company["employee"], 3)
+    before = client.get("/expenses/", headers=company["employee"]).json()
+    company_id = before[0]["company_id"]
+
+    assert tenancy.move_company(company_id, "eu") == 3
+    # With a route TTL of 0 the source copy is purged right away
+    assert count_expenses(database.SessionLocal) == 0
+
+    # Expenses keep their ids, lines and approvals
+    after = client.get("/expenses/", headers=company["employee"]).json()
+    assert after == before
+
+    # New claims and their approval inbox go to the shard
+    [expense_id] = submit_expenses(client, company["employee"], 1)
+    pending = client.get("/expenses/pending-approvals", headers=company["approver"]).json()
+    assert expense_id in [expense["expense_id"] for expense in pending]
+    assert count_expenses(tenancy.get_shard("eu").SessionLocal) == 4
+
+    assert expense_id not in [expense["expense_id"] for expense in before]
+
+    tenancy.move_company(company_id, tenancy.DEFAULT_SHARD)
+    assert count_expenses(database.SessionLocal) == 4
+    assert count_expenses(tenancy.get_shard("eu").SessionLocal) == 0
+    assert len(client.get("/expenses/", headers=company["employee"]).json()) == 4
+
+    # The primary's fence from the first move was lifted, the shard's copy is fenced
+    submit_expenses(client, company["employee"], 1)
+
+def test_writes_are_refused_while_the_company_is_moving(client, company, shard_location):
+    submit_expenses(client, company["employee"], 1)
+    [expense] = client.get("/expenses/", headers=company["employee"]).json()
+
+    db = database.SessionLocal()
+    try:
+        tenancy._fence(db, expense["company_id"], "eu")
+        response = client.post("/expenses/", headers=company["employee"], json={
+            "local_currency_code": "USD", "expense_lines": [{"amount_local": 1.0}]
+        })
+        assert response.status_code == 503, response.text
+        assert "Retry-After" in response.headers
+        # Reads go on
+        assert client.get("/expenses/", headers=company["employee"]).json() == [expense]
+        assert count_expenses(database.SessionLocal) == 1
+
+        tenancy._unfence(db, expense["company_id"])
+    finally:
+        db.close()
+    submit_expenses(client, company["employee"], 1)
+
+def test_user_company_cache_is_bounded(client, company, shard_location, monkeypatch):
+    monkeypatch.setattr(settings, "TENANT_USER_CACHE_SIZE", 2)
+    with database.SessionLocal() as db:
+        user_ids = [user_id for (user_id,) in db.query(models.User.user_id).all()]
+    assert len(user_ids) > 2
+
+    for user_id in user_ids:
+        assert tenancy.company_of_user(user_id) is not None
+    assert list(tenancy._user_companies) == user_ids[-2:]
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from backend.core.exchange_rates import ExchangeRateCache
+
+RATES = {"EUR": 0.8, "GBP": 0.5}
+
+def test_concurrent_misses_share_one_fetch():
+    calls = []
+    release = threading.Event()
+
+    def fetcher(base_currency):
+        calls.append(base_currency)
+        release.wait(5)
+        return RATES
+
+    cache = ExchangeRateCache(fetcher=fetcher, ttl_seconds=60, max_bases=4)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_rates("USD"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+
+    # Every caller but the one fetching waits on its fetch
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < len(threads) - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["USD"]
+    assert results == [RATES] * len(threads)
+    stats = cache.stats()
+    assert (stats["fetches"], stats["misses"], stats["coalesced"]) == (1, len(threads), len(threads) - 1)
+
+    # The fetched table serves later lookups without the provider
+    assert cache.get_rate("USD", "EUR") == 0.8 and calls == ["USD"]
+
+def test_peek_counts_and_orders_like_get_rates():
+    cache = ExchangeRateCache(fetcher=lambda base_currency: {base_currency: 1.0}, ttl_seconds=60, max_bases=2)
+    assert cache.peek("USD") is None # Never fetches
+    cache.get_rates("USD")
+    cache.get_rates("EUR")
+
+    # A peek keeps USD in use, so the next base evicts EUR
+    assert cache.peek("USD") == {"USD": 1.0}
+    cache.get_rates("GBP")
+    assert cache.peek("EUR") is None and cache.peek("USD") is not None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["fetches"]) == (2, 5, 3)
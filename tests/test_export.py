@@ -0,0 +1,150 @@
+import csv
+import gzip
+import io
+import math
+
+import orjson
+import pytest
+
+from backend.core.config import settings
+from backend.db import crud, database, export, rate_store
+from backend.db.conversion import convert_amounts
+from backend.models import models, schemas
+
+from .conftest import submit_expenses
+
+# XTS has no stored rate; the zero amount and the company currency need none
+AMOUNTS = [0.0, 12.5, 40.0, 7.25, 3.0]
+CURRENCIES = ["EUR", "EUR", "GBP", "XTS", "USD"]
+
+def scalar_conversion(db, amounts, currencies, to_currency):
+    """The row-by-row path: one rate lookup per amount, as a submitted expense is priced."""
+    converted = []
+    for amount, currency in zip(amounts, currencies):
+        rate, _ = crud.get_exchange_rate(db, currency, to_currency)
+        converted.append(None if rate is None else amount * rate)
+    return converted
+
+@pytest.fixture
+def rates_db(db_engines, monkeypatch):
+    """A session on the test database with USD rates for EUR and GBP."""
+    monkeypatch.setattr(rate_store.exchange_rate_refresher, "request", lambda *currencies: None)
+    db = database.SessionLocal()
+    rate_store.store_rates(db, "USD", {"EUR": 0.8, "GBP": 0.5})
+    db.commit()
+    yield db
+    db.close()
+
+def test_batch_conversion_matches_the_scalar_path(rates_db):
+    result = convert_amounts(rates_db, AMOUNTS, CURRENCIES, "USD")
+    expected = scalar_conversion(rates_db, AMOUNTS, CURRENCIES, "USD")
+
+    assert [None if math.isnan(value) else value for value in result.converted.tolist()] == expected
+    assert result.missing == ["XTS"]
+    assert result.total == pytest.approx(sum(value for value in expected if value is not None))
+    assert result.subtotals == pytest.approx({"EUR": 12.5 / 0.8, "GBP": 80.0, "USD": 3.0})
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_export_converts_totals_like_the_scalar_path(client, company, rates_db, monkeypatch, format):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2) # Converted batch by batch
+    for amount, currency in zip(AMOUNTS[1:], CURRENCIES[1:]):
+        response = client.post("/expenses/", headers=company["employee"], json={
+            "local_currency_code": currency, "expense_lines": [{"amount_local": amount}]
+        })
+        assert response.status_code == 201, response.text
+
+    response = client.get("/expenses/export", headers=company["admin"], params={"format": format, "to_currency": "usd"})
+    assert response.status_code == 200, response.text
+    if format == "csv":
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        totals = [(float(row["total_amount_local"]), row["local_currency_code"]) for row in rows]
+        converted = [float(row["total_amount_converted"]) if row["total_amount_converted"] else None for row in rows]
+    else:
+        records = [orjson.loads(line) for line in response.text.splitlines()]
+        totals = [(record["total_amount_local"], record["local_currency_code"]) for record in records]
+        converted = [record["total_amount_converted"] for record in records]
+
+    assert [currency for _, currency in totals] == CURRENCIES[1:]
+    assert converted == scalar_conversion(rates_db, *zip(*totals), "USD")
+    assert converted[CURRENCIES[1:].index("XTS")] is None
+
+@pytest.fixture
+def expense_ids(client, company):
+    """Three expenses of two lines each, the first one approved."""
+    expense_ids = submit_expenses(client, company["employee"], 3)
+    response = client.post(f"/expenses/{expense_ids[0]}/approve", headers=company["approver"], json={"comments": "ok"})
+    assert response.status_code == 200, response.text
+    return expense_ids
+
+def get_export(client, company, **params):
+    response = client.get("/expenses/export", headers=company["admin"], params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+def test_csv_export_has_a_row_per_line_or_approval(client, company, expense_ids):
+    response = get_export(client, company)
+    assert response.headers["content-type"] == export.MEDIA_TYPES["csv"]
+    assert response.headers["content-disposition"].endswith('.csv"')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == export.EXPENSE_COLUMNS + ["archived", "line_id", "category_id", "vendor_name", "date",
+                                                      "amount_local", "line_description", "receipt_url", "expense_type"]
+    assert [int(row["expense_id"]) for row in rows] == [expense_id for expense_id in expense_ids for _ in range(2)]
+    assert [float(row["amount_local"]) for row in rows] == [10.0, 2.5] * 3
+    assert {row["archived"] for row in rows} == {"False"}
+
+    rows = list(csv.DictReader(io.StringIO(get_export(client, company, rows="approvals").text)))
+    assert [int(row["expense_id"]) for row in rows] == expense_ids
+    assert [row["approval_status"] for row in rows] == ["Approved", "", ""]
+    assert rows[0]["comments"] == "ok" and rows[0]["status"] == "Approved"
+
+def test_ndjson_export_matches_the_listing(client, company, expense_ids):
+    response = get_export(client, company, format="ndjson")
+    assert response.headers["content-type"] == export.MEDIA_TYPES["ndjson"]
+    records = [orjson.loads(line) for line in response.text.splitlines()]
+
+    listed = {expense["expense_id"]: expense for expense in client.get("/expenses/", headers=company["employee"]).json()}
+    assert [record["expense_id"] for record in records] == expense_ids
+    for record in records:
+        expense = listed[record["expense_id"]]
+        assert {name: record[name] for name in ("status", "total_amount_local", "local_currency_code")} == {
+            name: expense[name] for name in ("status", "total_amount_local", "local_currency_code")
+        }
+        assert [line["line_id"] for line in record["expense_lines"]] == [line["line_id"] for line in expense["expense_lines"]]
+        assert len(record["expense_approvals"]) == len(expense["expense_approvals"])
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_gzip_export_decompresses_to_the_plain_export(client, company, expense_ids, format):
+    plain = get_export(client, company, format=format).content
+    response = get_export(client, company, format=format, gzip=True)
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].endswith(f'.{format}.gz"')
+    assert gzip.decompress(response.content) == plain
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_export_is_streamed_batch_by_batch(client, company, monkeypatch, format):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    submit_expenses(client, company["employee"], 5)
+    sessions = []
+
+    def session_factory():
+        sessions.append(database.SessionLocal())
+        return sessions[-1]
+
+    with database.SessionLocal() as db:
+        company_id = db.get(models.User, int(company["admin"]["Authorization"].rsplit("_", 1)[1])).company_id
+    chunks = export.stream_company_expenses(session_factory, company_id, schemas.ExpenseExportParams(format=format))
+
+    # Nothing is read before the first chunk is asked for, and the session closes with the stream
+    assert sessions == []
+    first = next(chunks)
+    assert len(sessions) == 1 and sessions[0].in_transaction()
+    rest = list(chunks)
+    assert not sessions[0].in_transaction()
+
+    # One chunk per batch: ten CSV line rows, or five NDJSON expenses, by two
+    assert len([chunk for chunk in [first] + rest if chunk]) == (5 if format == "csv" else 3)
+    assert b"".join([first] + rest) == get_export(client, company, format=format).content
+
+def test_export_is_for_admins(client, company):
+    response = client.get("/expenses/export", headers=company["employee"])
+    assert response.status_code == 403
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from backend.core.config import settings
+from backend.db import database, rate_store
+
+LISTINGS = [("/expenses/", "employee"), ("/expenses/pending-approvals", "approver")]
+
+@pytest.fixture
+def expenses(client, company, monkeypatch):
+    """Expenses with awkward floats, a converted amount, one left unconverted (no XTS rate) and one approved."""
+    monkeypatch.setattr(settings, "FX_DEFERRED_CONVERSION", False)
+    monkeypatch.setattr(rate_store.exchange_rate_refresher, "request", lambda *currencies: None)
+    with database.SessionLocal() as db:
+        rate_store.store_rates(db, "USD", {"EUR": 0.3})
+        db.commit()
+
+    expense_ids = []
+    for currency, amounts in [("USD", [0.1, 0.2]), ("EUR", [10.1]), ("XTS", [7.0]), ("USD", [1e-7, 123456789.125])]:
+        response = client.post("/expenses/", headers=company["employee"], json={
+            "local_currency_code": currency,
+            "expense_lines": [{"amount_local": amount, "date": "2026-01-02"} for amount in amounts]
+        })
+        assert response.status_code == 201, response.text
+        expense_ids.append(response.json()["expense_id"])
+
+    response = client.post(f"/expenses/{expense_ids[0]}/approve", headers=company["approver"], json={})
+    assert response.status_code == 200, response.text
+    return expense_ids
+
+@pytest.mark.parametrize("view", ["full", "summary"])
+def test_fast_json_listings_match_the_schema_path(client, company, expenses, monkeypatch, view):
+    for path, user in LISTINGS:
+        bodies = {}
+        for fast in (False, True):
+            monkeypatch.setattr(settings, "FAST_JSON_LISTINGS", fast)
+            pages = []
+            cursor = None
+            while True:
+                params = {"view": view, "limit": 2, **({"cursor": cursor} if cursor else {})}
+                response = client.get(path, headers=company[user], params=params)
+                assert response.status_code == 200, response.text
+                pages.append(json.loads(response.text))
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            bodies[fast] = pages
+
+        assert bodies[True] == bodies[False]
+        items = [item for page in bodies[False] for item in page]
+        assert items
+        if path == "/expenses/":
+            assert len(items) == len(expenses)
+            assert any(item["total_amount_company_currency"] is None for item in items)
+            assert any(item["exchange_rate"] not in (None, 1.0) for item in items)
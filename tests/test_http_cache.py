@@ -0,0 +1,69 @@
+import pytest
+
+from backend.db import database
+from backend.models import models
+
+def company_id_of(headers):
+    with database.SessionLocal() as db:
+        return db.get(models.User, int(headers["Authorization"].rsplit("_", 1)[1])).company_id
+
+def rename_company(company_id):
+    """A write to the company outside the API, through the ORM like every write."""
+    with database.SessionLocal() as db:
+        db.get(models.Company, company_id).name = "Acme Europe"
+        db.commit()
+
+def add_user(client, admin):
+    response = client.post("/auth/users", headers=admin, json={
+        "email": "new@acme.com", "name": "New", "role": "Employee", "password": "pw"
+    })
+    assert response.status_code == 201, response.text
+
+def add_rule(client, admin):
+    response = client.post("/rules/", headers=admin, json={"name": "Anyone", "approval_percentage": 50})
+    assert response.status_code == 201, response.text
+
+def update_user(client, admin):
+    employee_id = client.get("/auth/managers", headers=admin).json()[-1]["user_id"]
+    response = client.put(f"/auth/users/{employee_id}", headers=admin, json={"name": "Renamed"})
+    assert response.status_code == 200, response.text
+
+WRITES = {
+    "company": lambda client, admin: rename_company(company_id_of(admin)),
+    "new user": add_user,
+    "updated user": update_user,
+    "new rule": add_rule,
+}
+
+@pytest.fixture
+def reference_paths(company):
+    return ["/rules/", "/auth/managers", f"/companies/{company_id_of(company['admin'])}"]
+
+@pytest.mark.parametrize("write", list(WRITES))
+def test_etag_changes_after_a_company_write(client, company, reference_paths, write):
+    admin = company["admin"]
+    etags = {}
+    for path in reference_paths:
+        response = client.get(path, headers=admin)
+        assert response.status_code == 200, response.text
+        etags[path] = response.headers["ETag"]
+
+        response = client.get(path, headers={**admin, "If-None-Match": etags[path]})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["ETag"] == etags[path]
+
+    WRITES[write](client, admin)
+
+    for path in reference_paths:
+        response = client.get(path, headers={**admin, "If-None-Match": etags[path]})
+        assert response.status_code == 200, response.text
+        assert response.headers["ETag"] != etags[path]
+        assert client.get(path, headers={**admin, "If-None-Match": response.headers["ETag"]}).status_code == 304
+
+def test_reads_do_not_change_the_etag(client, company, reference_paths):
+    admin = company["admin"]
+    etag = client.get("/rules/", headers=admin).headers["ETag"]
+    for path in reference_paths:
+        assert client.get(path, headers=admin).status_code == 200
+    response = client.get("/rules/", headers={**admin, "If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
@@ -0,0 +1,56 @@
+import re
+
+import pytest
+
+from backend.models import schemas
+
+from .conftest import count_statements, submit_expenses
+
+# A page of expenses is read with one query for the expenses and one
+# selectinload query each for their lines and approvals, however many
+# expenses the page holds; lazy loads during serialization would add two
+# queries per expense. view=summary reads the expense columns only.
+
+LISTINGS = [
+    # (path, user, queries before the page: the pending approvals look up the approver)
+    ("/expenses/", "employee", 0),
+    ("/expenses/pending-approvals", "approver", 1),
+]
+
+@pytest.mark.parametrize("path, user, lookups", LISTINGS)
+def test_listing_query_count_does_not_grow_with_the_page(client, company, db_engines, path, user, lookups):
+    submit_expenses(client, company["employee"], 2)
+    with count_statements(db_engines) as few:
+        response = client.get(path, headers=company[user])
+    assert response.status_code == 200 and len(response.json()) == 2
+
+    submit_expenses(client, company["employee"], 10)
+    with count_statements(db_engines) as many:
+        response = client.get(path, headers=company[user])
+    assert response.status_code == 200 and len(response.json()) == 12
+
+    assert len(few) == len(many) == lookups + 3, many
+
+@pytest.mark.parametrize("path, user, lookups", LISTINGS)
+def test_summary_listing_reads_one_query(client, company, db_engines, path, user, lookups):
+    submit_expenses(client, company["employee"], 5)
+    with count_statements(db_engines) as statements:
+        response = client.get(f"{path}?view=summary", headers=company[user])
+    assert response.status_code == 200 and len(response.json()) == 5
+    assert len(statements) == lookups + 1, statements
+
+@pytest.mark.parametrize("path, user, lookups", LISTINGS)
+def test_summary_listing_selects_the_summary_columns(client, company, db_engines, path, user, lookups):
+    submit_expenses(client, company["employee"], 3)
+    full = client.get(path, headers=company[user]).json()
+    with count_statements(db_engines) as statements:
+        response = client.get(f"{path}?view=summary", headers=company[user])
+    assert response.status_code == 200, response.text
+
+    # Only the summary columns are read from the expenses table
+    [page_query] = [statement for statement in statements if re.search(r"\bFROM expenses\b", statement)]
+    selected = set(re.findall(r"\bexpenses\.(\w+)", page_query.split(" FROM ")[0]))
+    assert selected == set(schemas.ExpenseListItem.model_fields) - {"archived"}
+
+    # The items are the full listing's items without the unlisted fields
+    assert response.json() == [{name: expense[name] for name in schemas.ExpenseListItem.model_fields} for expense in full]
@@ -0,0 +1,53 @@
+import base64
+import datetime
+
+import pytest
+
+from backend.db import database
+from backend.models import models
+
+from .conftest import submit_expenses
+
+LISTINGS = [("/expenses/", "employee"), ("/expenses/pending-approvals", "approver")]
+
+@pytest.fixture
+def expense_ids(client, company):
+    """Seven expenses submitted at only two instants, so most page keys tie on submission_date."""
+    expense_ids = submit_expenses(client, company["employee"], 7)
+    with database.SessionLocal() as db:
+        for expense_id in expense_ids:
+            db.get(models.Expense, expense_id).submission_date = datetime.datetime(2026, 1, 2 + expense_id % 2, 9, 30)
+        db.commit()
+    return expense_ids
+
+@pytest.mark.parametrize("path, user", LISTINGS)
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_cursor_walk_returns_every_expense_once(client, company, expense_ids, path, user, limit):
+    listed = []
+    cursor = None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(path, headers=company[user], params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page) <= limit
+        listed += [(expense["submission_date"], expense["expense_id"]) for expense in page]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert sorted(expense_id for _, expense_id in listed) == sorted(expense_ids)
+    # Newest first for the employee's expenses, oldest first for the approver
+    assert listed == sorted(listed, reverse=path == "/expenses/")
+
+@pytest.mark.parametrize("path, user", LISTINGS)
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b"[1, 2, 3]").decode(),
+    base64.urlsafe_b64encode(b'["yesterday", 1]').decode(),
+    base64.urlsafe_b64encode(b'["2026-01-02T09:30:00", "one"]').decode(),
+])
+def test_malformed_cursor_is_rejected(client, company, expense_ids, path, user, cursor):
+    response = client.get(path, headers=company[user], params={"cursor": cursor})
+    assert response.status_code == 400, response.text
+    assert response.json() == {"detail": "Invalid cursor"}
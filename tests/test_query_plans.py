@@ -0,0 +1,14 @@
+import pytest
+
+from backend.db import database
+from backend.db.query_plans import HOT_QUERIES, check_hot_query_plans
+
+def test_hot_queries_do_not_scan_large_tables(db_engines):
+    # The database is migrated like at startup, so this checks the migrations' indexes
+    if database.engine.dialect.name != "sqlite":
+        pytest.skip("Query plans are only checked on SQLite")
+    with database.SessionLocal() as db:
+        results = check_hot_query_plans(db)
+
+    assert [result["query"] for result in results] == list(HOT_QUERIES)
+    assert [(result["query"], result["plan"]) for result in results if result["full_scans"]] == []
@@ -0,0 +1,37 @@
+from sqlalchemy import text
+
+from backend.db import database
+from backend.db.rule_cache import rule_cache
+
+from .conftest import submit_expenses
+
+def test_rule_change_from_another_process_is_seen(client, company, db_engines):
+    submit_expenses(client, company["employee"], 1)
+    db = database.SessionLocal()
+    try:
+        (rule_id, company_id), = db.execute(text("SELECT rule_id, company_id FROM approval_rules")).all()
+        cached = rule_cache.get(db, rule_id)
+        assert len(cached.required_ids) == 1
+    finally:
+        db.close()
+
+    # Written with plain SQL, like another process would: no ORM events fire here
+    with db_engines[0].begin() as connection:
+        connection.execute(text("DELETE FROM rule_required_approvers WHERE rule_id = :rule_id"), {"rule_id": rule_id})
+        connection.execute(
+            text("UPDATE companies SET data_version = data_version + 1 WHERE company_id = :company_id"),
+            {"company_id": company_id}
+        )
+
+    db = database.SessionLocal()
+    try:
+        stale = rule_cache.stats()["stale"]
+        assert rule_cache.get(db, rule_id).required_ids == frozenset()
+        assert rule_cache.stats()["stale"] == stale + 1
+        # Cached again for the new version
+        hits = rule_cache.stats()["hits"]
+        db.commit()
+        assert rule_cache.get(db, rule_id).required_ids == frozenset()
+        assert rule_cache.stats()["hits"] == hits + 1
+    finally:
+        db.close()